@@ -2,6 +2,8 @@ import React, { useState, useEffect } from "react";
 import {
 	getJob,
 	computeJobLayout,
+	cancelLayoutTask,
+	getLatestJobLayout,
 	exportLayoutPdf,
 	getCutsheetPdf,
 	quickDownloadJobPath,
@@ -52,20 +54,49 @@ function JobLayoutViewer({ job: propJob, onOptimised }: Props) {
 	const [packingMode, setPackingMode] = useState("heuristic");
 	const [result, setResult] = useState<LayoutResult | null>(null);
 	const [loading, setLoading] = useState(false);
+	const [progress, setProgress] = useState(0);
+	const [taskId, setTaskId] = useState<string | null>(null);
 	const [error, setError] = useState("");
 
+	// Show the job's current layout, kept up to date in the background,
+	// without packing again
+	useEffect(() => {
+		let cancelled = false;
+		if (job?.id) {
+			(async () => {
+				try {
+					const latest = await getLatestJobLayout(job.id);
+					if (!cancelled && latest) setResult((prev) => prev || latest);
+				} catch {
+					/* ignore */
+				}
+			})();
+		}
+		return () => {
+			cancelled = true;
+		};
+	}, [job?.id]);
+
 	const handleCompute = async () => {
 		if (!job?.id) return;
 		setLoading(true);
+		setProgress(0);
 		setError("");
 		try {
-			const data = await computeJobLayout(job.id, {
-				sheet_width: Number(sheetWidth),
-				sheet_height: Number(sheetHeight),
-				allow_rotation: allowRotation,
-				kerf_mm: Number(kerf) || 3,
-				packing_mode: packingMode,
-			});
+			const data = await computeJobLayout(
+				job.id,
+				{
+					sheet_width: Number(sheetWidth),
+					sheet_height: Number(sheetHeight),
+					allow_rotation: allowRotation,
+					kerf_mm: Number(kerf) || 3,
+					packing_mode: packingMode,
+				},
+				(task) => {
+					setTaskId(task.id);
+					setProgress(task.progress);
+				}
+			);
 			setResult(data);
 			onOptimised && onOptimised(data);
 		} catch (e: any) {
@@ -74,6 +105,16 @@ function JobLayoutViewer({ job: propJob, onOptimised }: Props) {
 			notify({ type: "error", message: msg });
 		} finally {
 			setLoading(false);
+			setTaskId(null);
+		}
+	};
+
+	const handleCancel = async () => {
+		if (!taskId) return;
+		try {
+			await cancelLayoutTask(taskId);
+		} catch {
+			/* the task finished first */
 		}
 	};
 
@@ -83,13 +124,8 @@ function JobLayoutViewer({ job: propJob, onOptimised }: Props) {
 		if (!job?.id) return;
 		setError("");
 		try {
-			const res = await exportLayoutPdf(job.id, {
-				sheet_width: Number(sheetWidth),
-				sheet_height: Number(sheetHeight),
-				allow_rotation: allowRotation,
-				kerf_mm: Number(kerf) || 3,
-				packing_mode: packingMode,
-			});
+			// The layout on screen, as saved when it was computed
+			const res = await exportLayoutPdf(job.id, result?.placement_group_id);
 			if (!res.ok) throw new Error("Failed to export PDF");
 			const blob = await res.blob();
 			const url = window.URL.createObjectURL(blob);
@@ -186,12 +222,13 @@ function JobLayoutViewer({ job: propJob, onOptimised }: Props) {
 						value={packingMode}
 						onChange={(e) => setPackingMode(e.target.value)}
 						className="border px-2 py-1 rounded w-32"
-						aria-label="Packing mode (only heuristic available)"
+						aria-label="Packing mode"
 					>
 						<option value="simple" disabled title="Simple packing not available">
 							Simple
 						</option>
 						<option value="heuristic">Heuristic</option>
+						<option value="hybrid">Hybrid</option>
 						<option value="exhaustive" disabled title="Exhaustive packing not available">
 							Exhaustive
 						</option>
@@ -206,8 +243,13 @@ function JobLayoutViewer({ job: propJob, onOptimised }: Props) {
 					Allow rotation
 				</label>
 				<PrimaryButton className="" onClick={handleCompute} disabled={loading}>
-					{loading ? "Computing..." : "Compute layout"}
+					{loading ? `Computing... ${Math.round(progress * 100)}%` : "Compute layout"}
 				</PrimaryButton>
+				{loading && taskId && (
+					<PrimaryButton className="" onClick={handleCancel}>
+						Cancel
+					</PrimaryButton>
+				)}
 				<PrimaryButton className="" onClick={handleExportPdf} disabled={!!loading}>
 					Export Layout as PDF
 				</PrimaryButton>
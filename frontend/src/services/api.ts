@@ -9,6 +9,7 @@ import type {
 	Piece,
 	UserPiece,
 	LayoutResult,
+	LayoutTask,
 } from "../types/api";
 
 export class ApiError extends Error {
@@ -312,21 +313,61 @@ export async function importUserCabinetToJob(jobId: string, userCabinetId: strin
 }
 
 // Layout / exports
-export async function computeJobLayout(jobId: string, body: Record<string, unknown> = {}): Promise<LayoutResult> {
+const LAYOUT_POLL_MS = 1000;
+
+export async function getLayoutTask(taskId: string): Promise<LayoutTask> {
+	const res = await authFetch(`/api/layout-tasks/${taskId}`);
+	return await handleResponse<LayoutTask>(res);
+}
+
+// Stops a queued or running layout task; nothing is saved for it
+export async function cancelLayoutTask(taskId: string): Promise<LayoutTask> {
+	const res = await authFetch(`/api/layout-tasks/${taskId}/cancel`, { method: "POST" });
+	return await handleResponse<LayoutTask>(res);
+}
+
+// Queues a layout task and polls it until it finishes
+export async function computeJobLayout(
+	jobId: string,
+	body: Record<string, unknown> = {},
+	onProgress?: (task: LayoutTask) => void
+): Promise<LayoutResult> {
 	const res = await authFetch(`/api/jobs/${jobId}/layout`, {
 		method: "POST",
 		headers: { "Content-Type": "application/json" },
 		body: JSON.stringify(body),
 	});
+	const queued = await handleResponse<{
+		task_id: string;
+		status: string;
+		result?: LayoutResult;
+		placement_group_id?: string;
+	}>(res);
+	// Layouts already computed for the same pieces come back at once
+	if (queued.status === "done" && queued.result)
+		return { ...queued.result, placement_group_id: queued.placement_group_id };
+	for (;;) {
+		const task = await getLayoutTask(queued.task_id);
+		onProgress && onProgress(task);
+		if (task.status === "done" && task.result)
+			return { ...task.result, placement_group_id: task.placement_group_id ?? undefined };
+		if (task.status === "failed") throw new ApiError(500, task.error || "Layout failed", task);
+		if (task.status === "cancelled") throw new ApiError(409, "Layout cancelled", task);
+		await new Promise((resolve) => setTimeout(resolve, LAYOUT_POLL_MS));
+	}
+}
+
+// Newest layout still matching the job's pieces, or null if there is none
+export async function getLatestJobLayout(jobId: string): Promise<LayoutResult | null> {
+	const res = await authFetch(`/api/jobs/${jobId}/layout/latest`);
+	if (res.status === 404) return null;
 	return await handleResponse<LayoutResult>(res);
 }
 
-export async function exportLayoutPdf(jobId: string, body: Record<string, unknown> = {}): Promise<Response> {
-	return await authFetch(`/api/jobs/${jobId}/layout/export/pdf`, {
-		method: "POST",
-		headers: { "Content-Type": "application/json" },
-		body: JSON.stringify(body),
-	});
+// Draws a saved layout; the job's current one unless a group is given
+export async function exportLayoutPdf(jobId: string, placementGroupId?: string): Promise<Response> {
+	const query = placementGroupId ? `?placement_group_id=${encodeURIComponent(placementGroupId)}` : "";
+	return await authFetch(`/api/jobs/${jobId}/layout/export/pdf${query}`);
 }
 
 export async function getCutsheetPdf(jobId: string): Promise<Response> {
@@ -61,6 +61,7 @@ export interface LayoutPolygonPlacement {
 	name?: string | null;
 	points: number[][]; // [[x,y],...]
 	angle?: number;
+	offset?: [number, number]; // move after turning the piece's own outline by angle
 }
 
 export interface LayoutSheet {
@@ -73,10 +74,24 @@ export interface LayoutSheet {
 
 export interface LayoutResult {
 	sheets: LayoutSheet[];
+	placement_group_id?: string; // saved group the layout was stored as
 	// Additional meta fields could exist; keep as index signature for forward compat.
 	[k: string]: any;
 }
 
+export interface LayoutTask {
+	id: string;
+	job_id: string;
+	status: "queued" | "running" | "done" | "failed" | "cancelled";
+	progress: number; // 0..1
+	placement_group_id?: string | null;
+	result?: LayoutResult | null;
+	error?: string | null;
+	created_at: string;
+	started_at?: string | null;
+	finished_at?: string | null;
+}
+
 export interface AuthLoginResponse {
 	access_token: string;
 	token_type: string;
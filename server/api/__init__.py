@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
 # Expose submodule routers for easy import
-from . import cabinets, jobs, pieces, layout  # noqa: F401
+from . import cabinets, jobs, pieces, layout, layout_tasks, reoptimise  # noqa: F401
 
 router = APIRouter()
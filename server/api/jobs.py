@@ -5,7 +5,8 @@ from fastapi import APIRouter, Body, Query, HTTPException, Depends
 from sqlmodel import Session, select
 
 from db import engine
-from models import Job, Cabinet, Piece, PlacementGroup, Placement, Sheet
+from models import Job, Piece
+from queries import group_placements, latest_group, load_job_pieces
 from fastapi.responses import StreamingResponse
 from services.cutsheet_export import (
     cutsheet_by_sheet_to_pdf_bytes,
@@ -57,13 +58,10 @@ def _sanitize_filename(s: str) -> str:
 def get_job_pieces(pid: str):
     # Return pieces that belong to any cabinet associated with the given job
     with Session(engine) as s:
-        cabinets = s.exec(select(Cabinet).where(Cabinet.job_id == pid)).all()
-        if not cabinets:
+        loaded = load_job_pieces(s, pid)
+        if loaded is None:
             return []
-        cab_ids = [c.id for c in cabinets if c.id is not None]
-        if not cab_ids:
-            return []
-        pieces = s.exec(select(Piece).where(Piece.cabinet_id.in_(cab_ids))).all()
+        pieces = loaded.pieces
         out = []
         for p in pieces:
             item = {
@@ -90,49 +88,25 @@ def add_pieces(pid: str, pieces: List[Piece]):
         return pieces
 
 
-@router.get("/jobs/{pid}/cutsheet.pdf")
-def export_job_cutsheet_pdf(pid: str):
-    # Use most recent placement group; error if none
+def _cutsheet(pid: str):
+    """The job, and its newest layout as sheet metadata and rows by sheet."""
     with Session(engine) as s:
         job = s.get(Job, pid)
         if not job:
             raise HTTPException(status_code=404, detail="Job not found")
-        pg = s.exec(
-            select(PlacementGroup)
-            .where(PlacementGroup.job_id == pid)
-            .order_by(PlacementGroup.date.desc())
-        ).first()
-        if not pg:
-            raise HTTPException(
-                status_code=400, detail="No placement exists for this job"
-            )
-        placements = s.exec(
-            select(Placement).where(Placement.placement_group_id == pg.id)
-        ).all()
+        pg = latest_group(s, pid)
+        placements = group_placements(s, pg.id) if pg else []
         if not placements:
             raise HTTPException(
                 status_code=400, detail="No placement exists for this job"
             )
-        piece_ids = {pl.piece_id for pl in placements}
-        pieces = s.exec(select(Piece).where(Piece.id.in_(piece_ids))).all()
-        sheet_ids = {pl.sheet_id for pl in placements}
-        sheets = s.exec(select(Sheet).where(Sheet.id.in_(sheet_ids))).all()
-        cabinets = s.exec(select(Cabinet).where(Cabinet.job_id == pid)).all()
-        cabs_by_id = {c.id: c for c in cabinets}
 
     # Build rows grouped by sheet index (per placement), not sheet_id
-    piece_by_id = {p.id: p for p in pieces}
-    # Map sheet_id -> sheet record for dimensions/name lookup
-    sheet_by_id = {sh.id: sh for sh in sheets}
     rows_by_sheet: dict = {}
     sheet_meta_map = {}
-    for pl in placements:
-        p = piece_by_id.get(pl.piece_id)
-        if not p:
-            continue
+    for pl, p, sh, cab in placements:
         idx = getattr(pl, "sheet_index", None) or 1
         if idx not in sheet_meta_map:
-            sh = sheet_by_id.get(pl.sheet_id)
             sheet_meta_map[idx] = {
                 "id": idx,
                 "name": getattr(sh, "name", None),
@@ -145,9 +119,7 @@ def export_job_cutsheet_pdf(pid: str):
             "name": p.name,
             "width": p.width,
             "height": p.height,
-            "cabinet_name": (
-                cabs_by_id.get(p.cabinet_id).name if p.cabinet_id in cabs_by_id else ""
-            ),
+            "cabinet_name": cab.name if cab else "",
         }
         if p.points_json:
             try:
@@ -157,7 +129,13 @@ def export_job_cutsheet_pdf(pid: str):
         rows_by_sheet.setdefault(idx, []).append(row)
 
     sheet_meta = [sheet_meta_map[k] for k in sorted(sheet_meta_map.keys())]
+    return job, sheet_meta, rows_by_sheet
+
 
+@router.get("/jobs/{pid}/cutsheet.pdf")
+def export_job_cutsheet_pdf(pid: str):
+    # Use most recent placement group; error if none
+    job, sheet_meta, rows_by_sheet = _cutsheet(pid)
     pdf_bytes = cutsheet_by_sheet_to_pdf_bytes(
         job_name=job.name or job.id,
         sheets=sheet_meta,
@@ -177,67 +155,7 @@ def export_job_cutsheet_pdf(pid: str):
 
 @router.get("/jobs/{pid}/cutsheet.csv")
 def export_job_cutsheet_csv(pid: str):
-    with Session(engine) as s:
-        job = s.get(Job, pid)
-        if not job:
-            raise HTTPException(status_code=404, detail="Job not found")
-        pg = s.exec(
-            select(PlacementGroup)
-            .where(PlacementGroup.job_id == pid)
-            .order_by(PlacementGroup.date.desc())
-        ).first()
-        if not pg:
-            raise HTTPException(
-                status_code=400, detail="No placement exists for this job"
-            )
-        placements = s.exec(
-            select(Placement).where(Placement.placement_group_id == pg.id)
-        ).all()
-        if not placements:
-            raise HTTPException(
-                status_code=400, detail="No placement exists for this job"
-            )
-        piece_ids = {pl.piece_id for pl in placements}
-        pieces = s.exec(select(Piece).where(Piece.id.in_(piece_ids))).all()
-        sheet_ids = {pl.sheet_id for pl in placements}
-        sheets = s.exec(select(Sheet).where(Sheet.id.in_(sheet_ids))).all()
-        cabinets = s.exec(select(Cabinet).where(Cabinet.job_id == pid)).all()
-        cabs_by_id = {c.id: c for c in cabinets}
-
-    rows_by_sheet: dict = {}
-    piece_by_id = {p.id: p for p in pieces}
-    sheet_by_id = {sh.id: sh for sh in sheets}
-    sheet_meta_map = {}
-    for pl in placements:
-        p = piece_by_id.get(pl.piece_id)
-        if not p:
-            continue
-        idx = getattr(pl, "sheet_index", None) or 1
-        if idx not in sheet_meta_map:
-            sh = sheet_by_id.get(pl.sheet_id)
-            sheet_meta_map[idx] = {
-                "id": idx,
-                "name": getattr(sh, "name", None),
-                "width": getattr(sh, "width", None),
-                "height": getattr(sh, "height", None),
-                "index": idx,
-            }
-        row = {
-            "id": p.id,
-            "name": p.name,
-            "width": p.width,
-            "height": p.height,
-            "cabinet_name": (
-                cabs_by_id.get(p.cabinet_id).name if p.cabinet_id in cabs_by_id else ""
-            ),
-        }
-        if p.points_json:
-            try:
-                row["polygon"] = json.loads(p.points_json)
-            except Exception:
-                row["polygon"] = None
-        rows_by_sheet.setdefault(idx, []).append(row)
-    sheet_meta = [sheet_meta_map[k] for k in sorted(sheet_meta_map.keys())]
+    job, sheet_meta, rows_by_sheet = _cutsheet(pid)
     csv_bytes = cutsheet_by_sheet_to_csv_bytes(sheet_meta, rows_by_sheet)
     filename = f"{_sanitize_filename(job.name)}-cutsheet.csv"
     return StreamingResponse(
@@ -252,67 +170,7 @@ def export_job_cutsheet_csv(pid: str):
 
 @router.get("/jobs/{pid}/cutsheet.xlsx")
 def export_job_cutsheet_xlsx(pid: str):
-    with Session(engine) as s:
-        job = s.get(Job, pid)
-        if not job:
-            raise HTTPException(status_code=404, detail="Job not found")
-        pg = s.exec(
-            select(PlacementGroup)
-            .where(PlacementGroup.job_id == pid)
-            .order_by(PlacementGroup.date.desc())
-        ).first()
-        if not pg:
-            raise HTTPException(
-                status_code=400, detail="No placement exists for this job"
-            )
-        placements = s.exec(
-            select(Placement).where(Placement.placement_group_id == pg.id)
-        ).all()
-        if not placements:
-            raise HTTPException(
-                status_code=400, detail="No placement exists for this job"
-            )
-        piece_ids = {pl.piece_id for pl in placements}
-        pieces = s.exec(select(Piece).where(Piece.id.in_(piece_ids))).all()
-        sheet_ids = {pl.sheet_id for pl in placements}
-        sheets = s.exec(select(Sheet).where(Sheet.id.in_(sheet_ids))).all()
-        cabinets = s.exec(select(Cabinet).where(Cabinet.job_id == pid)).all()
-        cabs_by_id = {c.id: c for c in cabinets}
-
-    rows_by_sheet: dict = {}
-    piece_by_id = {p.id: p for p in pieces}
-    sheet_by_id = {sh.id: sh for sh in sheets}
-    sheet_meta_map = {}
-    for pl in placements:
-        p = piece_by_id.get(pl.piece_id)
-        if not p:
-            continue
-        idx = getattr(pl, "sheet_index", None) or 1
-        if idx not in sheet_meta_map:
-            sh = sheet_by_id.get(pl.sheet_id)
-            sheet_meta_map[idx] = {
-                "id": idx,
-                "name": getattr(sh, "name", None),
-                "width": getattr(sh, "width", None),
-                "height": getattr(sh, "height", None),
-                "index": idx,
-            }
-        row = {
-            "id": p.id,
-            "name": p.name,
-            "width": p.width,
-            "height": p.height,
-            "cabinet_name": (
-                cabs_by_id.get(p.cabinet_id).name if p.cabinet_id in cabs_by_id else ""
-            ),
-        }
-        if p.points_json:
-            try:
-                row["polygon"] = json.loads(p.points_json)
-            except Exception:
-                row["polygon"] = None
-        rows_by_sheet.setdefault(idx, []).append(row)
-    sheet_meta = [sheet_meta_map[k] for k in sorted(sheet_meta_map.keys())]
+    job, sheet_meta, rows_by_sheet = _cutsheet(pid)
     xlsx_bytes = cutsheet_by_sheet_to_xlsx_bytes(sheet_meta, rows_by_sheet)
     filename = f"{_sanitize_filename(job.name)}-cutsheet.xlsx"
     return StreamingResponse(
@@ -1,29 +1,35 @@
 import json
 from datetime import datetime
 import logging
+import time
 from typing import Optional
 import re
 
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy import insert
 from sqlmodel import Session, select
 
 from db import engine
 from models import (
     Job,
-    Cabinet,
-    Piece,
     Placement,
     PlacementGroup,
     Sheet,
+    guid,
 )
+from queries import group_placements, latest_group, load_job_pieces
+from services._optimiser_common import Polygon, shapely, shp_rotate
+from services.cancellation import CancelToken
+from services.incremental import repack
+from services.layout_cache import layout_key
 from services.optimiser import pack
 from services.export import sheets_to_pdf_bytes
 
+from . import layout_cache
 from .auth_fastapi_users import current_active_user
 
-
 logger = logging.getLogger(__name__)
 
 router = APIRouter(dependencies=[Depends(current_active_user)])
@@ -46,91 +52,245 @@ class LayoutRequest(BaseModel):
     sheet_height: int
     allow_rotation: Optional[bool] = None
     kerf_mm: Optional[int] = None
-    packing_mode: Optional[str] = "heuristic"  # "heuristic" or "exhaustive"
-
+    # "heuristic", "hybrid", "simple", "exhaustive", "raster", "nfp",
+    # "portfolio", "guillotine", "anytime" or "genetic"
+    packing_mode: Optional[str] = "heuristic"
+    # Wall-clock budget in seconds for search-based modes such as "portfolio"
+    time_budget_s: Optional[float] = None
+    # Random seed for the "anytime"/"genetic" searches; same seed, same layout
+    seed: Optional[int] = None
+    # Generation limit for the "genetic" mode
+    generations: Optional[int] = None
+    # Hard limit in seconds for any mode; past it the layout found so far is
+    # returned with "truncated": true and the rest listed as unplaced
+    time_limit_s: Optional[float] = None
+    # Start from the job's latest layout and only re-pack the sheets that
+    # the pieces changed since affect (see services.incremental)
+    incremental: Optional[bool] = False
+
+
+def _changed_after(job: Optional[Job], since: datetime) -> bool:
+    if job is None:
+        return True
+    return job.pieces_changed_at is not None and job.pieces_changed_at > since
+
+
+def pieces_changed_since(pid: str, since: datetime) -> bool:
+    """True if the job's cabinets or pieces changed after ``since``, or the
+    job is gone."""
+    with Session(engine) as s:
+        return _changed_after(s.get(Job, pid), since)
 
-@router.post("/jobs/{pid}/layout")
-def compute_job_layout(pid: str, body: LayoutRequest):
 
-    job, result = retrieve_and_pack_cabinets(pid, body)
+def save_layout(pid, body, result, packed_at: Optional[datetime] = None) -> str:
+    """Store ``result`` as the job's newest PlacementGroup; returns its id.
 
-    # Save PlacementGroup and Placements
-    with Session(engine) as s:
-        # Create PlacementGroup
+    Everything goes in one transaction, so a failure leaves no partial
+    group behind: the group, any sheet sizes not seen before, and then all
+    placements in a single executemany. ``packed_at`` is when packing
+    started; if the job's pieces changed since, the group is saved stale.
+    """
+    sheets = result.get("sheets", [])
+    with Session(engine) as s, s.begin():
+        job = s.get(Job, pid)
         placement_group = PlacementGroup(
             optimise_method=body.packing_mode or "heuristic",
             date=datetime.utcnow(),
             job_id=pid,
+            stale=packed_at is not None and _changed_after(job, packed_at),
+            options_json=json.dumps(pack_options(job, body)),
         )
         s.add(placement_group)
-        s.commit()  # To get placement_group.id
+        group_id = placement_group.id
 
-        # Save sheets if needed and placements
-        placements = []
-        for idx, sheet in enumerate(result.get("sheets", []), start=1):
-            # Try to find the sheet in DB, or create if needed
-            db_sheet = s.exec(
+        # Sheet rows by size, creating the sizes we don't have yet
+        sizes = {(sheet["width"], sheet["height"]) for sheet in sheets}
+        sheet_ids = {}
+        if sizes:
+            known = s.exec(
                 select(Sheet)
-                .where(Sheet.width == sheet["width"])
-                .where(Sheet.height == sheet["height"])  # noqa: E501
-            ).first()
-            if db_sheet:
-                sheet_id = db_sheet.id
-            else:
-                # TODO hardcoded placeholder because we don't have user sheets yet
-                default_name = f"Auto {sheet['width']}x{sheet['height']}"
-                placeholder_colour_id = "placeholder-colour-id"
-                new_sheet = Sheet(
-                    name=default_name,
-                    colour_id=placeholder_colour_id,
-                    width=sheet["width"],
-                    height=sheet["height"],
-                )
-                s.add(new_sheet)
-                s.commit()
-                sheet_id = new_sheet.id
-
-            # Save placements for rects, skipping those that correspond to polygons
-            poly_ids = {pg.get("piece_id") for pg in (sheet.get("polygons") or [])}
+                .where(Sheet.width.in_({w for w, _ in sizes}))
+                .where(Sheet.height.in_({h for _, h in sizes}))
+            ).all()
+            for db_sheet in known:
+                sheet_ids.setdefault((db_sheet.width, db_sheet.height), db_sheet.id)
+        for width, height in sorted(sizes - sheet_ids.keys()):
+            # TODO hardcoded placeholder because we don't have user sheets yet
+            new_sheet = Sheet(
+                name=f"Auto {width}x{height}",
+                colour_id="placeholder-colour-id",
+                width=width,
+                height=height,
+            )
+            s.add(new_sheet)
+            sheet_ids[(width, height)] = new_sheet.id
+
+        rows = []
+        for idx, sheet in enumerate(sheets, start=1):
+            sheet_id = sheet_ids[(sheet["width"], sheet["height"])]
+            # Polygons also have a rect entry, their bounding box; their
+            # row adds the transform and the outline
+            polygons = {pg["piece_id"]: pg for pg in sheet.get("polygons") or []}
             for rect in sheet.get("rects", []):
-                if rect.get("piece_id") in poly_ids:
-                    continue
-                placement = Placement(
-                    placement_group_id=placement_group.id,
-                    sheet_id=sheet_id,
-                    piece_id=rect["piece_id"],
-                    x=rect["x"],
-                    y=rect["y"],
-                    w=rect["w"],
-                    h=rect["h"],
-                    angle=rect.get("angle", 0),
-                    sheet_index=idx,
+                pg = polygons.get(rect["piece_id"])
+                offset = (pg or {}).get("offset") or (None, None)
+                rows.append(
+                    {
+                        "id": guid(),
+                        "placement_group_id": group_id,
+                        "sheet_id": sheet_id,
+                        "piece_id": rect["piece_id"],
+                        "x": rect["x"],
+                        "y": rect["y"],
+                        "w": rect["w"],
+                        "h": rect["h"],
+                        "angle": pg.get("angle", 0) if pg else rect.get("angle", 0),
+                        "sheet_index": idx,
+                        "tx": offset[0],
+                        "ty": offset[1],
+                        "outline_wkb": (
+                            shapely.to_wkb(Polygon(pg["points"])) if pg else None
+                        ),
+                    }
                 )
-                placements.append(placement)
-            # Save placements for polygons if present
-            for poly in sheet.get("polygons", []):
-                placement = Placement(
-                    placement_group_id=placement_group.id,
-                    sheet_id=sheet_id,
-                    piece_id=poly["piece_id"],
-                    x=0,  # Polygon placements may need more info
-                    y=0,
-                    w=0,
-                    h=0,
-                    angle=poly.get("angle", 0),
-                    sheet_index=idx,
+        # The group and sheets go first, for the foreign keys
+        s.flush()
+        if rows:
+            s.execute(insert(Placement.__table__), rows)
+    return group_id
+
+
+def _placed_outline(points, placement):
+    # The stored outline, or else the piece's outline turned by the angle
+    # and moved by the stored offset; rows saved before offsets were kept
+    # only have the bounding box at (x, y)
+    if placement.outline_wkb is not None:
+        outline = shapely.from_wkb(placement.outline_wkb)
+        return [[round(px), round(py)] for px, py in outline.exterior.coords[:-1]]
+    outline = shp_rotate(Polygon(points), placement.angle, origin=(0, 0))
+    if placement.tx is not None:
+        dx, dy = placement.tx, placement.ty
+    else:
+        minx, miny = outline.bounds[:2]
+        dx, dy = placement.x - minx, placement.y - miny
+    return [[round(px + dx), round(py + dy)] for px, py in outline.exterior.coords[:-1]]
+
+
+def layout_from_group(s: Session, group: PlacementGroup, deleted: bool = False) -> dict:
+    """The layout stored as ``group``, in the shape `pack` returns.
+
+    With ``deleted``, pieces deleted since keep their place, as a rect and
+    any stored outline, so that the layout still shows what it held.
+    """
+    sheets = {}
+    for placement, piece, sheet, _ in group_placements(s, group.id, deleted):
+        out = sheets.setdefault(
+            placement.sheet_index,
+            {
+                "index": placement.sheet_index - 1,
+                "width": sheet.width,
+                "height": sheet.height,
+                "rects": [],
+            },
+        )
+        if piece is None:
+            _deleted_piece_entries(out, placement)
+            continue
+        name = piece.name or piece.id
+        out["rects"].append(
+            {
+                "piece_id": piece.id,
+                "name": name,
+                "x": placement.x,
+                "y": placement.y,
+                "w": placement.w,
+                "h": placement.h,
+                "angle": placement.angle,
+            }
+        )
+        # Polygons, and rects a nesting mode turned off the axes, get outlines
+        if piece.points_json:
+            points = json.loads(piece.points_json)
+        elif placement.angle % 90:
+            points = [
+                [0, 0],
+                [piece.width, 0],
+                [piece.width, piece.height],
+                [0, piece.height],
+            ]
+        else:
+            points = None
+        if points or placement.outline_wkb is not None:
+            entry = {
+                "piece_id": piece.id,
+                "name": name,
+                "angle": placement.angle,
+                "points": _placed_outline(points, placement),
+            }
+            if placement.tx is not None:
+                entry["offset"] = [placement.tx, placement.ty]
+            out.setdefault("polygons", []).append(entry)
+    return {"sheets": [sheets[k] for k in sorted(sheets)]}
+
+
+def _deleted_piece_entries(out: dict, placement: Placement) -> None:
+    rect = {
+        "piece_id": placement.piece_id,
+        "name": None,
+        "x": placement.x,
+        "y": placement.y,
+        "w": placement.w,
+        "h": placement.h,
+        "angle": placement.angle,
+    }
+    out["rects"].append(rect)
+    if placement.outline_wkb is not None:
+        entry = {
+            "piece_id": placement.piece_id,
+            "name": None,
+            "angle": placement.angle,
+            "points": _placed_outline(None, placement),
+        }
+        out.setdefault("polygons", []).append(entry)
+
+
+@router.get("/jobs/{pid}/layout/latest")
+def get_latest_job_layout(pid: str):
+    """The newest layout still matching the job's pieces, without packing."""
+    with Session(engine) as s:
+        group = latest_group(s, pid, current=True)
+        if group is None:
+            raise HTTPException(status_code=404, detail="No current layout for job")
+        result = layout_from_group(s, group)
+        result["placement_group_id"] = group.id
+        result["optimise_method"] = group.optimise_method
+        result["date"] = group.date
+        return result
+
+
+@router.get("/jobs/{pid}/layout/export/pdf")
+def export_job_layout_pdf(pid: str, placement_group_id: Optional[str] = None):
+    """A saved layout of the job as a PDF; nothing is packed again.
+
+    Draws ``placement_group_id``, or by default the newest layout still
+    matching the job's pieces.
+    """
+    with Session(engine) as s:
+        job = s.get(Job, pid)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if placement_group_id:
+            group = s.get(PlacementGroup, placement_group_id)
+            if group is None or group.job_id != pid:
+                raise HTTPException(status_code=404, detail="Placement group not found")
+        else:
+            group = latest_group(s, pid, current=True)
+            if group is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail="No current layout for job; compute one first",
                 )
-                placements.append(placement)
-        s.add_all(placements)
-        s.commit()
-
-    return result
-
-
-@router.post("/jobs/{pid}/layout/export/pdf")
-def export_job_layout_pdf(pid: str, body: LayoutRequest):
-    # Reuse the same logic as compute_job_layout but return a PDF file.
-    job, result = retrieve_and_pack_cabinets(pid, body)
+        result = layout_from_group(s, group)
 
     # Render to PDF bytes
     sanitized_name = _sanitize_filename(getattr(job, "name", None))
@@ -147,10 +307,8 @@ def export_job_layout_pdf(pid: str, body: LayoutRequest):
     )
 
 
-def retrieve_and_pack_cabinets(pid, body):
-
-    job, pieces = db_fetch_job_and_pieces(pid)
-
+def pack_options(job, body) -> dict:
+    """The `pack` arguments ``body`` asks for, with the job's defaults."""
     allow_rotation = (
         body.allow_rotation
         if body.allow_rotation is not None
@@ -159,20 +317,103 @@ def retrieve_and_pack_cabinets(pid, body):
     kerf = (
         body.kerf_mm if body.kerf_mm is not None else (getattr(job, "kerf_mm", 0) or 0)
     )
+    return {
+        "sheet_width": body.sheet_width,
+        "sheet_height": body.sheet_height,
+        "allow_rotation": allow_rotation,
+        "kerf": kerf or 0,
+        "packing_mode": body.packing_mode or "heuristic",
+        "time_budget": body.time_budget_s,
+        "seed": body.seed,
+        "generations": body.generations,
+    }
+
+
+# Options a layout must share with a new request to be re-packed from
+INCREMENTAL_OPTIONS = (
+    "sheet_width",
+    "sheet_height",
+    "allow_rotation",
+    "kerf",
+    "packing_mode",
+)
+
+
+def previous_layout(pid, options):
+    """The job's latest layout, if it was made with the sheet, kerf, rotation
+    and packing mode of ``options`` (as `pack_options` returns them)."""
+    with Session(engine) as s:
+        group = latest_group(s, pid)
+        if group is None or not group.options_json:
+            return None
+        made_with = json.loads(group.options_json)
+        if any(made_with.get(k) != options[k] for k in INCREMENTAL_OPTIONS):
+            return None
+        # Deleted pieces stay in, so their sheets are re-packed
+        return layout_from_group(s, group, deleted=True)
+
+
+def cached_job_layout(pid, body):
+    """The job's layout if an identical set of pieces was packed before."""
+    job, pieces = db_fetch_job_and_pieces(pid)
+    shapes = convert_pieces_to_shapes(pieces)
+    return layout_cache.get(layout_key(shapes, pack_options(job, body)), shapes)
+
+
+def retrieve_and_pack_cabinets(
+    pid, body, cancel: Optional[CancelToken] = None, progress=None
+):
 
+    job, pieces = db_fetch_job_and_pieces(pid)
+    shapes = convert_pieces_to_shapes(pieces)
+    options = pack_options(job, body)
+    key = layout_key(shapes, options)
+    cached = layout_cache.get(key, shapes)
+    if cached is not None:
+        return job, cached
+
+    deadline = (
+        time.monotonic() + body.time_limit_s if body.time_limit_s is not None else None
+    )
+    previous = previous_layout(pid, options) if body.incremental else None
     try:
-        result = pack(
-            convert_pieces_to_shapes(pieces),
-            sheet_width=body.sheet_width,
-            sheet_height=body.sheet_height,
-            allow_rotation=allow_rotation,
-            kerf=kerf or 0,
-            packing_mode=body.packing_mode or "heuristic",
-        )
+        if previous is not None:
+            result = repack(
+                previous,
+                shapes,
+                **options,
+                deadline=deadline,
+                cancel=cancel,
+                progress=progress,
+            )
+        else:
+            result = pack(
+                shapes,
+                **options,
+                deadline=deadline,
+                cancel=cancel,
+                progress=progress,
+            )
     except ValueError as e:
         # Log the exception with traceback and the error message
         logger.exception("Error during packing: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
+    stats = result.pop("collision_stats", None)
+    if stats:
+        logger.debug("Job %s: overlap tests decided per stage: %s", pid, stats)
+    if result.get("truncated"):
+        logger.warning("Job %s: layout stopped early, result is partial", pid)
+    elif previous is None:
+        # An incremental layout depends on the one before, not just the key
+        layout_cache.put(key, shapes, result)
+    if result.get("unplaced"):
+        logger.warning(
+            "Job %s: %d piece(s) could not be placed on a %sx%s sheet",
+            pid,
+            len(result["unplaced"]),
+            body.sheet_width,
+            body.sheet_height,
+        )
     return job, result
 
 
@@ -202,19 +443,9 @@ def convert_pieces_to_shapes(pieces):
 
 def db_fetch_job_and_pieces(pid):
     with Session(engine) as db_session:
-        job = db_session.get(Job, pid)
-        if not job:
-            raise HTTPException(status_code=404, detail="Job not found")
-
-        cabinets = db_session.exec(select(Cabinet).where(Cabinet.job_id == pid)).all()
-        if not cabinets:
-            raise HTTPException(status_code=400, detail="No cabinets for this job")
-
-        cab_ids = [c.id for c in cabinets if c.id]
-        if not cab_ids:
-            raise HTTPException(status_code=400, detail="No cabinets for this job")
-        pieces = db_session.exec(
-            select(Piece).where(Piece.cabinet_id.in_(cab_ids))
-        ).all()
-
-    return job, pieces
+        loaded = load_job_pieces(db_session, pid)
+    if loaded is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not loaded.cabinets:
+        raise HTTPException(status_code=400, detail="No cabinets for this job")
+    return loaded.job, loaded.pieces
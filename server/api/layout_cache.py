@@ -0,0 +1,51 @@
+"""Persistent LRU store of layouts, keyed by `services.layout_cache`.
+
+Entries live in the ``layout_cache`` table next to the placement groups.
+Reading an entry marks it used; once there are more than
+`LAYOUT_CACHE_SIZE` entries the least recently used ones are dropped.
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from db import engine
+from models import LayoutCacheEntry
+from services.layout_cache import anonymise, restore
+
+# Most layouts kept
+LAYOUT_CACHE_SIZE = 500
+
+
+def get(key: str, pieces: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The cached layout for ``key``, given to ``pieces``, or None."""
+    with Session(engine) as s:
+        entry = s.get(LayoutCacheEntry, key)
+        if entry is None:
+            return None
+        entry.last_used = datetime.utcnow()
+        entry.hits += 1
+        s.add(entry)
+        s.commit()
+        stored = json.loads(entry.result_json)
+    return restore(stored, pieces)
+
+
+def put(key: str, pieces: List[Dict[str, Any]], result: Dict[str, Any]) -> None:
+    with Session(engine) as s:
+        # merge: another worker may have stored the same layout meanwhile
+        s.merge(
+            LayoutCacheEntry(key=key, result_json=json.dumps(anonymise(result, pieces)))
+        )
+        s.commit()
+        stale = s.exec(
+            select(LayoutCacheEntry.key)
+            .order_by(LayoutCacheEntry.last_used.desc())
+            .offset(LAYOUT_CACHE_SIZE)
+        ).all()
+        if stale:
+            s.execute(delete(LayoutCacheEntry).where(LayoutCacheEntry.key.in_(stale)))
+            s.commit()
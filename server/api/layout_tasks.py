@@ -0,0 +1,275 @@
+"""Background layout tasks.
+
+Packing a big polygon job can take longer than the reverse proxy waits for
+a response, so `POST /jobs/{pid}/layout` only records a `LayoutTask` and
+returns its id. The task runs in a bounded process pool; the worker saves
+the layout as a PlacementGroup and writes progress, the result and any
+error back to the task row, which `GET /layout-tasks/{id}` reports.
+`POST /layout-tasks/{id}/cancel` marks the task cancelled; a running
+worker notices through its `TaskCancelToken` and stops without saving.
+
+Tasks live in the database, so queued work survives a restart: at startup
+tasks still queued, and tasks left running by a worker that died with the
+server, are queued again.
+"""
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from db import engine
+from models import LayoutTask
+from services.cancellation import CancelToken
+
+from .auth_fastapi_users import current_active_user
+from .layout import (
+    LayoutRequest,
+    cached_job_layout,
+    retrieve_and_pack_cabinets,
+    save_layout,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(dependencies=[Depends(current_active_user)])
+
+# Least time (seconds) between two progress writes of a running task
+PROGRESS_INTERVAL = 0.5
+# Least time (seconds) between two cancellation checks of a running task
+CANCEL_POLL_INTERVAL = 0.5
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def layout_workers() -> int:
+    """Number of worker processes (``LAYOUT_WORKERS`` overrides)."""
+    env = os.getenv("LAYOUT_WORKERS")
+    if env:
+        try:
+            return max(1, int(env))
+        except ValueError:
+            pass
+    return 2
+
+
+def init_worker():
+    # Pooled connections inherited from the server process must not be
+    # used from the worker too
+    engine.dispose(close=False)
+
+
+def executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=layout_workers(), initializer=init_worker
+        )
+    return _pool
+
+
+def submit(task_id: str) -> None:
+    executor().submit(run_task, task_id)
+
+
+def resume_pending() -> None:
+    """Queue again every task that didn't finish before the last shutdown."""
+    with Session(engine) as s:
+        tasks = s.exec(
+            select(LayoutTask)
+            .where(LayoutTask.status.in_(("queued", "running")))
+            .order_by(LayoutTask.created_at)
+        ).all()
+        for task in tasks:
+            task.status = "queued"
+            task.progress = 0.0
+            task.started_at = None
+            s.add(task)
+        s.commit()
+        ids = [t.id for t in tasks]
+    if ids:
+        logger.info("Resuming %d layout task(s)", len(ids))
+    for task_id in ids:
+        submit(task_id)
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        # Tasks still queued stay queued in the database
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+class TaskCancelToken(CancelToken):
+    """Cancelled once the task's row says so; the row is read at most every
+    `CANCEL_POLL_INTERVAL` seconds, however often the packer asks."""
+
+    def __init__(self, task_id: str):
+        super().__init__()
+        self.task_id = task_id
+        self._last_poll = 0.0
+
+    def cancelled(self) -> bool:
+        if super().cancelled():
+            return True
+        now = time.monotonic()
+        if now - self._last_poll >= CANCEL_POLL_INTERVAL:
+            self._last_poll = now
+            with Session(engine) as s:
+                task = s.get(LayoutTask, self.task_id)
+                if task is None or task.status == "cancelled":
+                    self.cancel()
+        return super().cancelled()
+
+
+def _update(task_id: str, **fields) -> None:
+    with Session(engine) as s:
+        task = s.get(LayoutTask, task_id)
+        for k, v in fields.items():
+            setattr(task, k, v)
+        s.add(task)
+        s.commit()
+
+
+def _finish(task_id: str, **fields) -> None:
+    """Record the outcome of a running task, unless it was cancelled."""
+    with Session(engine) as s:
+        task = s.get(LayoutTask, task_id)
+        if task is None or task.status != "running":
+            return
+        for k, v in fields.items():
+            setattr(task, k, v)
+        task.finished_at = datetime.utcnow()
+        s.add(task)
+        s.commit()
+
+
+def run_task(task_id: str) -> None:
+    """Worker entry point: pack, save and record the outcome of a task."""
+    with Session(engine) as s:
+        # Claim the task in one statement, so two workers handed the same
+        # task (or a cancel racing the start) can't both see it queued
+        claimed = s.execute(
+            update(LayoutTask)
+            .where(LayoutTask.id == task_id, LayoutTask.status == "queued")
+            .values(status="running", started_at=datetime.utcnow())
+        )
+        s.commit()
+        if claimed.rowcount != 1:
+            return
+        task = s.get(LayoutTask, task_id)
+        pid = task.job_id
+        body = LayoutRequest.model_validate_json(task.params_json)
+
+    last_write = 0.0
+
+    def report(done: int, total: int) -> None:
+        nonlocal last_write
+        now = time.monotonic()
+        if total and now - last_write >= PROGRESS_INTERVAL:
+            last_write = now
+            _update(task_id, progress=min(1.0, done / total))
+
+    cancel = TaskCancelToken(task_id)
+    packed_at = datetime.utcnow()
+    try:
+        _, result = retrieve_and_pack_cabinets(
+            pid, body, cancel=cancel, progress=report
+        )
+        if cancel.cancelled():
+            # The partial layout of a cancelled task isn't kept
+            return
+        # Pieces edited while packing make the layout stale from the start
+        group_id = save_layout(pid, body, result, packed_at=packed_at)
+    except HTTPException as e:
+        _finish(task_id, status="failed", error=str(e.detail))
+        return
+    except Exception as e:  # noqa: BLE001 - recorded on the task
+        logger.exception("Layout task %s failed: %s", task_id, e)
+        _finish(task_id, status="failed", error=str(e))
+        return
+    _finish(
+        task_id,
+        status="done",
+        progress=1.0,
+        result_json=json.dumps(result),
+        placement_group_id=group_id,
+    )
+
+
+def _task_out(task: LayoutTask) -> dict:
+    return {
+        "id": task.id,
+        "job_id": task.job_id,
+        "status": task.status,
+        "progress": task.progress,
+        "placement_group_id": task.placement_group_id,
+        "result": json.loads(task.result_json) if task.result_json else None,
+        "error": task.error,
+        "created_at": task.created_at,
+        "started_at": task.started_at,
+        "finished_at": task.finished_at,
+    }
+
+
+@router.post("/jobs/{pid}/layout", status_code=202)
+def enqueue_job_layout(pid: str, body: LayoutRequest):
+    # A layout already in the cache is saved and returned straight away;
+    # this also answers 404/400 for a missing job or an empty one
+    cached = cached_job_layout(pid, body)
+    with Session(engine) as s:
+        task = LayoutTask(job_id=pid, params_json=body.model_dump_json())
+        if cached is not None:
+            now = datetime.utcnow()
+            task.status = "done"
+            task.progress = 1.0
+            task.result_json = json.dumps(cached)
+            task.placement_group_id = save_layout(pid, body, cached)
+            task.started_at = task.finished_at = now
+        s.add(task)
+        s.commit()
+        task_id = task.id
+        group_id = task.placement_group_id
+    if cached is not None:
+        return {
+            "task_id": task_id,
+            "status": "done",
+            "result": cached,
+            "placement_group_id": group_id,
+        }
+    submit(task_id)
+    return {"task_id": task_id, "status": "queued"}
+
+
+@router.get("/layout-tasks/{task_id}")
+def get_layout_task(task_id: str):
+    with Session(engine) as s:
+        task = s.get(LayoutTask, task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="Layout task not found")
+        return _task_out(task)
+
+
+@router.post("/layout-tasks/{task_id}/cancel")
+def cancel_layout_task(task_id: str):
+    """Stop a queued or running task; its worker saves nothing."""
+    with Session(engine) as s:
+        task = s.get(LayoutTask, task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="Layout task not found")
+        if task.status in ("done", "failed"):
+            raise HTTPException(status_code=409, detail="Layout task already finished")
+        if task.status != "cancelled":
+            task.status = "cancelled"
+            task.finished_at = datetime.utcnow()
+            s.add(task)
+            s.commit()
+        return _task_out(task)
@@ -0,0 +1,236 @@
+"""Stale layouts and background re-optimisation.
+
+Any insert, update or delete of a Cabinet or Piece marks the job's placement
+groups stale, in the same flush, and records the time on
+``Job.pieces_changed_at``; moving one to another job changes both jobs.
+Once the change is committed a re-run of each job is scheduled, debounced
+by `REOPTIMISE_DELAY` seconds so that a burst of edits leads to a single
+run.
+
+The run climbs `LADDER`, quickest mode first, with the sheet and options of
+the job's latest layout task, and saves a PlacementGroup each time a mode
+beats the best layout so far. `GET /jobs/{pid}/layout/latest` therefore
+soon has a fresh answer, which later rungs improve on. A run stops as soon
+as the job changes again; the next one is already scheduled by then. It
+also stops once the user has asked for a layout of the changed job, which
+is saved as the newer one anyway.
+
+Runs have a single worker process of their own, so they never hold up the
+layout tasks users are waiting for. A job has at most one run waiting for
+that worker: scheduling another replaces it.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from itertools import chain
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+
+from db import engine
+from models import Cabinet, Job, LayoutTask, Piece, PlacementGroup
+from services._optimiser_common import layout_score
+
+from . import layout_tasks
+from .layout import (
+    LayoutRequest,
+    pieces_changed_since,
+    retrieve_and_pack_cabinets,
+    save_layout,
+)
+
+logger = logging.getLogger(__name__)
+
+# Modes tried in turn, each slower and usually better than the last
+LADDER = ("simple", "heuristic", "exhaustive")
+
+# Quiet time (seconds) after the last change before a job is re-run
+REOPTIMISE_DELAY = 2.0
+
+# Hard limit (seconds) for each rung when the job's request sets none
+REOPTIMISE_TIME_LIMIT = 120.0
+
+_timers: Dict[str, threading.Timer] = {}
+_lock = threading.Lock()
+
+_pool: Optional[ProcessPoolExecutor] = None
+# The latest run submitted for each job
+_runs: Dict[str, Future] = {}
+
+
+def _changed_jobs(session) -> set:
+    return session.info.setdefault("changed_jobs", set())
+
+
+def _values(obj, attr: str) -> set:
+    """The current value of ``attr`` and, if this flush changes it, the old
+    one: a piece moved to another cabinet changes both jobs."""
+    return {getattr(obj, attr), *inspect(obj).attrs[attr].history.deleted}
+
+
+@event.listens_for(OrmSession, "before_flush")
+def _mark_stale(session, flush_context, instances):
+    jobs = set()
+    with session.no_autoflush:
+        for obj in chain(session.new, session.dirty, session.deleted):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            if isinstance(obj, Cabinet):
+                jobs.update(_values(obj, "job_id"))
+            elif isinstance(obj, Piece):
+                for cabinet_id in _values(obj, "cabinet_id") - {None}:
+                    cabinet = session.get(Cabinet, cabinet_id)
+                    if cabinet is not None:
+                        jobs.update(_values(cabinet, "job_id"))
+        jobs.discard(None)
+        if not jobs:
+            return
+        now = datetime.utcnow()
+        for job in session.scalars(select(Job).where(Job.id.in_(jobs))):
+            job.pieces_changed_at = now
+            session.add(job)
+        groups = session.scalars(
+            select(PlacementGroup)
+            .where(PlacementGroup.job_id.in_(jobs))
+            .where(PlacementGroup.stale == False)  # noqa: E712
+        )
+        for group in groups:
+            group.stale = True
+            session.add(group)
+    _changed_jobs(session).update(jobs)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _schedule_changed(session):
+    jobs = session.info.pop("changed_jobs", None)
+    for job_id in jobs or ():
+        schedule(job_id)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _forget_changed(session):
+    session.info.pop("changed_jobs", None)
+
+
+def schedule(job_id: str) -> None:
+    """Re-run ``job_id`` once it has been left alone for `REOPTIMISE_DELAY`."""
+    timer = threading.Timer(REOPTIMISE_DELAY, _start, args=(job_id,))
+    timer.daemon = True
+    with _lock:
+        previous = _timers.pop(job_id, None)
+        if previous is not None:
+            previous.cancel()
+        _timers[job_id] = timer
+    timer.start()
+
+
+def cancel_scheduled() -> None:
+    with _lock:
+        for timer in _timers.values():
+            timer.cancel()
+        _timers.clear()
+
+
+def executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=1, initializer=layout_tasks.init_worker)
+    return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    cancel_scheduled()
+    with _lock:
+        pool, _pool = _pool, None
+        _runs.clear()
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _start(job_id: str) -> None:
+    with _lock:
+        _timers.pop(job_id, None)
+    with Session(engine) as s:
+        task = s.exec(
+            select(LayoutTask)
+            .where(LayoutTask.job_id == job_id)
+            .order_by(LayoutTask.created_at.desc())
+        ).first()
+        # Without a layout request there is no sheet to pack onto
+        if task is None:
+            return
+        params_json = task.params_json
+    with _lock:
+        previous = _runs.get(job_id)
+        _runs[job_id] = future = executor().submit(run_ladder, job_id, params_json)
+    # A run still waiting for the worker would pack the same pieces
+    if previous is not None:
+        previous.cancel()
+    future.add_done_callback(lambda f: _forget_run(job_id, f))
+
+
+def _forget_run(job_id: str, future: Future) -> None:
+    with _lock:
+        if _runs.get(job_id) is future:
+            del _runs[job_id]
+
+
+def _requested_since_change(job_id: str) -> bool:
+    """True if a layout task for the job was created after its last change."""
+    with Session(engine) as s:
+        job = s.get(Job, job_id)
+        if job is None or job.pieces_changed_at is None:
+            return False
+        task = s.exec(
+            select(LayoutTask)
+            .where(LayoutTask.job_id == job_id)
+            .where(LayoutTask.created_at > job.pieces_changed_at)
+            .where(LayoutTask.status.not_in(("cancelled", "failed")))
+        ).first()
+        return task is not None
+
+
+def run_ladder(job_id: str, params_json: str) -> Optional[str]:
+    """Worker entry point: pack ``job_id`` with each mode of `LADDER`.
+
+    Returns the id of the best PlacementGroup saved, if any.
+    """
+    started = datetime.utcnow()
+    body = LayoutRequest.model_validate_json(params_json)
+    if body.time_limit_s is None:
+        body.time_limit_s = REOPTIMISE_TIME_LIMIT
+    best = None
+    best_group = None
+    for mode in LADDER:
+        if pieces_changed_since(job_id, started):
+            logger.info("Job %s changed, re-optimisation stopped", job_id)
+            return best_group
+        if _requested_since_change(job_id):
+            logger.info(
+                "Job %s has a requested layout, re-optimisation stopped", job_id
+            )
+            return best_group
+        rung = body.model_copy(update={"packing_mode": mode, "incremental": False})
+        try:
+            _, result = retrieve_and_pack_cabinets(job_id, rung)
+        except HTTPException as e:
+            # Job deleted or emptied meanwhile
+            logger.info("Job %s not re-optimised: %s", job_id, e.detail)
+            return best_group
+        if result.get("truncated"):
+            continue
+        score = layout_score(result)
+        if best is not None and score >= best:
+            continue
+        if pieces_changed_since(job_id, started) or _requested_since_change(job_id):
+            return best_group
+        best = score
+        best_group = save_layout(job_id, rung, result, packed_at=started)
+        logger.info("Job %s re-optimised with %s: %s", job_id, mode, score)
+    return best_group
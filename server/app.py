@@ -14,7 +14,7 @@ import logging
 from sqlmodel import SQLModel
 from sqlalchemy import text
 
-from db import engine
+from db import add_missing_columns, create_missing_indexes, engine
 
 # Load .env BEFORE importing routers that read env vars (e.g. JWT secret)
 root_env = Path(__file__).resolve().parents[1] / ".env"
@@ -28,7 +28,7 @@ from logging_config import configure_logging  # noqa: E402
 configure_logging()
 
 # Now safe to import routers that depend on env configuration
-from api import cabinets, jobs, pieces, layout  # noqa: E402
+from api import cabinets, jobs, pieces, layout, layout_tasks, reoptimise  # noqa: E402
 from api import auth_fastapi_users  # noqa: E402
 
 app = FastAPI()
@@ -62,9 +62,19 @@ app.include_router(cabinets.router, prefix="/api")
 app.include_router(jobs.router, prefix="/api")
 app.include_router(pieces.router, prefix="/api")
 app.include_router(layout.router, prefix="/api")
+app.include_router(layout_tasks.router, prefix="/api")
 app.include_router(auth_fastapi_users.combined_auth_router, prefix="/api")
 
 
 @app.on_event("startup")
 def on_startup():
     SQLModel.metadata.create_all(engine)
+    add_missing_columns()
+    create_missing_indexes()
+    layout_tasks.resume_pending()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    reoptimise.shutdown()
+    layout_tasks.shutdown()
@@ -0,0 +1,66 @@
+"""Time heuristic candidate evaluation: per-candidate loop vs batched arrays.
+
+Fills a sheet with a grid of parts, builds the candidate list the
+heuristic would use (placed bbox corners, at most 500) and asks both
+implementations to place an L-shaped part at every 15° angle.
+
+    python -m benchmarks.bench_candidate_eval [placed] [repeats]
+"""
+
+import sys
+import time
+
+from shapely.geometry import Polygon, box
+
+from services.irregular_packer import (
+    _place_on_sheet_batch,
+    _place_on_sheet_loop,
+    piece_variants,
+)
+from services.spatial_index import GridIndex
+
+SHEET_W, SHEET_H = 2400, 1200
+
+
+def _sheet(placed: int):
+    index = GridIndex(SHEET_W / 8.0)
+    cands = [(0.0, 0.0)]
+    cols = SHEET_W // 130
+    for i in range(placed):
+        x, y = (i % cols) * 130, (i // cols) * 90
+        part = box(x, y, x + 120 + (i % 3) * 5, y + 80)
+        index.insert(part)
+        minx, miny, maxx, maxy = part.bounds
+        cands.extend([(maxx, miny), (minx, maxy)])
+    return index, sorted(set(cands), key=lambda t: (t[1], t[0]))[:500]
+
+
+def main(placed: int = 150, repeats: int = 5) -> None:
+    index, cands = _sheet(placed)
+    shape = Polygon([(0, 0), (200, 0), (200, 50), (50, 50), (50, 200), (0, 200)])
+    item = {"variants": piece_variants(shape, shape, range(0, 360, 15))}
+    sheet = box(0, 0, SHEET_W, SHEET_H)
+
+    timings = {}
+    results = {}
+    for name, fn in (("loop", _place_on_sheet_loop), ("batch", _place_on_sheet_batch)):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            results[name] = fn(item, sheet, index, cands)
+        timings[name] = (time.perf_counter() - start) / repeats
+
+    same = (results["loop"] is None and results["batch"] is None) or (
+        results["loop"][2] == results["batch"][2]
+        and results["loop"][1].equals(results["batch"][1])
+    )
+    print(
+        f"{len(index)} placed, {len(cands)} candidates x "
+        f"{len(item['variants'])} angles"
+    )
+    print(f"loop   {timings['loop'] * 1000:8.1f} ms")
+    print(f"batch  {timings['batch'] * 1000:8.1f} ms")
+    print(f"speedup {timings['loop'] / timings['batch']:.1f}x, same placement: {same}")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -1,6 +1,39 @@
-from sqlmodel import create_engine
+from sqlalchemy import inspect, literal, text
+from sqlmodel import SQLModel, create_engine
 
 # Single engine used across the app (matches original app.py)
 engine = create_engine(
     "sqlite:///db.sqlite3", connect_args={"check_same_thread": False}
 )
+
+
+def add_missing_columns() -> None:
+    """Add columns that models gained since their tables were created.
+
+    There are no migrations: `create_all` creates missing tables but
+    leaves existing ones alone. New columns get their model default.
+    """
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            have = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in have:
+                    continue
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{col.name}" '
+                ddl += col.type.compile(dialect=engine.dialect)
+                if col.default is not None and col.default.is_scalar:
+                    value = literal(col.default.arg).compile(
+                        dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+                    )
+                    ddl += f" DEFAULT {value}"
+                conn.execute(text(ddl))
+
+
+def create_missing_indexes() -> None:
+    """Create indexes that models declared after their tables existed."""
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
@@ -1,3 +1,4 @@
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, List
 import uuid
@@ -34,6 +35,8 @@ class Job(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     kerf_mm: Optional[int] = None
     allow_rotation: bool = True
+    # Last time a cabinet or piece of the job changed (see api.reoptimise)
+    pieces_changed_at: Optional[datetime] = None
     # todo allow rotation should be moved to the sheet
 
 
@@ -58,7 +61,7 @@ class Sheet(SQLModel, table=True):
 class Cabinet(SQLModel, table=True):
     id: str = Field(default_factory=guid, primary_key=True)
     name: str
-    job_id: str = Field(foreign_key="job.id")
+    job_id: str = Field(foreign_key="job.id", index=True)
     job: Optional[Job] = Relationship(back_populates="cabinets")
     pieces: List["Piece"] = Relationship(back_populates="cabinet")
 
@@ -74,7 +77,7 @@ class UserCabinet(SQLModel, table=True):
 
 class Piece(SQLModel, table=True):
     id: str = Field(default_factory=guid, primary_key=True)
-    cabinet_id: str = Field(foreign_key="cabinet.id")
+    cabinet_id: str = Field(foreign_key="cabinet.id", index=True)
     colour_id: Optional[str] = Field(foreign_key="colour.id")
     name: Optional[str] = None
     width: int = 0
@@ -100,7 +103,7 @@ class UserPiece(SQLModel, table=True):
 
 class Placement(SQLModel, table=True):
     id: str = Field(default_factory=guid, primary_key=True)
-    placement_group_id: str = Field(foreign_key="placement_group.id")
+    placement_group_id: str = Field(foreign_key="placement_group.id", index=True)
     sheet_id: str = Field(foreign_key="sheet.id")
     piece_id: str = Field(foreign_key="piece.id")
     x: int
@@ -109,6 +112,11 @@ class Placement(SQLModel, table=True):
     h: int
     angle: int = 0  # degrees of rotation
     sheet_index: int = 1
+    # Polygons: the piece's outline turned by ``angle`` about the origin,
+    # then moved by (tx, ty), and the placed outline itself as WKB
+    tx: Optional[float] = None
+    ty: Optional[float] = None
+    outline_wkb: Optional[bytes] = None
 
     placement_group: Optional["PlacementGroup"] = Relationship(
         back_populates="placements"
@@ -117,14 +125,55 @@ class Placement(SQLModel, table=True):
 
 class PlacementGroup(SQLModel, table=True):
     __tablename__ = "placement_group"
+    # A job's newest group is looked up on every layout page and export
+    __table_args__ = (Index("ix_placement_group_job_id_date", "job_id", "date"),)
     id: str = Field(default_factory=guid, primary_key=True)
     optimise_method: Optional[str] = None
     date: datetime = Field(default_factory=datetime.utcnow)
     job_id: Optional[str] = Field(default=None, foreign_key="job.id")
+    # Set once the job's pieces changed after this layout was made
+    stale: bool = False
+    # The `pack` options the layout was made with, as JSON
+    options_json: Optional[str] = None
     job: Optional[Job] = Relationship(back_populates="placement_groups")
     placements: List[Placement] = Relationship(back_populates="placement_group")
 
 
+class LayoutTask(SQLModel, table=True):
+    """A queued layout computation; see `api.layout_tasks`."""
+
+    __tablename__ = "layout_task"
+    id: str = Field(default_factory=guid, primary_key=True)
+    job_id: str = Field(foreign_key="job.id", index=True)
+    # "queued", "running", "done", "failed" or "cancelled"
+    status: str = Field(default="queued", index=True)
+    # Fraction of the work done, 0 to 1
+    progress: float = 0.0
+    # The LayoutRequest body, as JSON
+    params_json: str
+    # Layout as returned by pack(), as JSON, once done
+    result_json: Optional[str] = None
+    placement_group_id: Optional[str] = Field(
+        default=None, foreign_key="placement_group.id"
+    )
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class LayoutCacheEntry(SQLModel, table=True):
+    """A computed layout, keyed by `services.layout_cache.layout_key`."""
+
+    __tablename__ = "layout_cache"
+    key: str = Field(primary_key=True)
+    # Layout with piece ids replaced by slots, as JSON
+    result_json: str
+    hits: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    last_used: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
 class RefreshToken(SQLModel, table=True):
     __tablename__ = "refresh_token"
     id: str = Field(default_factory=guid, primary_key=True)
@@ -0,0 +1,66 @@
+"""Joined reads for the hot paths: a job's pieces and a saved layout.
+
+Each function takes an open session and loads what a page or an export
+needs in a single query, joining down from the job (or placement group)
+instead of fetching each table by ids from the one before. The joins run
+on the indexes declared in `models`.
+"""
+
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from models import Cabinet, Job, Piece, Placement, PlacementGroup, Sheet
+
+
+class JobPieces(NamedTuple):
+    job: Job
+    cabinets: List[Cabinet]
+    pieces: List[Piece]
+
+
+def load_job_pieces(s: Session, pid: str) -> Optional[JobPieces]:
+    """The job with its cabinets and their pieces, or None if there's no job."""
+    rows = s.exec(
+        select(Job, Cabinet, Piece)
+        .outerjoin(Cabinet, Cabinet.job_id == Job.id)
+        .outerjoin(Piece, Piece.cabinet_id == Cabinet.id)
+        .where(Job.id == pid)
+    ).all()
+    if not rows:
+        return None
+    cabinets = {}
+    pieces = []
+    for _, cabinet, piece in rows:
+        if cabinet is not None:
+            cabinets.setdefault(cabinet.id, cabinet)
+        if piece is not None:
+            pieces.append(piece)
+    return JobPieces(rows[0][0], list(cabinets.values()), pieces)
+
+
+def latest_group(
+    s: Session, pid: str, current: bool = False
+) -> Optional[PlacementGroup]:
+    """The job's newest placement group; with ``current``, the newest one
+    still matching the job's pieces."""
+    query = select(PlacementGroup).where(PlacementGroup.job_id == pid)
+    if current:
+        query = query.where(PlacementGroup.stale == False)  # noqa: E712
+    return s.exec(query.order_by(PlacementGroup.date.desc())).first()
+
+
+def group_placements(
+    s: Session, group_id: str, deleted: bool = False
+) -> List[Tuple[Placement, Optional[Piece], Optional[Sheet], Optional[Cabinet]]]:
+    """Every placement of a group with its piece, sheet and cabinet,
+    in sheet order. Placements of deleted pieces are left out, unless
+    ``deleted`` asks for them (with None for the piece)."""
+    return s.exec(
+        select(Placement, Piece, Sheet, Cabinet)
+        .join(Piece, Placement.piece_id == Piece.id, isouter=deleted)
+        .outerjoin(Sheet, Placement.sheet_id == Sheet.id)
+        .outerjoin(Cabinet, Piece.cabinet_id == Cabinet.id)
+        .where(Placement.placement_group_id == group_id)
+        .order_by(Placement.sheet_index)
+    ).all()
@@ -1,19 +1,23 @@
 """Shared detection and optional dependency imports for the optimiser.
 
 This module centralises the optional imports (shapely, pyclipper) so the
-packers can import the same symbols without repeating detection logic.
+packers can import the same symbols without repeating detection logic. It
+also holds the small helpers every packer needs to agree on, such as how
+two layouts are compared.
 """
 
-from typing import Any
+from typing import Any, Dict, List, Tuple
 
 # Optional deps for irregular nesting
 try:
+    import shapely  # type: ignore
     from shapely.geometry import Polygon, box  # type: ignore
     from shapely.affinity import rotate as shp_rotate, translate as shp_translate  # type: ignore
     from shapely.ops import unary_union  # type: ignore
 
     _HAS_SHAPELY = True
 except Exception:
+    shapely = None  # type: ignore
     Polygon = None  # type: ignore
     box = None  # type: ignore
     shp_rotate = None  # type: ignore
@@ -31,8 +35,84 @@ except Exception:
 
 _IRREGULAR_DEPS_OK = _HAS_SHAPELY
 
+
+def polygons_as_bboxes(pieces: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Replace polygon pieces by their bounding boxes for the rect packers."""
+    rect_like = []
+    for p in pieces:
+        if "polygon" in p and p["polygon"]:
+            xs = [pt[0] for pt in p["polygon"]]
+            ys = [pt[1] for pt in p["polygon"]]
+            w = max(xs) - min(xs)
+            h = max(ys) - min(ys)
+            rect_like.append(
+                {
+                    "id": p["id"],
+                    "width": int(round(w)),
+                    "height": int(round(h)),
+                    "name": p.get("name"),
+                }
+            )
+        else:
+            rect_like.append(p)
+    return rect_like
+
+
+def unplaced_entries(pieces: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """``"unplaced"`` entries for ``pieces``; polygons give their bbox."""
+    return [
+        {
+            "piece_id": p["id"],
+            "name": p.get("name") or p["id"],
+            "w": int(p["width"]),
+            "h": int(p["height"]),
+        }
+        for p in polygons_as_bboxes(pieces)
+    ]
+
+
+def truncated_layout(pieces: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Layout of a run stopped before it placed anything."""
+    return {"sheets": [], "unplaced": unplaced_entries(pieces), "truncated": True}
+
+
+def sheet_used_area(sheet: Dict[str, Any]) -> float:
+    polys = sheet.get("polygons") or []
+    poly_ids = {pg.get("piece_id") for pg in polys}
+    area = 0.0
+    for pg in polys:
+        pts = pg.get("points") or []
+        # Shoelace formula; avoids needing shapely for rect-only layouts
+        acc = 0.0
+        for i in range(len(pts)):
+            x1, y1 = pts[i]
+            x2, y2 = pts[(i + 1) % len(pts)]
+            acc += x1 * y2 - x2 * y1
+        area += abs(acc) / 2.0
+    for r in sheet.get("rects") or []:
+        if r.get("piece_id") in poly_ids:
+            continue
+        area += float(r["w"]) * float(r["h"])
+    return area
+
+
+def layout_score(result: Dict[str, Any]) -> Tuple[float, ...]:
+    """Sort key for comparing layouts of the same pieces; lower is better.
+
+    Fewest unplaced pieces wins, then fewest sheets. On a tie the layout
+    whose last sheet holds the least material wins, as that packs the
+    earlier sheets tighter and leaves one large reusable offcut.
+    """
+    sheets = result.get("sheets") or []
+    unplaced = len(result.get("unplaced") or [])
+    if not sheets:
+        return (unplaced, 0, 0.0)
+    return (unplaced, len(sheets), sheet_used_area(sheets[-1]))
+
+
 # Re-export for convenience
 __all__ = [
+    "shapely",
     "Polygon",
     "box",
     "shp_rotate",
@@ -42,4 +122,9 @@ __all__ = [
     "_HAS_SHAPELY",
     "_HAS_PYCLIPPER",
     "_IRREGULAR_DEPS_OK",
+    "layout_score",
+    "sheet_used_area",
+    "unplaced_entries",
+    "truncated_layout",
+    "polygons_as_bboxes",
 ]
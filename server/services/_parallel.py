@@ -0,0 +1,152 @@
+"""Process-pool helper shared by the search-based packing modes.
+
+The portfolio and search modes all follow the same shape: run the same
+packing function over a list of argument tuples, keep the leading calls
+that finished inside a wall-clock budget and pick the best layout from those.
+"""
+
+import os
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+from .cancellation import CancelToken
+
+# How often (seconds) a pool run checks its cancel token
+CANCEL_POLL = 0.1
+
+
+def default_workers() -> int:
+    """Number of worker processes to use (``OPTIMISER_WORKERS`` overrides)."""
+    env = os.getenv("OPTIMISER_WORKERS")
+    if env:
+        try:
+            return max(1, int(env))
+        except ValueError:
+            pass
+    return max(1, min(os.cpu_count() or 1, 8))
+
+
+@contextmanager
+def worker_pool(max_workers: int) -> Iterator[Optional[ProcessPoolExecutor]]:
+    """One process pool for every `run_budgeted` call of a search, or None
+    (run inline) for a single worker.
+
+    Sharing the pool keeps a search to ``max_workers`` processes: calls
+    still running when a batch gives up on them hold up the next batch
+    instead of running beside it in a pool of their own. On exit the pool
+    is shut down without waiting for them.
+    """
+    if max_workers <= 1:
+        yield None
+        return
+    pool = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        yield pool
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_budgeted(
+    fn: Callable[..., Any],
+    args_list: Sequence[Tuple[Any, ...]],
+    time_budget: Optional[float] = None,
+    max_workers: Optional[int] = None,
+    cancel: Optional[CancelToken] = None,
+    executor: Optional[Executor] = None,
+) -> List[Tuple[int, Any]]:
+    """Run ``fn(*args)`` for every entry of ``args_list``.
+
+    Returns ``(index, result)`` pairs, in index order, for the longest run
+    of calls from the start of ``args_list`` that completed inside
+    ``time_budget`` seconds (no budget means wait for all of them); a call
+    that finished early but after one still running is dropped, so with the
+    same arguments the outcome only depends on how far the run got. Short
+    of a cancel, at least one result is always returned: if nothing
+    finished in time we keep waiting for the first call to complete. Calls
+    that raise are skipped unless every call raised, in which case the
+    first error is re-raised.
+
+    Once ``cancel`` is cancelled no further calls are started and the
+    results so far are returned, possibly none. Worker processes don't see
+    the cancel flag, so a pool run stops waiting for them at once; inline
+    runs finish the call in progress.
+
+    Calls go to ``executor`` when given (see `worker_pool`), which is left
+    running for the caller's next batch; only the calls that haven't
+    started are dropped from it. Otherwise a pool is made for this call.
+    """
+    if not args_list:
+        return []
+    workers = max_workers or default_workers()
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+
+    results: List[Tuple[int, Any]] = []
+    errors: List[BaseException] = []
+
+    if workers <= 1 or len(args_list) == 1:
+        # Run inline: avoids pool start-up cost for trivial portfolios.
+        for idx, args in enumerate(args_list):
+            if results and deadline is not None and time.monotonic() >= deadline:
+                break
+            if results and cancel is not None and cancel.cancelled():
+                break
+            try:
+                results.append((idx, fn(*args)))
+            except Exception as e:  # noqa: BLE001 - surfaced below if all fail
+                errors.append(e)
+        if not results and errors:
+            raise errors[0]
+        return results
+
+    pool = executor or ProcessPoolExecutor(max_workers=min(workers, len(args_list)))
+    futures: List[Future] = []
+    try:
+        futures = [pool.submit(fn, *args) for args in args_list]
+        # Calls are collected in index order, so the results always come
+        # from the first calls: the same ones on every run that got as far
+        for idx, fut in enumerate(futures):
+            if not _wait_for(fut, deadline, cancel, bool(results)):
+                break
+            exc = fut.exception()
+            if exc is not None:
+                errors.append(exc)
+            else:
+                results.append((idx, fut.result()))
+    finally:
+        # Don't block on stragglers once the budget is spent.
+        if executor is None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        else:
+            for fut in futures:
+                fut.cancel()
+
+    if not results and errors:
+        raise errors[0]
+    return results
+
+
+def _wait_for(
+    fut: Future,
+    deadline: Optional[float],
+    cancel: Optional[CancelToken],
+    have_result: bool,
+) -> bool:
+    """Wait until ``fut`` is done; False if the deadline or a cancel came
+    first. Without a result yet the deadline is ignored."""
+    while True:
+        if cancel is not None and cancel.cancelled():
+            return False
+        timeout = None
+        if deadline is not None:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                if have_result:
+                    return False
+                timeout = None  # keep waiting for the first result
+        if cancel is not None:
+            timeout = CANCEL_POLL if timeout is None else min(timeout, CANCEL_POLL)
+        done, _ = wait([fut], timeout=timeout)
+        if done:
+            return True
@@ -0,0 +1,78 @@
+"""Deadlines and cancellation for packing runs.
+
+A `CancelToken` is cancelled either explicitly (say, by the request
+handler once the client has gone away) or by passing its deadline, a
+`time.monotonic()` value. Packers check it between placements and inside
+their candidate loops; a run that is stopped returns what it has placed so
+far, lists the rest as ``"unplaced"`` and sets ``"truncated": True``.
+
+The monotonic clock is shared by every process on the machine, so a token
+sent to a worker process still stops at its deadline. The explicit cancel
+flag stays behind in the parent, which stops waiting for its workers
+instead (see `_parallel.run_budgeted`).
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class Cancelled(Exception):
+    """Raised inside a packer's loops when its token is cancelled."""
+
+
+class CancelToken:
+    def __init__(
+        self, deadline: Optional[float] = None, parent: Optional["CancelToken"] = None
+    ):
+        self.deadline = deadline
+        self.parent = parent
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return True
+        return self.parent is not None and self.parent.cancelled()
+
+    def check(self) -> None:
+        """Raise `Cancelled` if the token is cancelled."""
+        if self.cancelled():
+            raise Cancelled()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the earliest deadline, or None without one."""
+        deadlines = []
+        token: Optional[CancelToken] = self
+        while token is not None:
+            if token.deadline is not None:
+                deadlines.append(token.deadline)
+            token = token.parent
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def __reduce__(self):
+        # Events don't pickle; a token that is already cancelled goes over
+        # as one whose deadline has passed
+        deadline = 0.0 if self._event.is_set() else self.deadline
+        return (CancelToken, (deadline, self.parent))
+
+
+def stop_token(
+    deadline: Optional[float] = None, cancel: Optional[CancelToken] = None
+) -> CancelToken:
+    """One token for a packer's ``deadline`` and ``cancel`` arguments."""
+    if deadline is None and cancel is not None:
+        return cancel
+    return CancelToken(deadline, parent=cancel)
+
+
+def clamp_budget(budget: float, token: CancelToken) -> float:
+    """``budget`` seconds, cut down to what is left before the deadline."""
+    remaining = token.remaining()
+    return budget if remaining is None else min(budget, remaining)
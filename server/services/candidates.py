@@ -0,0 +1,136 @@
+"""Candidate positions for the heuristic placement mode.
+
+A candidate is a point where the bottom-left corner of a piece's bbox may
+go. Every placed piece contributes its vertices as contact points, plus
+their projections onto the bottom and left sheet edges, so pieces can
+slide in under or beside it. Points whose up-right neighbourhood is
+already covered by a placed piece can never take a bbox corner and are
+dropped as pieces arrive.
+
+Points are kept in a heap ordered by the placement objective (lowest,
+then leftmost), so placement can walk them best-first and stop at the
+first chunk that contains a feasible one.
+
+A crowded sheet can collect a great many points in gaps nothing fits any
+more. Past `MAX_CANDIDATES` live points, those with another point below
+and to the left of them are dropped. That is not done as a matter of
+course: a nested shape often fits at such a point but not at the one
+below it, and pruning on every piece costs sheets.
+"""
+
+import heapq
+from typing import Any, Iterator, List, Set, Tuple
+
+import numpy as np
+
+from ._optimiser_common import shapely
+from .spatial_index import GridIndex
+
+# Points closer than this (mm) are the same candidate
+_ROUND = 3
+
+# Size (mm) of the step up and to the right used to see whether a point is
+# covered by a placed piece
+_PROBE = 1e-3
+
+# Live points on a sheet beyond which dominated ones are dropped
+MAX_CANDIDATES = 2048
+
+
+class CandidateQueue:
+    """Heap of (y, x) candidate points on one sheet."""
+
+    def __init__(
+        self,
+        sheet_width: float,
+        sheet_height: float,
+        max_points: int = MAX_CANDIDATES,
+    ):
+        self.sheet_width = float(sheet_width)
+        self.sheet_height = float(sheet_height)
+        self.max_points = max_points
+        self._heap: List[Tuple[float, float]] = [(0.0, 0.0)]
+        self._alive: Set[Tuple[float, float]] = {(0.0, 0.0)}
+
+    def __len__(self) -> int:
+        return len(self._alive)
+
+    def __iter__(self) -> Iterator[Tuple[float, float]]:
+        """Live points as (x, y), best first. Doesn't consume the queue."""
+        heap = list(self._heap)
+        while heap:
+            y, x = heapq.heappop(heap)
+            if (y, x) in self._alive:
+                yield (x, y)
+
+    def chunks(self, first: int = 32) -> Iterator[List[Tuple[float, float]]]:
+        """Points best first in lists of growing size (``first``, 2x, 4x...)."""
+        size = first
+        chunk: List[Tuple[float, float]] = []
+        for point in self:
+            chunk.append(point)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+                size *= 2
+        if chunk:
+            yield chunk
+
+    def add_piece(self, geom: Any, placed: GridIndex) -> None:
+        """Drop points ``geom`` covers and add the contact points it makes.
+
+        ``placed`` is the sheet's `GridIndex`, already holding ``geom``;
+        new points covered by anything in it are not added.
+        """
+        if self._alive:
+            live = np.array(list(self._alive))
+            gone = _covered(geom, live[:, 1], live[:, 0])
+            for y, x in live[gone]:
+                self._alive.discard((float(y), float(x)))
+
+        # Vertices, and the same vertices dropped onto the left and bottom
+        # edges of the sheet
+        coords = shapely.get_coordinates(geom)
+        xs = np.concatenate((coords[:, 0], np.zeros(len(coords)), coords[:, 0]))
+        ys = np.concatenate((coords[:, 1], coords[:, 1], np.zeros(len(coords))))
+        xs = np.round(np.maximum(xs, 0.0), _ROUND) + 0.0
+        ys = np.round(np.maximum(ys, 0.0), _ROUND) + 0.0
+        keep = (xs < self.sheet_width) & (ys < self.sheet_height)
+        # Only pieces whose box holds a point can cover it
+        idx = np.flatnonzero(keep)
+        px, py = xs[idx] + _PROBE, ys[idx] + _PROBE
+        at, near = placed.query_points(px, py)
+        if at.size:
+            inside = shapely.contains_properly(near, shapely.points(px[at], py[at]))
+            keep[idx[at[inside]]] = False
+        for x, y in zip(xs[keep], ys[keep]):
+            key = (float(y), float(x))
+            if key not in self._alive:
+                self._alive.add(key)
+                heapq.heappush(self._heap, key)
+
+        if len(self._alive) > self.max_points:
+            self._drop_dominated()
+
+        # Drop dead entries once they make up most of the heap
+        if len(self._heap) > 2 * len(self._alive) + 64:
+            self._heap = sorted(self._alive)
+
+    def _drop_dominated(self) -> None:
+        # Lowest first: a point is dominated once a point no higher than
+        # it lies at or left of it
+        min_x = float("inf")
+        for y, x in sorted(self._alive):
+            if x >= min_x:
+                self._alive.discard((y, x))
+            else:
+                min_x = x
+
+
+def _covered(geom: Any, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    # A point is covered when the spot just up and to the right of it is
+    # inside the piece: no bbox corner can sit there
+    if len(xs) == 0:
+        return np.zeros(0, dtype=bool)
+    probes = shapely.points(np.asarray(xs) + _PROBE, np.asarray(ys) + _PROBE)
+    return shapely.contains_properly(geom, probes)
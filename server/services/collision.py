@@ -0,0 +1,203 @@
+"""Staged overlap tests between placed pieces.
+
+An exact overlap test is the most expensive thing the placers do, and most
+pairs it is asked about merely touch (candidate points are contact points)
+or sit squarely on top of each other. Pairs go through three stages and
+stop at the first one that can decide:
+
+1. bounding boxes that don't overlap with positive width can't overlap;
+2. a separating-axis test on the convex hulls: hulls that are separated or
+   only touch can't overlap, and two convex shapes with no separating axis
+   must overlap;
+3. the exact test on the polygons, for whatever is left (mostly concave
+   pieces nested into each other).
+
+Hulls and their projections are worked out once per shape, and a shape can
+be tested at an offset without building the moved polygon unless the exact
+stage needs it. Shapes made with ``integer=True`` also keep their integer
+Clipper paths, and the exact stage between two of them runs in
+`clipper_geometry` instead of shapely.
+
+`counters` reports how many pairs each stage decided since the last
+`reset`, to show how much exact geometry work was avoided. The counts are
+kept per thread, and `counting` gives one run counts of its own.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import clipper_geometry
+from ._optimiser_common import shapely, shp_translate
+from .nfp import CLIPPER_SCALE
+
+# Penetration depth (mm) above which convex shapes are known to overlap.
+# Shallower contacts go to the exact test, so rounding in the coordinates
+# can't turn a touch into an overlap.
+HULL_TOLERANCE = 1e-6
+
+STAGES = ("bbox", "hull", "exact")
+
+_local = threading.local()
+
+
+def _counts() -> Dict[str, int]:
+    counts = getattr(_local, "counts", None)
+    if counts is None:
+        counts = _local.counts = dict.fromkeys(STAGES, 0)
+    return counts
+
+
+def counters() -> Dict[str, int]:
+    """Pairs decided by each stage since the last `reset`, in this thread."""
+    return dict(_counts())
+
+
+def reset() -> None:
+    counts = _counts()
+    for k in counts:
+        counts[k] = 0
+
+
+@contextmanager
+def counting() -> Iterator[Dict[str, int]]:
+    """Count the pairs decided inside the block in a dict of their own.
+
+    On exit the counts are also added to the enclosing ones, so an outer
+    `counting` block (or `counters`) still sees them.
+    """
+    outer = _counts()
+    counts = dict.fromkeys(STAGES, 0)
+    _local.counts = counts
+    try:
+        yield counts
+    finally:
+        _local.counts = outer
+        for k, v in counts.items():
+            outer[k] += v
+
+
+def record(stage: str, n: int = 1) -> None:
+    """Count ``n`` pairs decided by ``stage`` (for callers with own stages)."""
+    _counts()[stage] += n
+
+
+class Shape(NamedTuple):
+    """A geometry with what the cheap stages need, computed once.
+
+    ``axes`` holds one (nx, ny, lo, hi) per edge direction of the hull:
+    the unit normal and the hull's extent along it. ``paths`` are the
+    integer Clipper paths, or None for the shapely backend.
+    """
+
+    geom: Any
+    bounds: Tuple[float, float, float, float]
+    hull: Tuple[Tuple[float, float], ...]
+    axes: Tuple[Tuple[float, float, float, float], ...]
+    convex: bool
+    paths: Optional[List[clipper_geometry.Path]] = None
+
+
+def make_shape(geom: Any, integer: bool = False) -> Shape:
+    hull_geom = geom.convex_hull
+    hull = tuple(map(tuple, shapely.get_coordinates(hull_geom)[:-1].tolist()))
+    axes = {}
+    for (x0, y0), (x1, y1) in zip(hull, hull[1:] + hull[:1]):
+        nx, ny = y0 - y1, x1 - x0
+        length = (nx * nx + ny * ny) ** 0.5
+        if length == 0:
+            continue
+        nx, ny = nx / length, ny / length
+        # Opposite edges give the same test; keep one of each direction
+        if nx < 0 or (nx == 0 and ny < 0):
+            nx, ny = -nx, -ny
+        key = (round(nx, 9), round(ny, 9))
+        if key not in axes:
+            lo, hi = _project(hull, nx, ny)
+            axes[key] = (nx, ny, lo, hi)
+    convex = geom.area >= hull_geom.area * (1 - 1e-9)
+    paths = clipper_geometry.to_paths(geom) if integer else None
+    return Shape(geom, tuple(geom.bounds), hull, tuple(axes.values()), convex, paths)
+
+
+def _project(points, nx: float, ny: float) -> Tuple[float, float]:
+    proj = [x * nx + y * ny for x, y in points]
+    return min(proj), max(proj)
+
+
+def _penetration(a: Shape, b: Shape, dx: float, dy: float) -> float:
+    # Smallest overlap of the hulls' projections, with ``a`` moved by
+    # (dx, dy); zero or less means a separating axis exists
+    if len(a.hull) < 3 or len(b.hull) < 3:
+        return 0.0
+    depth = float("inf")
+    moved = [(x + dx, y + dy) for x, y in a.hull]
+    for nx, ny, lo, hi in a.axes:
+        shift = nx * dx + ny * dy
+        blo, bhi = _project(b.hull, nx, ny)
+        depth = min(depth, min(hi + shift, bhi) - max(lo + shift, blo))
+        if depth <= 0.0:
+            return depth
+    for nx, ny, lo, hi in b.axes:
+        alo, ahi = _project(moved, nx, ny)
+        depth = min(depth, min(ahi, hi) - max(alo, lo))
+        if depth <= 0.0:
+            return depth
+    return depth
+
+
+def overlaps_any(
+    a: Shape,
+    others: Iterable[Shape],
+    min_area: float = 0.0,
+    offset: Tuple[float, float] = (0.0, 0.0),
+) -> bool:
+    """True if ``a`` moved by ``offset`` overlaps any of ``others``.
+
+    Overlapping means the interiors meet over more than ``min_area``;
+    shapes that only touch along an edge or at a corner don't overlap.
+    """
+    dx, dy = offset
+    ax0, ay0, ax1, ay1 = a.bounds
+    ax0, ay0, ax1, ay1 = ax0 + dx, ay0 + dy, ax1 + dx, ay1 + dy
+    moved = None
+    counts = _counts()
+    for b in others:
+        bx0, by0, bx1, by1 = b.bounds
+        if min(ax1, bx1) <= max(ax0, bx0) or min(ay1, by1) <= max(ay0, by0):
+            counts["bbox"] += 1
+            continue
+
+        depth = _penetration(a, b, dx, dy)
+        if depth <= 0.0:
+            counts["hull"] += 1
+            continue
+        if min_area == 0.0 and a.convex and b.convex and depth > HULL_TOLERANCE:
+            counts["hull"] += 1
+            return True
+
+        counts["exact"] += 1
+        if a.paths is not None and b.paths is not None:
+            if moved is None:
+                moved = clipper_geometry.translate(
+                    a.paths,
+                    int(round(dx * CLIPPER_SCALE)),
+                    int(round(dy * CLIPPER_SCALE)),
+                )
+            if clipper_geometry.overlap_area(moved, b.paths) > min_area:
+                return True
+            continue
+        if moved is None:
+            moved = shp_translate(a.geom, xoff=dx, yoff=dy) if dx or dy else a.geom
+        if min_area == 0.0:
+            # Interiors meet; cheaper than an intersection area
+            if shapely.relate_pattern(b.geom, moved, "T********"):
+                return True
+        elif b.geom.intersects(moved) and b.geom.intersection(moved).area > min_area:
+            return True
+    return False
+
+
+def overlaps(a: Shape, b: Shape, min_area: float = 0.0) -> bool:
+    """True if the interiors of ``a`` and ``b`` overlap by more than ``min_area``."""
+    return overlaps_any(a, (b,), min_area)
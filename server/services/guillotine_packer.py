@@ -0,0 +1,202 @@
+"""Native guillotine rectangle packer with true kerf handling.
+
+Unlike `rect_packer`, which pads every piece by the kerf, the kerf here is
+the width of each saw cut: it is only consumed between a piece and the
+offcut the cut separates it from, never along sheet edges or where a piece
+exactly fills the space it was put in. Positions are therefore the real
+positions of the pieces on the sheet.
+
+Free rectangles for every open sheet live in one set of parallel numpy
+arrays, so choosing where a piece goes is a handful of vectorised
+operations rather than a Python loop over rectpack's objects.
+"""
+
+from typing import Callable, List, Dict, Any, Optional
+
+import numpy as np
+
+from ._optimiser_common import unplaced_entries
+from .cancellation import CancelToken, stop_token
+
+
+class _FreeRects:
+    """Free rectangles of all open sheets as parallel, growable arrays."""
+
+    __slots__ = ("sheet", "x", "y", "w", "h", "n")
+
+    def __init__(self, capacity: int = 64):
+        self.sheet = np.empty(capacity, dtype=np.int64)
+        self.x = np.empty(capacity, dtype=np.int64)
+        self.y = np.empty(capacity, dtype=np.int64)
+        self.w = np.empty(capacity, dtype=np.int64)
+        self.h = np.empty(capacity, dtype=np.int64)
+        self.n = 0
+
+    def add(self, sheet: int, x: int, y: int, w: int, h: int) -> None:
+        if w <= 0 or h <= 0:
+            return
+        if self.n == len(self.x):
+            for name in ("sheet", "x", "y", "w", "h"):
+                arr = getattr(self, name)
+                grown = np.empty(len(arr) * 2, dtype=arr.dtype)
+                grown[: self.n] = arr[: self.n]
+                setattr(self, name, grown)
+        i = self.n
+        self.sheet[i] = sheet
+        self.x[i] = x
+        self.y[i] = y
+        self.w[i] = w
+        self.h[i] = h
+        self.n += 1
+
+    def remove(self, i: int) -> None:
+        # Order doesn't matter, so swap the last entry into the hole
+        last = self.n - 1
+        if i != last:
+            for arr in (self.sheet, self.x, self.y, self.w, self.h):
+                arr[i] = arr[last]
+        self.n = last
+
+    def best_fit(self, w: int, h: int, allow_rotation: bool):
+        """Index of the best-area-fit free rect and whether to rotate.
+
+        Ties go to the earliest sheet, then the lowest, leftmost position.
+        Returns None when no free rectangle can hold the piece.
+        """
+        n = self.n
+        if n == 0:
+            return None
+        fw = self.w[:n]
+        fh = self.h[:n]
+        best = None
+        orientations = [(w, h, False)]
+        if allow_rotation and w != h:
+            orientations.append((h, w, True))
+        for pw, ph, rotated in orientations:
+            idx = np.flatnonzero((fw >= pw) & (fh >= ph))
+            if idx.size == 0:
+                continue
+            waste = fw[idx] * fh[idx] - pw * ph
+            order = np.lexsort((self.x[idx], self.y[idx], self.sheet[idx], waste))
+            i = int(idx[order[0]])
+            key = (
+                int(waste[order[0]]),
+                int(self.sheet[i]),
+                int(self.y[i]),
+                int(self.x[i]),
+            )
+            if best is None or key < best[0]:
+                best = (key, i, rotated)
+        return None if best is None else (best[1], best[2])
+
+
+def _largest(*rects) -> int:
+    return max(max(r[2], 0) * max(r[3], 0) for r in rects)
+
+
+def pack_guillotine(
+    pieces: List[Dict[str, Any]],
+    sheet_width: int,
+    sheet_height: int,
+    allow_rotation: bool,
+    kerf: int,
+    deadline: Optional[float] = None,
+    cancel: Optional[CancelToken] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """Pack rectangular pieces with guillotine cuts of width ``kerf``.
+
+    Pieces are placed largest area first into the free rectangle that
+    leaves the least waste. After each placement the free rectangle is
+    split with two guillotine cuts; of the two possible cut orders the one
+    leaving the largest single offcut is kept. Output has the same shape
+    as `rect_packer.pack_rectangles`, and stops at ``deadline`` or on
+    ``cancel`` the same way. ``progress(done, total)`` is called after
+    each piece.
+    """
+    stop = stop_token(deadline, cancel)
+    sheet_width = int(sheet_width)
+    sheet_height = int(sheet_height)
+    kerf = max(0, int(kerf))
+
+    order = sorted(
+        pieces, key=lambda p: int(p["width"]) * int(p["height"]), reverse=True
+    )
+
+    free = _FreeRects()
+    sheets: List[Dict[str, Any]] = []
+    unplaced: List[Dict[str, Any]] = []
+
+    truncated = False
+    for k, p in enumerate(order):
+        if stop.cancelled():
+            truncated = True
+            unplaced.extend(unplaced_entries(order[k:]))
+            break
+        pid = p["id"]
+        name = p.get("name") or pid
+        w = int(p["width"])
+        h = int(p["height"])
+
+        fit = free.best_fit(w, h, allow_rotation)
+        if fit is None:
+            # Nothing open has room; try a fresh sheet
+            free.add(len(sheets), 0, 0, sheet_width, sheet_height)
+            fit = free.best_fit(w, h, allow_rotation)
+            if fit is None:
+                free.remove(free.n - 1)
+                unplaced.append({"piece_id": pid, "name": name, "w": w, "h": h})
+                continue
+            sheets.append(
+                {
+                    "index": len(sheets),
+                    "width": sheet_width,
+                    "height": sheet_height,
+                    "rects": [],
+                    "polygons": [],
+                }
+            )
+
+        i, rotated = fit
+        pw, ph = (h, w) if rotated else (w, h)
+        s = int(free.sheet[i])
+        fx, fy = int(free.x[i]), int(free.y[i])
+        fw, fh = int(free.w[i]), int(free.h[i])
+        free.remove(i)
+
+        sheets[s]["rects"].append(
+            {
+                "piece_id": pid,
+                "name": name,
+                "x": fx,
+                "y": fy,
+                "w": pw,
+                "h": ph,
+                "angle": 90 if rotated else 0,
+            }
+        )
+
+        # A cut is only needed where the piece doesn't reach the edge of the
+        # free rectangle; the saw then eats `kerf` of the offcut.
+        right_w = fw - pw - kerf if fw > pw else 0
+        top_h = fh - ph - kerf if fh > ph else 0
+
+        # Option A: horizontal cut first (top offcut spans the full width)
+        a_top = (fx, fy + ph + kerf, fw, top_h)
+        a_right = (fx + pw + kerf, fy, right_w, ph)
+        # Option B: vertical cut first (right offcut spans the full height)
+        b_top = (fx, fy + ph + kerf, pw, top_h)
+        b_right = (fx + pw + kerf, fy, right_w, fh)
+        if _largest(a_top, a_right) >= _largest(b_top, b_right):
+            parts = (a_top, a_right)
+        else:
+            parts = (b_top, b_right)
+        for rx, ry, rw, rh in parts:
+            free.add(s, rx, ry, rw, rh)
+        if progress is not None:
+            progress(k + 1, len(order))
+
+    result = {"sheets": sheets, "unplaced": unplaced}
+    if truncated:
+        result["truncated"] = True
+    return result
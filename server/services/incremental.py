@@ -0,0 +1,149 @@
+"""Incremental re-packing after a few pieces of a job changed.
+
+A full `pack` of a big job costs the same whether one piece changed or all
+of them. `repack` starts from the previous layout instead: sheets none of
+whose pieces changed stay exactly as they were, and only the pieces of the
+other sheets, together with the new and resized pieces, go through `pack`
+onto fresh sheets after them. The work done is then in proportion to the
+change rather than to the job.
+
+A sheet is reopened when it lost a piece (removed, or resized and so to be
+placed again). So are the last sheets of the layout, where the incoming
+pieces go: the last one, and those before it until together they have
+`HEADROOM` times the area of the incoming pieces free.
+"""
+
+import copy
+import math
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from ._optimiser_common import polygons_as_bboxes, sheet_used_area
+from .optimiser import pack
+
+# Free area the reopened last sheets need, per unit of incoming piece area
+HEADROOM = 1.5
+
+
+class PieceDiff(NamedTuple):
+    added: List[str]
+    removed: List[str]
+    resized: List[str]
+
+
+def _rotated(points: List[List[float]], angle: float) -> List[List[float]]:
+    a = math.radians(angle)
+    c, s = math.cos(a), math.sin(a)
+    return [[x * c - y * s, x * s + y * c] for x, y in points]
+
+
+def _normalised(points: List[List[float]]) -> List[List[float]]:
+    """``points`` moved so their bounding box starts at the origin."""
+    x0 = min(x for x, _ in points)
+    y0 = min(y for _, y in points)
+    return [[x - x0, y - y0] for x, y in points]
+
+
+def _same_points(a: List[List[float]], b: List[List[float]]) -> bool:
+    # Every vertex of each outline is within 1 mm of one of the other's;
+    # the order and starting vertex may differ after placement
+    def covered(p, q):
+        return all(any(abs(x - u) <= 1 and abs(y - v) <= 1 for u, v in q) for x, y in p)
+
+    return covered(a, b) and covered(b, a)
+
+
+def _outline(piece: Dict[str, Any]) -> List[List[float]]:
+    if piece.get("polygon"):
+        return piece["polygon"]
+    w, h = int(piece["width"]), int(piece["height"])
+    return [[0, 0], [w, 0], [w, h], [0, h]]
+
+
+def _same_shape(
+    entry: Dict[str, Any], polygon: Optional[Dict[str, Any]], piece: Dict[str, Any]
+) -> bool:
+    turned = _normalised(_rotated(_outline(piece), entry.get("angle", 0)))
+    if polygon is not None:
+        # Placed outlines hold the turned piece rounded to whole mm
+        return _same_points(turned, _normalised(polygon["points"]))
+    # Rect packers place the bounding box only
+    w = max(x for x, _ in turned)
+    h = max(y for _, y in turned)
+    return abs(w - entry["w"]) <= 1 and abs(h - entry["h"]) <= 1
+
+
+def diff_pieces(previous: Dict[str, Any], pieces: List[Dict[str, Any]]) -> PieceDiff:
+    """What changed between the pieces of ``previous`` and ``pieces``.
+
+    A piece counts as resized when its outline differs from the placed
+    one, even within the same bounding box. Pieces the previous layout left
+    unplaced count as added.
+    """
+    sheets = previous.get("sheets") or []
+    placed = {e["piece_id"]: e for sheet in sheets for e in sheet["rects"]}
+    polygons = {
+        pg["piece_id"]: pg for sheet in sheets for pg in sheet.get("polygons") or []
+    }
+    ids = {p["id"] for p in pieces}
+    return PieceDiff(
+        added=[p["id"] for p in pieces if p["id"] not in placed],
+        removed=[pid for pid in placed if pid not in ids],
+        resized=[
+            p["id"]
+            for p in pieces
+            if p["id"] in placed
+            and not _same_shape(placed[p["id"]], polygons.get(p["id"]), p)
+        ],
+    )
+
+
+def repack(
+    previous: Dict[str, Any],
+    pieces: List[Dict[str, Any]],
+    sheet_width: int,
+    sheet_height: int,
+    **options: Any,
+) -> Dict[str, Any]:
+    """Layout of ``pieces`` that keeps the unaffected sheets of ``previous``.
+
+    ``previous`` is a layout as `pack` returns it, of the same sheet size;
+    ``options`` are passed on to `pack` for the pieces that move.
+    """
+    diff = diff_pieces(previous, pieces)
+    sheets = previous.get("sheets") or []
+    if not (diff.added or diff.removed or diff.resized):
+        return copy.deepcopy(previous)
+
+    changed = set(diff.removed) | set(diff.resized)
+    reopen = {
+        i
+        for i, sheet in enumerate(sheets)
+        if any(e["piece_id"] in changed for e in sheet["rects"])
+    }
+    incoming = set(diff.added) | set(diff.resized)
+    need = HEADROOM * sum(
+        p["width"] * p["height"]
+        for p in polygons_as_bboxes(pieces)
+        if p["id"] in incoming
+    )
+    free = 0.0
+    first_open = len(sheets)
+    while first_open > 0 and (first_open == len(sheets) or free < need):
+        first_open -= 1
+        free += sheet_width * sheet_height - sheet_used_area(sheets[first_open])
+    reopen.update(range(first_open, len(sheets)))
+
+    kept = [copy.deepcopy(s) for i, s in enumerate(sheets) if i not in reopen]
+    kept_ids = {e["piece_id"] for sheet in kept for e in sheet["rects"]}
+    moving = [p for p in pieces if p["id"] not in kept_ids]
+    packed = (
+        pack(moving, sheet_width, sheet_height, **options) if moving else {"sheets": []}
+    )
+
+    out: Dict[str, Any] = {"sheets": kept + packed["sheets"]}
+    for index, sheet in enumerate(out["sheets"]):
+        sheet["index"] = index
+    for key in ("unplaced", "truncated"):
+        if packed.get(key):
+            out[key] = packed[key]
+    return out
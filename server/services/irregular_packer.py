@@ -1,17 +1,131 @@
-from typing import List, Dict, Any
-from math import ceil
+from typing import Callable, List, Dict, Any, NamedTuple, Optional, Tuple
+from math import atan2, ceil, cos, floor, hypot, radians, sin, sqrt
+
+import numpy as np
 
 from ._optimiser_common import (
     Polygon,
     box,
+    shapely,
     shp_rotate,
     shp_translate,
-    unary_union,
     pyclipper,
     _HAS_PYCLIPPER,
     _IRREGULAR_DEPS_OK,
+    layout_score,
+    sheet_used_area,
+)
+from . import clipper_geometry, collision
+from .cancellation import CancelToken, Cancelled, stop_token
+from .candidates import CandidateQueue
+from .pairing import complementary_pairs
+from .raster import OccupancyGrid, piece_mask
+from .spatial_index import GridIndex, MaximalRects
+from .nfp import (
+    AREA_EPS,
+    cached_nfp,
+    feasible_vertices,
+    geometry_key,
+    inner_fit_rect,
+    rotated_variant,
 )
 
+# Cell size (mm) of the raster engine; the same step the exhaustive mode uses
+RASTER_STEP = 5
+
+# Candidates tested per round in heuristic mode; later rounds double it
+CANDIDATE_CHUNK = 32
+
+# Pockets (mm²) smaller than this aren't worth trying pieces against
+POCKET_MIN_AREA = 100.0
+
+# Geometry backends of pack_irregular: shapely floats, or integer Clipper
+GEOMETRY_BACKENDS = ("shapely", "clipper")
+
+# Modes that pre-nest interlocking pieces unless told otherwise; the slower
+# modes would pay for a second, plain run on most jobs that nest
+PRE_NEST_MODES = ("heuristic",)
+
+# Below this many (candidate, angle) pairs the heuristic tests candidates
+# one at a time instead of as a geometry array
+BATCH_MIN_CANDIDATES = 64
+
+
+class Variant(NamedTuple):
+    """One rotation of a piece, normalised so its bbox starts at (0, 0).
+
+    ``base`` and ``inflated`` share the inflated shape's bbox, so both are
+    placed with the same translation. ``tight`` is the base shape on its own
+    bbox, used when a piece is placed without kerf clearance. ``hull`` and
+    ``tight_hull`` are the collision shapes of ``inflated`` and ``tight``.
+    """
+
+    angle: int
+    base: Any
+    inflated: Any
+    tight: Any
+    w: float
+    h: float
+    tight_w: float
+    tight_h: float
+    area: float
+    hull: collision.Shape
+    tight_hull: collision.Shape
+
+
+def piece_variants(
+    base: Any, inflated: Any, angles, integer: bool = False
+) -> Tuple[Variant, ...]:
+    """Rotate and normalise a piece once for every angle in ``angles``.
+
+    Rotations that give the same shape as an earlier angle (every 180° for
+    a rectangle) are dropped: they could never win a placement, since ties
+    go to the earlier angle anyway. Shapes are prepared, so the covers and
+    intersects tests run against them stay cheap. With ``integer`` the
+    rotated shapes are snapped onto Clipper's integer grid.
+    """
+    variants = []
+    seen = set()
+    for angle in angles:
+        inf_norm, minx, miny = rotated_variant(inflated, angle)
+        base_rot = shp_rotate(base, angle, origin=(0, 0), use_radians=False)
+        base_norm = shp_translate(base_rot, xoff=-minx, yoff=-miny)
+        tight, _, _ = rotated_variant(base, angle)
+        if integer:
+            base_norm, inf_norm, tight = (
+                clipper_geometry.snap(g) for g in (base_norm, inf_norm, tight)
+            )
+        shape = (_shape_signature(base_norm), _shape_signature(inf_norm))
+        if shape in seen:
+            continue
+        seen.add(shape)
+        for g in (base_norm, inf_norm, tight):
+            shapely.prepare(g)
+        _, _, w, h = inf_norm.bounds
+        _, _, tw, th = tight.bounds
+        variants.append(
+            Variant(
+                angle,
+                base_norm,
+                inf_norm,
+                tight,
+                w,
+                h,
+                tw,
+                th,
+                inf_norm.area,
+                collision.make_shape(inf_norm, integer),
+                collision.make_shape(tight, integer),
+            )
+        )
+    return tuple(variants)
+
+
+def _shape_signature(poly: Any) -> Tuple:
+    # Vertex set rounded to 1e-6 mm; independent of the start vertex
+    coords = shapely.get_coordinates(poly)[:-1]
+    return tuple(sorted(map(tuple, (coords.round(6) + 0.0).tolist())))
+
 
 def pack_irregular(
     pieces: List[Dict[str, Any]],
@@ -20,12 +134,101 @@ def pack_irregular(
     allow_rotation: bool,
     kerf: int,
     packing_mode: str = "heuristic",
+    sort_pieces: bool = True,
+    existing_sheets: Optional[List[Dict[str, Any]]] = None,
+    geometry_backend: str = "shapely",
+    pre_nest: Optional[bool] = None,
+    deadline: Optional[float] = None,
+    cancel: Optional[CancelToken] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
 ) -> Dict[str, Any]:
     """Pack polygon (irregular) pieces. Extracted from original _pack_irregular.
 
-    Requires shapely (and optionally pyclipper) installed.
+    Requires shapely (and optionally pyclipper) installed. Pieces are placed
+    largest first unless ``sort_pieces`` is False, in which case the given
+    order is kept (used by the search modes). A piece may carry an
+    ``"angles"`` list to restrict the angles it is tried at when rotation is
+    allowed.
+
+    ``existing_sheets`` are sheets already filled by another packer (same
+    output shape). Their rects become obstacles, with the same kerf
+    clearance as placed pieces, and polygons go into the space left before
+    any new sheet is opened.
+
+    ``geometry_backend`` is one of `GEOMETRY_BACKENDS`. ``"clipper"`` keeps
+    coordinates on an integer grid of 1/1000 mm and does offsetting,
+    repairs and exact overlap tests with pyclipper's integer arithmetic:
+    pieces that share an edge overlap by exactly zero, and kerf offsets
+    need no `buffer(0)` clean-up. Placement candidates are then tested one
+    at a time rather than as a shapely geometry array.
+
+    In heuristic mode every sheet also keeps its free region (the sheet
+    minus everything placed) and the pockets in it: the parts of concave
+    pieces' convex hulls that are still free, like the inside corner of an
+    L. Pieces small enough for a pocket are tried against its corners
+    before the usual candidates, which only come from bbox corners.
+
+    With ``pre_nest`` (by default in `PRE_NEST_MODES`), concave pieces that
+    interlock (see `pairing`) are merged into compound pieces before
+    placement. They are placed as one and reported as their original
+    pieces. When any pair was merged and the layout uses more sheets than
+    the pieces' area needs, the pieces are also packed without merging and
+    the better layout is returned.
+
+    Once ``deadline`` (a `time.monotonic()` value) passes or ``cancel`` is
+    cancelled, placement stops, also partway through a piece. Pieces not
+    placed by then are listed under ``"unplaced"`` with their bbox sizes,
+    and the result gets ``"truncated": True``. ``progress(done, total)``
+    is called after each placement (a compound counts once); a nested run
+    that may be followed by a plain one reports up to half way.
+
+    ``"collision_stats"`` holds how many piece pairs each `collision` stage
+    decided during the run (see `collision.counting`).
     """
+    with collision.counting() as counts:
+        result = _pack_irregular(
+            pieces,
+            sheet_width,
+            sheet_height,
+            allow_rotation,
+            kerf,
+            packing_mode,
+            sort_pieces,
+            existing_sheets,
+            geometry_backend,
+            pre_nest,
+            deadline,
+            cancel,
+            progress,
+        )
+    result["collision_stats"] = counts
+    return result
+
+
+def _pack_irregular(
+    pieces: List[Dict[str, Any]],
+    sheet_width: int,
+    sheet_height: int,
+    allow_rotation: bool,
+    kerf: int,
+    packing_mode: str = "heuristic",
+    sort_pieces: bool = True,
+    existing_sheets: Optional[List[Dict[str, Any]]] = None,
+    geometry_backend: str = "shapely",
+    pre_nest: Optional[bool] = None,
+    deadline: Optional[float] = None,
+    cancel: Optional[CancelToken] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
     assert _IRREGULAR_DEPS_OK, "Shapely required for polygon packing"
+    if geometry_backend not in GEOMETRY_BACKENDS:
+        raise ValueError(f"Unknown geometry backend {geometry_backend!r}")
+    integer = geometry_backend == "clipper"
+    if integer and not _HAS_PYCLIPPER:
+        raise ValueError("The clipper geometry backend requires pyclipper")
+    stop = stop_token(deadline, cancel)
+    if pre_nest is None:
+        pre_nest = packing_mode in PRE_NEST_MODES
 
     angle_step = 90 if not allow_rotation else 15
     angles = [a for a in range(0, 360, angle_step)] if allow_rotation else [0]
@@ -42,7 +245,7 @@ def pack_irregular(
             pts = [(float(x), float(y)) for x, y in p["polygon"]]
             poly = Polygon(pts)
             if not poly.is_valid:
-                poly = poly.buffer(0)
+                poly = clipper_geometry.repair(poly) if integer else poly.buffer(0)
         else:
             w = float(p["width"])
             h = float(p["height"])
@@ -51,7 +254,17 @@ def pack_irregular(
         if poly.area <= 0:
             raise ValueError(f"Piece {pid} has non-positive area")
 
-        inflated = _offset_polygon(poly, kerf_clearance) if kerf_clearance > 0 else poly
+        if integer:
+            poly = clipper_geometry.snap(poly)
+        inflated = (
+            _offset_polygon(poly, kerf_clearance, integer)
+            if kerf_clearance > 0
+            else poly
+        )
+
+        piece_angles = angles
+        if allow_rotation and p.get("angles"):
+            piece_angles = [int(a) % 360 for a in p["angles"]]
 
         norm_pieces.append(
             {
@@ -59,134 +272,240 @@ def pack_irregular(
                 "name": name,
                 "base": poly,
                 "inflated": inflated,
+                "base_key": geometry_key(poly),
+                "inflated_key": geometry_key(inflated),
+                "angles": tuple(piece_angles),
             }
         )
 
-    norm_pieces.sort(key=lambda it: it["inflated"].area, reverse=True)
+    nested = False
+    if pre_nest:
+        count = len(norm_pieces)
+        norm_pieces = _pre_nest(
+            norm_pieces,
+            tuple(angles),
+            allow_rotation,
+            sheet_width,
+            sheet_height,
+            integer,
+        )
+        nested = len(norm_pieces) < count
+
+    # Rotating and normalising is the same work for every sheet and every
+    # copy of a part, so do it once per distinct shape up front
+    variant_cache: Dict[Tuple, Tuple[Variant, ...]] = {}
+    mask_cache: Dict[Tuple, Dict] = {}
+    inner_cache: Dict[Tuple, np.ndarray] = {}
+    for it in norm_pieces:
+        key = (it["base_key"], it["inflated_key"], it["angles"])
+        if key not in variant_cache:
+            variant_cache[key] = piece_variants(
+                it["base"], it["inflated"], it["angles"], integer
+            )
+            mask_cache[key] = {}
+            inner_cache[key] = np.array(
+                [_inner_box(v.inflated) for v in variant_cache[key]]
+            )
+        it["shape_key"] = key
+        it["variants"] = variant_cache[key]
+        # Axis-aligned box inside the piece at each angle, for sheet pruning
+        it["inner_boxes"] = inner_cache[key]
+        # Raster masks, filled in lazily and shared between copies of a part
+        it["masks"] = mask_cache[key]
+
+    if sort_pieces:
+        norm_pieces.sort(key=lambda it: it["inflated"].area, reverse=True)
 
     sheets: List[Dict[str, Any]] = []
+    use_pockets = packing_mode not in ("simple", "exhaustive", "raster", "nfp")
 
     # Helper to ensure a sheet has internal tracking lists
     def _ensure_internal(sheet: Dict[str, Any]):
-        sheet.setdefault("_placed_inflated", [])
-        sheet.setdefault("_candidates", [(0.0, 0.0)])
+        # Cells of roughly 1/8 of the sheet keep buckets small on big sheets
+        sheet.setdefault(
+            "_index",
+            GridIndex(max(50.0, max(sheet_width, sheet_height) / 8.0), integer),
+        )
+        sheet.setdefault("_candidates", CandidateQueue(sheet_width, sheet_height))
+        sheet.setdefault("_placed_nfp", [])
+        sheet.setdefault("_free_area", float(sheet_width) * float(sheet_height))
+        sheet.setdefault("_free_rects", MaximalRects(sheet_width, sheet_height))
+        # Shapes that already failed to go on the sheet as it is now
+        sheet.setdefault("_failed", set())
+        if packing_mode == "raster" and "_raster" not in sheet:
+            sheet["_raster"] = OccupancyGrid(sheet_width, sheet_height, RASTER_STEP)
+        if use_pockets:
+            sheet.setdefault("_free", sheet_poly)
+            sheet.setdefault("_pockets", [])
         return sheet
 
-    # Start with one sheet
-    sheets.append(_ensure_internal(_new_sheet(0, sheet_width, sheet_height)))
+    def _occupy(sheet: Dict[str, Any], inflated_abs, nfp_entry=None):
+        # Record a placed shape (with its clearance) in the sheet's indexes
+        sheet["_index"].insert(inflated_abs)
+        sheet["_free_area"] -= inflated_abs.area
+        sheet["_free_rects"].add_obstacle(_inner_box(inflated_abs))
+        sheet["_failed"].clear()
+        if packing_mode == "nfp":
+            if nfp_entry is None:
+                minx, miny, _, _ = inflated_abs.bounds
+                norm = shp_translate(inflated_abs, xoff=-minx, yoff=-miny)
+                nfp_entry = ((geometry_key(norm), None), norm, minx, miny)
+            sheet["_placed_nfp"].append(nfp_entry)
+        elif packing_mode == "raster":
+            sheet["_raster"].add(inflated_abs)
+        elif packing_mode not in ("simple", "exhaustive"):
+            sheet["_candidates"].add_piece(inflated_abs, sheet["_index"])
+        if use_pockets:
+            sheet["_free"], sheet["_pockets"] = _update_pockets(
+                sheet["_free"], sheet["_pockets"], inflated_abs, integer
+            )
+
+    for existing in existing_sheets or []:
+        sheet = _ensure_internal(
+            dict(
+                existing,
+                index=len(sheets),
+                rects=list(existing.get("rects") or []),
+                polygons=list(existing.get("polygons") or []),
+            )
+        )
+        for r in sheet["rects"]:
+            x0, y0 = float(r["x"]), float(r["y"])
+            obstacle = box(x0, y0, x0 + float(r["w"]), y0 + float(r["h"]))
+            if kerf_clearance > 0:
+                obstacle = _offset_polygon(obstacle, kerf_clearance, integer)
+            _occupy(sheet, obstacle)
+        sheets.append(sheet)
+    kept_sheets = len(sheets)
+
+    if not sheets:
+        # Start with one sheet
+        sheets.append(_ensure_internal(_new_sheet(0, sheet_width, sheet_height)))
+
+    def _try_place(item, sheet: Dict[str, Any], use_inflated: bool = True):
+        placed_index = sheet["_index"]
+        if packing_mode == "simple":
+            return _place_on_sheet_simple(
+                item,
+                sheet_poly,
+                placed_index,
+                use_inflated=use_inflated,
+                integer=integer,
+                stop=stop,
+            )
+        if packing_mode == "exhaustive":
+            return _place_on_sheet_exhaustive(
+                item, sheet_poly, placed_index, use_inflated=use_inflated, stop=stop
+            )
+        if packing_mode == "raster":
+            return _place_on_sheet_raster(
+                item,
+                sheet["_raster"],
+                placed_index,
+                use_inflated=use_inflated,
+                stop=stop,
+            )
+        if packing_mode == "nfp":
+            return _place_on_sheet_nfp(
+                item,
+                sheet_poly,
+                placed_index,
+                sheet["_placed_nfp"],
+                use_inflated=use_inflated,
+                integer=integer,
+                stop=stop,
+            )
+        placed = _place_in_pocket(
+            item, sheet_poly, placed_index, sheet["_pockets"], use_inflated, stop
+        )
+        if placed is not None:
+            return placed
+        return _place_on_sheet(
+            item,
+            sheet_poly,
+            placed_index,
+            sheet["_candidates"],
+            use_inflated=use_inflated,
+            free_rects=sheet["_free_rects"],
+            batch=not integer,
+            stop=stop,
+        )
 
-    for item in norm_pieces:
+    unplaced: List[Dict[str, Any]] = []
+    for n, item in enumerate(norm_pieces):
         placed = None
         target_sheet = None
 
-        # Try to fit on any existing sheet before opening a new one
-        for sh in sheets:
-            placed_inflated = sh["_placed_inflated"]
-            candidates = sh["_candidates"]
-            if packing_mode == "simple":
-                placed = _place_on_sheet_simple(
-                    item, sheet_poly, placed_inflated, use_inflated=True
-                )
-            elif packing_mode == "exhaustive":
-                placed = _place_on_sheet_exhaustive(
-                    item, sheet_poly, placed_inflated, angles, use_inflated=True
-                )
-            else:
-                placed = _place_on_sheet(
-                    item,
-                    sheet_poly,
-                    placed_inflated,
-                    candidates,
-                    angles,
-                    use_inflated=True,
-                )
-            if placed:
-                target_sheet = sh
-                break
+        try:
+            stop.check()
+            # Try to fit on any existing sheet before opening a new one
+            for sh in sheets:
+                if item["shape_key"] in sh["_failed"] or not _may_fit(item, sh):
+                    continue
+                placed = _try_place(item, sh)
+                if placed:
+                    target_sheet = sh
+                    break
+                # Placement is deterministic, so it fails again until the
+                # sheet changes
+                sh["_failed"].add(item["shape_key"])
 
-        if not placed:
-            # Need a new sheet
-            new_sheet = _ensure_internal(
-                _new_sheet(len(sheets), sheet_width, sheet_height)
-            )
-            sheets.append(new_sheet)
-            placed_inflated = new_sheet["_placed_inflated"]
-            candidates = new_sheet["_candidates"]
-            if packing_mode == "simple":
-                placed = _place_on_sheet_simple(
-                    item, sheet_poly, placed_inflated, use_inflated=True
-                )
-            elif packing_mode == "exhaustive":
-                placed = _place_on_sheet_exhaustive(
-                    item, sheet_poly, placed_inflated, angles, use_inflated=True
-                )
-            else:
-                placed = _place_on_sheet(
-                    item,
-                    sheet_poly,
-                    placed_inflated,
-                    candidates,
-                    angles,
-                    use_inflated=True,
-                )
             if not placed:
-                # Fallback: try without inflated clearance ONLY on the fresh empty sheet
-                if packing_mode == "simple":
-                    placed = _place_on_sheet_simple(
-                        item, sheet_poly, placed_inflated, use_inflated=False
-                    )
-                elif packing_mode == "exhaustive":
-                    placed = _place_on_sheet_exhaustive(
-                        item, sheet_poly, placed_inflated, angles, use_inflated=False
-                    )
-                else:
-                    placed = _place_on_sheet(
-                        item,
-                        sheet_poly,
-                        placed_inflated,
-                        candidates,
-                        angles,
-                        use_inflated=False,
-                    )
+                # Need a new sheet
+                new_sheet = _ensure_internal(
+                    _new_sheet(len(sheets), sheet_width, sheet_height)
+                )
+                sheets.append(new_sheet)
+                placed = _try_place(item, new_sheet)
                 if not placed:
-                    raise RuntimeError(
-                        f"Failed to place piece {item['id']} on an empty sheet (check dimensions)"
-                    )
-            target_sheet = new_sheet
+                    # Fallback: try without inflated clearance ONLY on the fresh empty sheet
+                    placed = _try_place(item, new_sheet, use_inflated=False)
+                    if not placed:
+                        raise RuntimeError(
+                            f"Failed to place piece {item['id']} on an empty sheet (check dimensions)"
+                        )
+                target_sheet = new_sheet
+        except Cancelled:
+            unplaced = [u for it in norm_pieces[n:] for u in _unplaced_entries(it)]
+            break
 
-        base_abs, inflated_abs, angle_deg = placed
-        target_sheet["_placed_inflated"].append(inflated_abs)
+        base_abs, inflated_abs, angle_deg = placed[:3]
+        _occupy(target_sheet, inflated_abs, placed[3] if len(placed) > 3 else None)
 
-        coords = list(base_abs.exterior.coords)[:-1]
-        target_sheet["polygons"].append(
-            {
-                "piece_id": item["id"],
-                "name": item["name"],
-                "angle": angle_deg,
-                "points": [[int(round(x)), int(round(y))] for (x, y) in coords],
-            }
-        )
-
-        minx, miny, maxx, maxy = base_abs.bounds
-        target_sheet["rects"].append(
-            {
-                "piece_id": item["id"],
-                "name": item["name"],
-                "x": int(round(minx)),
-                "y": int(round(miny)),
-                "w": int(round(maxx - minx)),
-                "h": int(round(maxy - miny)),
-                "angle": int(angle_deg),
-            }
-        )
+        for pid, name, poly, angle, offset in _expand_members(
+            item, base_abs, angle_deg
+        ):
+            coords = list(poly.exterior.coords)[:-1]
+            target_sheet["polygons"].append(
+                {
+                    "piece_id": pid,
+                    "name": name,
+                    "angle": angle,
+                    "points": [[int(round(x)), int(round(y))] for (x, y) in coords],
+                    "offset": [round(offset[0], 3), round(offset[1], 3)],
+                }
+            )
 
-        # Update candidates for heuristic mode
-        if packing_mode not in ("simple", "exhaustive"):
-            bx_min, by_min, bx_max, by_max = inflated_abs.bounds
-            target_sheet["_candidates"].extend([(bx_max, by_min), (bx_min, by_max)])
-            target_sheet["_candidates"] = _prune_candidates(
-                target_sheet["_candidates"], sheet_width, sheet_height
+            minx, miny, maxx, maxy = poly.bounds
+            target_sheet["rects"].append(
+                {
+                    "piece_id": pid,
+                    "name": name,
+                    "x": int(round(minx)),
+                    "y": int(round(miny)),
+                    "w": int(round(maxx - minx)),
+                    "h": int(round(maxy - miny)),
+                    "angle": int(angle),
+                }
             )
+        if progress is not None:
+            # A plain run may follow a nested one; each gets half the bar
+            progress(n + 1, (2 if nested else 1) * len(norm_pieces))
+
+    if unplaced:
+        # Drop the sheet opened for a piece that then ran out of time
+        while len(sheets) > kept_sheets and not sheets[-1]["polygons"]:
+            sheets.pop()
 
     # Clean sheets for output (strip internal keys)
     cleaned = []
@@ -198,103 +517,610 @@ def pack_irregular(
                 if not k.startswith("_")  # remove internal bookkeeping
             }
         )
-    return {"sheets": cleaned}
+    result = {"sheets": cleaned}
+    if unplaced:
+        result["unplaced"] = unplaced
+        result["truncated"] = True
+    elif nested:
+        # A compound changes what the greedy order sees next, which on a
+        # tight job can cost a sheet; unless the area leaves no sheet to
+        # save, pack without compounds too and keep the better layout
+        used = sum(sheet_used_area(sh) for sh in cleaned)
+        if len(cleaned) > ceil(used / (sheet_width * sheet_height) - 1e-9):
+            plain = pack_irregular(
+                pieces,
+                sheet_width,
+                sheet_height,
+                allow_rotation,
+                kerf,
+                packing_mode,
+                sort_pieces,
+                existing_sheets,
+                geometry_backend,
+                pre_nest=False,
+                cancel=stop,
+                progress=(
+                    None
+                    if progress is None
+                    else lambda done, total: progress(total + done, 2 * total)
+                ),
+            )
+            if layout_score(plain) < layout_score(result):
+                return plain
+        elif progress is not None:
+            progress(1, 1)
+    return result
 
 
 # ---- helpers extracted directly ----
 
 
+def _pre_nest(items, angles, allow_rotation, sheet_w, sheet_h, integer: bool):
+    """``items`` with interlocking pairs merged into compound items.
+
+    A compound keeps its members as (id, name, base, angle, offset), with
+    ``base`` in the compound's frame: the piece turned by ``angle`` and
+    moved by ``offset``. It takes the place of its first member in the
+    order. Pieces with their own ``angles`` are left alone, and so are
+    pairs that only meet at a point or would no longer fit on a sheet.
+    """
+    free = [k for k, it in enumerate(items) if it["angles"] == angles]
+    pairs = complementary_pairs([items[k]["inflated"] for k in free], allow_rotation)
+    union = clipper_geometry.union if integer else shapely.union_all
+    compounds: Dict[int, Dict[str, Any]] = {}
+    dropped = set()
+    for pair in pairs:
+        a, b = items[free[pair.i]], items[free[pair.j]]
+        dx, dy = pair.offset
+
+        def moved(g):
+            rot = shp_rotate(g, pair.angle, origin=(0, 0), use_radians=False)
+            return shp_translate(rot, xoff=dx, yoff=dy)
+
+        inflated = union([a["inflated"], moved(b["inflated"])])
+        if inflated.geom_type != "Polygon":
+            continue
+        x0, y0, x1, y1 = inflated.bounds
+        w, h = x1 - x0, y1 - y0
+        fits = w <= sheet_w and h <= sheet_h
+        if not fits and not (allow_rotation and h <= sheet_w and w <= sheet_h):
+            continue
+        base = union([a["base"], moved(b["base"])])
+        compounds[free[pair.i]] = {
+            "id": f"{a['id']}+{b['id']}",
+            "name": f"{a['name']}+{b['name']}",
+            "base": base,
+            "inflated": inflated,
+            "base_key": geometry_key(base),
+            "inflated_key": geometry_key(inflated),
+            # Compounds are nearly solid blocks; at odd angles the bottom-
+            # left rule tips them over and wastes the space around them
+            "angles": tuple(x for x in angles if x % 90 == 0),
+            "members": [
+                (a["id"], a["name"], a["base"], 0, (0.0, 0.0)),
+                (b["id"], b["name"], moved(b["base"]), pair.angle, (dx, dy)),
+            ],
+        }
+        dropped.add(free[pair.j])
+    return [compounds.get(k, it) for k, it in enumerate(items) if k not in dropped]
+
+
+def _unplaced_entries(item) -> List[Dict[str, Any]]:
+    # "unplaced" entries (bbox sizes) for each piece in an item
+    members = item.get("members") or [(item["id"], item["name"], item["base"], 0)]
+    out = []
+    for pid, name, poly, *_ in members:
+        x0, y0, x1, y1 = poly.bounds
+        out.append(
+            {
+                "piece_id": pid,
+                "name": name,
+                "w": int(round(x1 - x0)),
+                "h": int(round(y1 - y0)),
+            }
+        )
+    return out
+
+
+def _expand_members(item, base_abs, angle):
+    """(id, name, placed polygon, angle, offset) of each piece in a placed item.
+
+    Each placed polygon is the piece's own outline turned by its angle
+    about the origin, then moved by its offset.
+    """
+    # The item was rotated about the origin, then moved
+    rot = shp_rotate(item["base"], angle, origin=(0, 0), use_radians=False)
+    dx = base_abs.bounds[0] - rot.bounds[0]
+    dy = base_abs.bounds[1] - rot.bounds[1]
+    if "members" not in item:
+        return [(item["id"], item["name"], base_abs, angle, (dx, dy))]
+    c, s = cos(radians(angle)), sin(radians(angle))
+    out = []
+    for pid, name, member, member_angle, (ox, oy) in item["members"]:
+        poly = shp_rotate(member, angle, origin=(0, 0), use_radians=False)
+        poly = shp_translate(poly, xoff=dx, yoff=dy)
+        # Where the compound's transform takes the member's own offset
+        offset = (ox * c - oy * s + dx, ox * s + oy * c + dy)
+        out.append((pid, name, poly, (angle + member_angle) % 360, offset))
+    return out
+
+
+def _may_fit(item, sheet) -> bool:
+    """False if ``sheet`` certainly has no room left for ``item``.
+
+    Either the free area is smaller than the piece, or at no angle does the
+    box inside the piece fit any free rectangle: every axis-aligned
+    rectangle in the free space lies inside one of the maximal ones.
+    """
+    if sheet["_free_area"] < item["inflated"].area - 1e-6:
+        return False
+    free = sheet["_free_rects"].sizes()
+    inner = item["inner_boxes"]
+    need = inner[:, 2:] - inner[:, :2]
+    fits = (free[None, :, 0] >= need[:, None, 0] - 1e-6) & (
+        free[None, :, 1] >= need[:, None, 1] - 1e-6
+    )
+    return bool(fits.any())
+
+
+def _inner_box(poly):
+    """An axis-aligned rectangle inside ``poly``, as (minx, miny, maxx, maxy).
+
+    Exact for rectangles at any angle (the largest such box, centred on the
+    rectangle); for other shapes, the square inscribed in the largest inner
+    circle.
+    """
+    if poly.area >= poly.envelope.area * (1 - 1e-9):
+        return poly.bounds
+    rect = poly.minimum_rotated_rectangle
+    if poly.area >= rect.area * (1 - 1e-6):
+        (x0, y0), (x1, y1), (x2, y2) = list(rect.exterior.coords)[:3]
+        a, b = hypot(x1 - x0, y1 - y0), hypot(x2 - x1, y2 - y1)
+        w, h = _largest_box_in_rotated_rect(a, b, atan2(y1 - y0, x1 - x0))
+        # Corners snapped to the integer grid (clipper backend) can be up
+        # to a grid unit inside the true rectangle
+        w, h = max(0.0, w - 2e-3), max(0.0, h - 2e-3)
+        cx, cy = (x0 + x2) / 2.0, (y0 + y2) / 2.0
+        return (cx - w / 2.0, cy - h / 2.0, cx + w / 2.0, cy + h / 2.0)
+    # The circle found may be a little small, never too big
+    line = shapely.maximum_inscribed_circle(poly)
+    (cx, cy), _ = line.coords
+    half = line.length / sqrt(2.0)
+    return (cx - half, cy - half, cx + half, cy + half)
+
+
+def _inner_box_free(inner, offsets: np.ndarray, free_rects) -> np.ndarray:
+    # Which offsets put the ``inner`` box inside some maximal free rectangle
+    r = np.array(free_rects.rects, dtype=float)
+    eps = 1e-6
+    x0 = offsets[:, 0:1] + inner[0]
+    y0 = offsets[:, 1:2] + inner[1]
+    x1 = offsets[:, 0:1] + inner[2]
+    y1 = offsets[:, 1:2] + inner[3]
+    inside = (
+        (r[None, :, 0] <= x0 + eps)
+        & (r[None, :, 1] <= y0 + eps)
+        & (r[None, :, 2] >= x1 - eps)
+        & (r[None, :, 3] >= y1 - eps)
+    )
+    return inside.any(axis=1)
+
+
+def _largest_box_in_rotated_rect(w: float, h: float, angle: float):
+    # Largest axis-aligned box inside a w x h rectangle rotated by ``angle``
+    # (radians). Either the box's corners touch both long sides (thin
+    # rectangles, or 45 degrees) or all four sides.
+    long_side, short_side = (w, h) if w >= h else (h, w)
+    sin_a, cos_a = abs(sin(angle)), abs(cos(angle))
+    if short_side <= 2.0 * sin_a * cos_a * long_side or abs(sin_a - cos_a) < 1e-10:
+        half = 0.5 * short_side
+        if w >= h:
+            return half / max(sin_a, 1e-12), half / max(cos_a, 1e-12)
+        return half / max(cos_a, 1e-12), half / max(sin_a, 1e-12)
+    cos_2a = cos_a * cos_a - sin_a * sin_a
+    return (w * cos_a - h * sin_a) / cos_2a, (h * cos_a - w * sin_a) / cos_2a
+
+
+def _variant_shapes(v: Variant, use_inflated: bool):
+    # (base, collision shape, w, h) of a variant, with or without clearance
+    if use_inflated:
+        return v.base, v.inflated, v.w, v.h
+    return v.tight, v.tight, v.tight_w, v.tight_h
+
+
+def _variant_hull(v: Variant, use_inflated: bool) -> collision.Shape:
+    return v.hull if use_inflated else v.tight_hull
+
+
+def _update_pockets(free, pockets, placed, integer: bool):
+    """Free region and pockets of a sheet once ``placed`` is on it.
+
+    Pockets are the still-free parts of concave pieces' convex hulls.
+    Both are cut down by difference as pieces arrive, never rebuilt.
+    """
+    if integer:
+        difference, intersection = (
+            clipper_geometry.difference,
+            clipper_geometry.intersection,
+        )
+    else:
+        difference, intersection = shapely.difference, shapely.intersection
+    free = difference(free, placed)
+    parts = [p for pocket in pockets for p in _parts(difference(pocket, placed))]
+    hull = placed.convex_hull
+    if hull.area - placed.area >= POCKET_MIN_AREA:
+        parts.extend(_parts(intersection(difference(hull, placed), free)))
+    return free, [p for p in parts if p.area >= POCKET_MIN_AREA]
+
+
+def _parts(geom) -> list:
+    return [p for p in shapely.get_parts(geom) if p.geom_type == "Polygon"]
+
+
+def _place_in_pocket(
+    item, sheet_poly, placed_index, pockets, use_inflated=True, stop=None
+):
+    """Lowest, then leftmost, spot in a pocket where the piece fits.
+
+    Candidates put a corner of the piece's bbox on a corner of the pocket,
+    so a piece can back into a pocket that opens in any direction. Only
+    angles whose bbox fits inside the pocket's bbox are tried, and only
+    offsets that put the box inside the piece (`_inner_box`) in the pocket.
+    """
+    if not pockets:
+        return None
+    _, _, sheet_w, sheet_h = sheet_poly.bounds
+    area = item["variants"][0].area
+    best = None
+    for pocket in pockets:
+        if stop is not None:
+            stop.check()
+        if pocket.area < area:
+            continue
+        px0, py0, px1, py1 = pocket.bounds
+        corners = shapely.get_coordinates(pocket)
+        shapely.prepare(pocket)
+        for vi, v in enumerate(item["variants"]):
+            base_norm, inf_norm, w, h = _variant_shapes(v, use_inflated)
+            if w > px1 - px0 + 1e-9 or h > py1 - py0 + 1e-9:
+                continue
+            hull = _variant_hull(v, use_inflated)
+            # The four bbox corners on each pocket corner, kept on the grid
+            # candidate points use, so integer shapes stay exact
+            shifts = np.array([[0.0, 0.0], [w, 0.0], [0.0, h], [w, h]])
+            offsets = np.unique(
+                np.round((corners[:, None, :] - shifts[None]).reshape(-1, 2), 3),
+                axis=0,
+            )
+            ok = (
+                (offsets[:, 0] >= -1e-9)
+                & (offsets[:, 1] >= -1e-9)
+                & (offsets[:, 0] + w <= sheet_w + 1e-9)
+                & (offsets[:, 1] + h <= sheet_h + 1e-9)
+                # The piece's bbox stays inside the pocket's bbox
+                & (offsets[:, 0] >= px0 - 1e-9)
+                & (offsets[:, 1] >= py0 - 1e-9)
+                & (offsets[:, 0] + w <= px1 + 1e-9)
+                & (offsets[:, 1] + h <= py1 + 1e-9)
+            )
+            offsets = offsets[ok]
+            ix0, iy0, ix1, iy1 = item["inner_boxes"][vi]
+            for cx, cy in ((ix0, iy0), (ix1, iy0), (ix0, iy1), (ix1, iy1)):
+                inside = shapely.intersects_xy(
+                    pocket, offsets[:, 0] + cx, offsets[:, 1] + cy
+                )
+                offsets = offsets[inside]
+            for x, y in offsets[np.lexsort((offsets[:, 0], offsets[:, 1]))]:
+                x, y = float(x), float(y)
+                if best is not None and (y, x) >= best[0]:
+                    break
+                if _overlaps_placed(hull, placed_index, offset=(x, y)):
+                    continue
+                base_abs = shp_translate(base_norm, xoff=x, yoff=y)
+                inf_abs = shp_translate(inf_norm, xoff=x, yoff=y)
+                best = ((y, x), (base_abs, inf_abs, v.angle))
+                break
+    return None if best is None else best[1]
+
+
 def _place_on_sheet(
-    item, sheet_poly, placed_inflated, candidates, angles, use_inflated: bool = True
+    item,
+    sheet_poly,
+    placed_index,
+    candidates,
+    use_inflated=True,
+    free_rects=None,
+    batch=True,
+    stop=None,
+):
+    """Lowest, then leftmost, candidate where some angle of the piece fits.
+
+    ``candidates`` is the sheet's `CandidateQueue`. It is walked best first
+    in chunks; the best placement within the first chunk that has any is
+    the best overall, so the rest of the queue is never looked at. Without
+    ``batch`` every candidate goes through the staged `collision` tests,
+    which is what the integer geometry backend needs.
+    """
+    for chunk in candidates.chunks(CANDIDATE_CHUNK):
+        if stop is not None:
+            stop.check()
+        # A handful of candidates isn't worth the array set-up; the loop
+        # also stops early once nothing can beat the best placement so far
+        if not batch or len(chunk) * len(item["variants"]) < BATCH_MIN_CANDIDATES:
+            placed = _place_on_sheet_loop(
+                item, sheet_poly, placed_index, chunk, use_inflated
+            )
+        else:
+            placed = _place_on_sheet_batch(
+                item, sheet_poly, placed_index, chunk, use_inflated, free_rects
+            )
+        if placed is not None:
+            return placed
+    return None
+
+
+def _translated(geom, offsets: np.ndarray) -> np.ndarray:
+    """Copies of ``geom`` moved by each (dx, dy) row of ``offsets``."""
+    copies = np.empty(len(offsets), dtype=object)
+    copies[:] = [geom] * len(offsets)
+    shift = np.repeat(offsets, shapely.get_num_coordinates(geom), axis=0)
+    # transform() hands every copy's coordinates to the function in one array
+    return shapely.transform(copies, lambda c: c + shift)
+
+
+def _place_on_sheet_batch(
+    item, sheet_poly, placed_index, candidates, use_inflated=True, free_rects=None
 ):
+    """`_place_on_sheet_loop` with each angle's candidates tested in one go.
+
+    Every candidate translation is built as one geometry array and checked
+    in one go against the placed pieces near the candidates, as the sheet's
+    `GridIndex` finds them, so the per-candidate work happens in shapely's
+    C code. Picks the same placement as the loop.
+
+    With the sheet's ``free_rects``, candidates where the box inside the
+    piece isn't inside any maximal free rectangle are dropped before any
+    geometry is built: they would certainly overlap something.
+    """
+    _, _, sheet_w, sheet_h = sheet_poly.bounds
+    cands = np.asarray(candidates, dtype=float).reshape(-1, 2)
+    cx, cy = cands[:, 0], cands[:, 1]
+    shapes = [_variant_shapes(v, use_inflated) for v in item["variants"]]
+    # Only pieces within reach of some candidate at some angle can block
+    reach_w = max(w for _, _, w, _ in shapes)
+    reach_h = max(h for _, _, _, h in shapes)
+    near = placed_index.query(
+        (cx.min(), cy.min(), cx.max() + reach_w, cy.max() + reach_h)
+    )
+    placed = np.empty(len(near), dtype=object)
+    placed[:] = near
+    placed_bounds = shapely.bounds(placed)
     best = None
-    placed_union = unary_union(placed_inflated) if placed_inflated else None
 
-    for angle in angles:
-        base_rot = shp_rotate(item["base"], angle, origin=(0, 0), use_radians=False)
-        inf_src = item["inflated"] if use_inflated else item["base"]
-        inf_rot = shp_rotate(inf_src, angle, origin=(0, 0), use_radians=False)
+    for vi, v in enumerate(item["variants"]):
+        base_norm, inf_norm, w, h = shapes[vi]
+        ok = (cx + w <= sheet_w + 1e-9) & (cy + h <= sheet_h + 1e-9)
+        if best is not None:
+            by, bx = best[0]
+            ok &= (cy < by) | ((cy == by) & (cx < bx))
+        idx = np.flatnonzero(ok)
+        if idx.size and free_rects is not None and use_inflated:
+            idx = idx[_inner_box_free(item["inner_boxes"][vi], cands[idx], free_rects)]
+        if idx.size == 0:
+            continue
 
-        # Normalize so candidate refers to bbox bottom-left
-        minx, miny, _, _ = inf_rot.bounds
-        base_norm = shp_translate(base_rot, xoff=-minx, yoff=-miny)
-        inf_norm = shp_translate(inf_rot, xoff=-minx, yoff=-miny)
+        moved = _translated(inf_norm, cands[idx])
+        if len(placed):
+            # Touching is fine, only overlapping interiors block. For
+            # polygons that's the same as a positive intersection area, but
+            # much cheaper than computing the intersection. The whole batch
+            # goes to shapely at once, which beats the per-pair hull stage
+            mb = shapely.bounds(moved)
+            hit, other = np.nonzero(
+                (mb[:, None, 0] <= placed_bounds[None, :, 2])
+                & (mb[:, None, 2] >= placed_bounds[None, :, 0])
+                & (mb[:, None, 1] <= placed_bounds[None, :, 3])
+                & (mb[:, None, 3] >= placed_bounds[None, :, 1])
+            )
+            # The placed pieces are prepared, which makes this test cheap
+            meets = shapely.intersects(placed[other], moved[hit])
+            hit, other = hit[meets], other[meets]
+            collision.record("exact", hit.size)
+            if hit.size:
+                blocked = shapely.relate_pattern(moved[hit], placed[other], "T********")
+                free = np.ones(idx.size, dtype=bool)
+                free[hit[blocked]] = False
+                idx, moved = idx[free], moved[free]
+                if idx.size == 0:
+                    continue
 
-        for cx, cy in candidates:
-            base_abs = shp_translate(base_norm, xoff=cx, yoff=cy)
-            inf_abs = shp_translate(inf_norm, xoff=cx, yoff=cy)
+        # Prefer bottom-left (lower y, then lower x)
+        j = int(np.lexsort((cx[idx], cy[idx]))[0])
+        x, y = float(cx[idx[j]]), float(cy[idx[j]])
+        base_abs = shp_translate(base_norm, xoff=x, yoff=y)
+        best = ((y, x), (base_abs, moved[j], v.angle))
+
+    return None if best is None else best[1]
+
+
+def _place_on_sheet_loop(item, sheet_poly, placed_index, candidates, use_inflated=True):
+    best = None
+    _, _, sheet_w, sheet_h = sheet_poly.bounds
 
-            # allow shapes touching boundary; contains() is strict, covers() includes boundary
-            if not sheet_poly.covers(inf_abs):
+    for v in item["variants"]:
+        base_norm, inf_norm, w, h = _variant_shapes(v, use_inflated)
+        hull = _variant_hull(v, use_inflated)
+
+        for cx, cy in candidates:
+            # Variants are normalised to their bbox, so the sheet check is
+            # just a bounds test (touching the sheet edge is allowed)
+            if cx + w > sheet_w + 1e-9 or cy + h > sheet_h + 1e-9:
+                continue
+            key = (cy, cx)
+            if best is not None and key >= best[0]:
                 continue
             # Only block real overlaps (area > 0); allow edge/vertex touches
-            if placed_union and inf_abs.intersection(placed_union).area > 0:
+            if _overlaps_placed(hull, placed_index, offset=(cx, cy)):
                 continue
 
             # Prefer bottom-left (lower y, then lower x)
-            bx, by, _, _ = inf_abs.bounds
-            key = (by, bx)
-            if best is None or key < best[0]:
-                best = (key, (base_abs, inf_abs, angle))
+            base_abs = shp_translate(base_norm, xoff=cx, yoff=cy)
+            inf_abs = shp_translate(inf_norm, xoff=cx, yoff=cy)
+            best = (key, (base_abs, inf_abs, v.angle))
 
     return None if best is None else best[1]
 
 
-def _place_on_sheet_exhaustive(
+def _place_on_sheet_nfp(
     item,
     sheet_poly,
-    placed_inflated,
-    angles,
+    placed_index,
+    placed_nfp,
     use_inflated: bool = True,
-    grid_step: int = 5,
+    integer: bool = False,
+    stop=None,
 ):
-    placed_union = unary_union(placed_inflated) if placed_inflated else None
+    """Place at the feasible-region vertex with the lowest top edge.
+
+    ``placed_nfp`` holds ``(shape_key, normalised_shape, dx, dy)`` for each
+    piece already on the sheet. Returns the usual ``(base, inflated,
+    angle)`` plus the entry to append to ``placed_nfp``. Shape keys include
+    ``integer``: the two backends turn the same piece into slightly
+    different shapes, so they mustn't share cached no-fit polygons.
+    """
+    src_key = item["inflated_key"] if use_inflated else item["base_key"]
+    _, _, sheet_w, sheet_h = sheet_poly.bounds
     best = None
 
-    for angle in angles:
-        base_rot = shp_rotate(item["base"], angle, origin=(0, 0), use_radians=False)
-        inf_src = item["inflated"] if use_inflated else item["base"]
-        inf_rot = shp_rotate(inf_src, angle, origin=(0, 0), use_radians=False)
+    for v in item["variants"]:
+        if stop is not None:
+            stop.check()
+        base_norm, inf_norm, w, h = _variant_shapes(v, use_inflated)
+        hull = _variant_hull(v, use_inflated)
+        ifp = inner_fit_rect(sheet_w, sheet_h, w, h)
+        if ifp is None:
+            continue
+        moving_key = (src_key, v.angle, integer)
+        nfps = [
+            shp_translate(cached_nfp(f_norm, f_key, inf_norm, moving_key), dx, dy)
+            for f_key, f_norm, dx, dy in placed_nfp
+        ]
+        for x, y in feasible_vertices(ifp, nfps):
+            if hull.paths is not None:
+                # Integer shapes only stay exact at offsets on the grid
+                x, y = round(x, 3), round(y, 3)
+            # Lowest top edge first: plain bottom-left would happily pick an
+            # odd angle that touches y=0 but sticks up much further
+            key = (y + h, x)
+            if best is not None and key >= best[0]:
+                break
+            # Vertices come from polygon crossings; confirm with exact geometry
+            if _overlaps_placed(hull, placed_index, AREA_EPS, offset=(x, y)):
+                continue
+            inf_abs = shp_translate(inf_norm, xoff=x, yoff=y)
+            base_abs = shp_translate(base_norm, xoff=x, yoff=y)
+            best = (key, (base_abs, inf_abs, v.angle, (moving_key, inf_norm, x, y)))
+            break
 
-        # Normalize to origin bottom-left
-        minx, miny, maxx, maxy = inf_rot.bounds
-        base_norm = shp_translate(base_rot, xoff=-minx, yoff=-miny)
-        inf_norm = shp_translate(inf_rot, xoff=-minx, yoff=-miny)
-        w = maxx - minx
-        h = maxy - miny
-        max_x = max(0, int(ceil(sheet_poly.bounds[2] - w)))
-        max_y = max(0, int(ceil(sheet_poly.bounds[3] - h)))
+    return None if best is None else best[1]
+
+
+def _place_on_sheet_exhaustive(
+    item,
+    sheet_poly,
+    placed_index,
+    use_inflated: bool = True,
+    grid_step: int = 5,
+    stop=None,
+):
+    _, _, sheet_w, sheet_h = sheet_poly.bounds
+
+    for v in item["variants"]:
+        base_norm, inf_norm, w, h = _variant_shapes(v, use_inflated)
+        hull = _variant_hull(v, use_inflated)
+        if w > sheet_w + 1e-9 or h > sheet_h + 1e-9:
+            continue
+        max_x = max(0, int(ceil(sheet_w - w)))
+        max_y = max(0, int(ceil(sheet_h - h)))
 
         y = 0
         while y <= max_y:
+            if stop is not None:
+                stop.check()
             x = 0
             while x <= max_x:
-                base_abs = shp_translate(base_norm, xoff=x, yoff=y)
-                inf_abs = shp_translate(inf_norm, xoff=x, yoff=y)
-
-                if not sheet_poly.covers(inf_abs):
+                if x + w > sheet_w + 1e-9 or y + h > sheet_h + 1e-9:
                     x += grid_step
                     continue
-                if placed_union and inf_abs.intersection(placed_union).area > 0:
+                if _overlaps_placed(hull, placed_index, offset=(x, y)):
                     x += grid_step
                     continue
 
-                # Found a valid placement; choose the first (row-major ~ bottom-left)
-                key = (y, x)
-                if best is None or key < best[0]:
-                    best = (key, (base_abs, inf_abs, angle))
-                    # we can early-return; but keep minimal to ensure most bottom-left
-                    return best[1]
+                # First valid position in row-major order is the bottom-left one
+                inf_abs = shp_translate(inf_norm, xoff=x, yoff=y)
+                return shp_translate(base_norm, xoff=x, yoff=y), inf_abs, v.angle
 
-                x += grid_step
             y += grid_step
 
     return None
 
 
-def _offset_polygon(poly: Any, delta: float) -> Any:
+def _place_on_sheet_raster(
+    item, grid, placed_index, use_inflated: bool = True, stop=None
+):
+    """Exhaustive grid search done on bitmaps of the sheet and the piece.
+
+    Every grid offset of every angle is scored in one correlation, and the
+    lowest (then leftmost) collision-free offset over all angles wins, ties
+    going to the earlier angle. The raster is conservative, so the chosen
+    offset is free; exact geometry still confirms it before returning.
+    """
+    step = grid.cell
+    best = None
+
+    for v in item["variants"]:
+        if stop is not None:
+            stop.check()
+        base_norm, inf_norm, w, h = _variant_shapes(v, use_inflated)
+        hull = _variant_hull(v, use_inflated)
+        if best is not None and (h, 0.0) >= best[0]:
+            continue  # can't beat the best even sitting on the bottom edge
+        cached = item["masks"].get((v.angle, use_inflated))
+        if cached is None:
+            cached = (piece_mask(inf_norm, step), {})
+            item["masks"][(v.angle, use_inflated)] = cached
+        hits = grid.collisions(*cached)
+        if hits.size == 0:
+            continue
+        # Offsets whose exact bbox stays on the sheet (the last cell of the
+        # grid may only be partly on it)
+        max_i = int(floor((grid.height - h) / step + 1e-9))
+        max_j = int(floor((grid.width - w) / step + 1e-9))
+        hits = hits[: max_i + 1, : max_j + 1]
+        # Row-major order is bottom-left order
+        for flat in np.flatnonzero(hits == 0):
+            i, j = divmod(int(flat), hits.shape[1])
+            x, y = j * step, i * step
+            # Lowest top edge first, as in nfp mode: plain bottom-left
+            # favours odd angles that touch y=0 but stick up further
+            key = (y + h, x)
+            if best is not None and key >= best[0]:
+                break
+            if _overlaps_placed(hull, placed_index, offset=(x, y)):
+                continue
+            inf_abs = shp_translate(inf_norm, xoff=x, yoff=y)
+            base_abs = shp_translate(base_norm, xoff=x, yoff=y)
+            best = (key, (base_abs, inf_abs, v.angle))
+            break
+
+    return None if best is None else best[1]
+
+
+def _offset_polygon(poly: Any, delta: float, integer: bool = False) -> Any:
     if delta == 0:
         return poly
+    if integer:
+        return clipper_geometry.offset(poly, delta)
     # Prefer pyclipper if available for crisp miters; otherwise use shapely buffer
     if _HAS_PYCLIPPER:
         scale = 1000.0
@@ -327,59 +1153,41 @@ def _new_sheet(index: int, w: int, h: int) -> Dict[str, Any]:
     }
 
 
-def _prune_candidates(cands, sheet_w, sheet_h):
-    # Keep unique and in-bounds candidates; snap negatives to zero
-    seen = set()
-    pruned = []
-    for x, y in cands:
-        x = 0.0 if x < 0 else x
-        y = 0.0 if y < 0 else y
-        if x > sheet_w or y > sheet_h:
-            continue
-        key = (round(x, 3), round(y, 3))
-        if key in seen:
-            continue
-        seen.add(key)
-        pruned.append((x, y))
-    pruned.sort(key=lambda t: (t[1], t[0]))
-    return pruned[:500]
-
-
-def _place_on_sheet_simple(item, sheet_poly, placed_inflated, use_inflated=True):
+def _place_on_sheet_simple(
+    item, sheet_poly, placed_index, use_inflated=True, integer=False, stop=None
+):
     base_poly = item["base"]
     inflated_poly = item["inflated"] if use_inflated else base_poly
+    hull = collision.make_shape(inflated_poly, integer)
 
     # Try (0,0) first
-    if use_inflated:
-        if sheet_poly.covers(inflated_poly) and not any(
-            inflated_poly.intersects(p) and inflated_poly.intersection(p).area > 0
-            for p in placed_inflated
-        ):
-            return base_poly, inflated_poly, 0
-    else:
-        if sheet_poly.covers(base_poly) and not any(
-            base_poly.intersects(p) and base_poly.intersection(p).area > 0
-            for p in placed_inflated
-        ):
-            return base_poly, base_poly, 0
+    if sheet_poly.covers(inflated_poly) and not _overlaps_placed(hull, placed_index):
+        return base_poly, inflated_poly, 0
 
     step = 20
     for x in range(0, int(sheet_poly.bounds[2]), step):
+        if stop is not None:
+            stop.check()
         for y in range(0, int(sheet_poly.bounds[3]), step):
-            translated = shp_translate(
-                inflated_poly if use_inflated else base_poly, xoff=x, yoff=y
-            )
-            if use_inflated:
-                if sheet_poly.covers(translated) and not any(
-                    translated.intersects(p) and translated.intersection(p).area > 0
-                    for p in placed_inflated
-                ):
+            translated = shp_translate(inflated_poly, xoff=x, yoff=y)
+            if sheet_poly.covers(translated) and not _overlaps_placed(
+                hull, placed_index, offset=(x, y)
+            ):
+                if use_inflated:
                     return shp_translate(base_poly, xoff=x, yoff=y), translated, 0
-            else:
-                if sheet_poly.covers(translated) and not any(
-                    translated.intersects(p) and translated.intersection(p).area > 0
-                    for p in placed_inflated
-                ):
-                    return translated, translated, 0
+                return translated, translated, 0
 
     return None
+
+
+def _overlaps_placed(
+    shape: collision.Shape, index, min_area: float = 0.0, offset=(0.0, 0.0)
+) -> bool:
+    """True if ``shape`` moved by ``offset`` overlaps a nearby placed piece.
+
+    Touching along an edge or at a corner is not an overlap.
+    """
+    dx, dy = offset
+    x0, y0, x1, y1 = shape.bounds
+    nearby = index.query_shapes((x0 + dx, y0 + dy, x1 + dx, y1 + dy))
+    return collision.overlaps_any(shape, nearby, min_area, offset)
@@ -0,0 +1,75 @@
+"""Content addressing for computed layouts.
+
+A layout only depends on the shapes being packed and the packing options,
+not on which job or which piece ids they belong to. `layout_key` hashes
+the multiset of shapes (sizes or polygon points) together with the
+options, so a repeat request, or another job with an identical cabinet
+set, gets the same key.
+
+Layouts are stored with piece ids replaced by slots, positions in the
+canonical (sorted) order of the shapes. `restore` gives a stored layout
+back to any piece list with the same key. Pieces of equal shape are
+interchangeable, so it doesn't matter which of them takes which slot.
+"""
+
+import copy
+import hashlib
+import json
+from typing import Any, Dict, Iterator, List
+
+# Part of every key; bump it when a packer change makes old layouts stale
+CACHE_VERSION = 2
+
+
+def _shape(p: Dict[str, Any]) -> str:
+    if p.get("polygon"):
+        return json.dumps(["p", [[float(x), float(y)] for x, y in p["polygon"]]])
+    return json.dumps(["r", int(p["width"]), int(p["height"])])
+
+
+def canonical_order(pieces: List[Dict[str, Any]]) -> List[int]:
+    """Indices of ``pieces`` sorted by shape."""
+    shapes = [_shape(p) for p in pieces]
+    return sorted(range(len(pieces)), key=shapes.__getitem__)
+
+
+def layout_key(pieces: List[Dict[str, Any]], options: Dict[str, Any]) -> str:
+    """Hash of the shapes of ``pieces`` (in any order) and ``options``."""
+    payload = json.dumps(
+        {
+            "version": CACHE_VERSION,
+            "shapes": sorted(_shape(p) for p in pieces),
+            "options": options,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _entries(result: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    # Every dict in a layout that names a piece
+    for sheet in result.get("sheets") or []:
+        yield from sheet.get("rects") or []
+        yield from sheet.get("polygons") or []
+    yield from result.get("unplaced") or []
+
+
+def anonymise(result: Dict[str, Any], pieces: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Copy of ``result`` with slots for piece ids and no names."""
+    slots = {pieces[i]["id"]: k for k, i in enumerate(canonical_order(pieces))}
+    out = copy.deepcopy(result)
+    for entry in _entries(out):
+        entry["piece_id"] = slots[entry["piece_id"]]
+        entry["name"] = None
+    return out
+
+
+def restore(stored: Dict[str, Any], pieces: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """An `anonymise`d layout with the ids and names of ``pieces``."""
+    order = canonical_order(pieces)
+    out = copy.deepcopy(stored)
+    for entry in _entries(out):
+        p = pieces[order[entry["piece_id"]]]
+        entry["piece_id"] = p["id"]
+        entry["name"] = p.get("name") or p["id"]
+    return out
@@ -0,0 +1,225 @@
+"""Genetic algorithm over piece order and rotations.
+
+`search.pack_anytime` samples independent random orders; this keeps the
+good ones and recombines them instead. An individual is a piece order plus
+a rotation gene per piece, and its fitness is the `layout_score` of packing
+it with the default greedy engine (fewest unplaced pieces, then fewest
+sheets, then the emptiest last sheet). Each generation's new individuals
+are packed in parallel, on worker processes shared by all generations.
+
+Rotation genes mean different things per engine. For polygon jobs a gene
+fixes the piece to one quarter-turn angle (``None`` leaves the choice to
+the placer). For rectangle jobs rectpack picks orientation itself, so a
+gene of 90 turns the piece before packing, which changes its preference.
+"""
+
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from ._optimiser_common import _IRREGULAR_DEPS_OK, layout_score, truncated_layout
+from ._parallel import default_workers, run_budgeted, worker_pool
+from .cancellation import CancelToken, clamp_budget, stop_token
+from .search import _piece_area, _rotate_piece_90, pack_in_order
+
+# Defaults for the "genetic" packing mode. It is meant for jobs where
+# material matters more than waiting, so the budget is generous.
+GENETIC_TIME_BUDGET = 30.0
+GENETIC_POPULATION = 24
+GENETIC_GENERATIONS = 40
+
+# Best individuals copied unchanged into the next generation
+ELITE = 2
+# Individuals drawn per tournament when picking a parent
+TOURNAMENT = 3
+# Chance per child of a swap in the order, and per gene of a new rotation
+SWAP_RATE = 0.5
+ROTATION_RATE = 0.1
+
+Genome = Tuple[Tuple[int, ...], Tuple[Optional[int], ...]]
+
+
+def _rotation_choices(
+    pieces: List[Dict[str, Any]],
+    allow_rotation: bool,
+    sheet_width: float,
+    sheet_height: float,
+) -> List[list]:
+    """The rotation genes each piece may carry.
+
+    A polygon gene pins the piece to that angle, so angles at which its
+    bounding box is too big for the sheet are left out: the piece could
+    not be placed at all and the individual would be lost.
+    """
+    if not allow_rotation:
+        return [[None]] * len(pieces)
+    if not (
+        any("polygon" in p and p["polygon"] for p in pieces) and _IRREGULAR_DEPS_OK
+    ):
+        return [[None, 90]] * len(pieces)
+    choices = []
+    for p in pieces:
+        if p.get("polygon"):
+            xs, ys = zip(*p["polygon"])
+            w, h = max(xs) - min(xs), max(ys) - min(ys)
+        else:
+            w, h = float(p["width"]), float(p["height"])
+        upright = w <= sheet_width and h <= sheet_height
+        turned = h <= sheet_width and w <= sheet_height
+        fits = {0: upright, 90: turned, 180: upright, 270: turned}
+        choices.append([None] + [a for a in (0, 90, 180, 270) if fits[a]])
+    return choices
+
+
+def _evaluate(
+    pieces, sheet_width, sheet_height, allow_rotation, kerf, genome, cancel=None
+):
+    # Worker entry point: pack one individual with the greedy engine
+    order, genes = genome
+    irregular = (
+        any("polygon" in p and p["polygon"] for p in pieces) and _IRREGULAR_DEPS_OK
+    )
+    ordered = []
+    rotated = set()
+    for i in order:
+        p, gene = pieces[i], genes[i]
+        if gene is not None and irregular:
+            p = dict(p, angles=[gene])
+        elif gene == 90:
+            p = _rotate_piece_90(p)
+            rotated.add(p["id"])
+        ordered.append(p)
+    return pack_in_order(
+        ordered, sheet_width, sheet_height, allow_rotation, kerf, rotated, cancel
+    )
+
+
+def order_crossover(a: Sequence[int], b: Sequence[int], rng: random.Random) -> list:
+    """OX1: keep a slice of ``a``, fill the rest in ``b``'s order."""
+    n = len(a)
+    if n < 2:
+        return list(a)
+    i, j = sorted(rng.sample(range(n + 1), 2))
+    kept = set(a[i:j])
+    rest = [g for g in b if g not in kept]
+    return rest[:i] + list(a[i:j]) + rest[i:]
+
+
+def _initial(pieces, choices, size: int, rng: random.Random) -> List[Genome]:
+    n = len(pieces)
+    by_area = sorted(range(n), key=lambda i: -_piece_area(pieces[i]))
+    population = [(tuple(by_area), (None,) * n)]  # the plain greedy layout
+    while len(population) < size:
+        # Roughly largest first, like the anytime search
+        order = sorted(
+            range(n), key=lambda i: -_piece_area(pieces[i]) * rng.uniform(0.65, 1.35)
+        )
+        genes = tuple(rng.choice(choices[i]) for i in range(n))
+        population.append((tuple(order), genes))
+    return population
+
+
+def _child(parents: List[Genome], choices, rng: random.Random) -> Genome:
+    (order_a, genes_a), (order_b, genes_b) = parents
+    order = order_crossover(order_a, order_b, rng)
+    if len(order) > 1 and rng.random() < SWAP_RATE:
+        i, j = rng.sample(range(len(order)), 2)
+        order[i], order[j] = order[j], order[i]
+    genes = [ga if rng.random() < 0.5 else gb for ga, gb in zip(genes_a, genes_b)]
+    for i in range(len(genes)):
+        if rng.random() < ROTATION_RATE:
+            genes[i] = rng.choice(choices[i])
+    return tuple(order), tuple(genes)
+
+
+def pack_genetic(
+    pieces: List[Dict[str, Any]],
+    sheet_width: int,
+    sheet_height: int,
+    allow_rotation: bool,
+    kerf: int,
+    time_budget: Optional[float] = None,
+    seed: Optional[int] = None,
+    generations: Optional[int] = None,
+    population: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    deadline: Optional[float] = None,
+    cancel: Optional[CancelToken] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """Evolve piece orders/rotations; best layout within the budget.
+
+    Stops after ``generations`` generations (default `GENETIC_GENERATIONS`)
+    or once ``time_budget`` seconds (default `GENETIC_TIME_BUDGET`) are
+    spent, whichever comes first. The first individual is the plain greedy
+    order, so the result is never worse than the default heuristic. With a
+    fixed ``seed`` and no time limit hit, the result is reproducible.
+
+    Past ``deadline`` or once ``cancel`` is cancelled the search stops and
+    returns the best layout so far, marked ``"truncated"``.
+    ``progress(done, total)`` is called after each generation.
+    """
+    if not pieces:
+        return pack_in_order([], sheet_width, sheet_height, allow_rotation, kerf)
+
+    stop = stop_token(deadline, cancel)
+    budget = GENETIC_TIME_BUDGET if time_budget is None else time_budget
+    deadline = time.monotonic() + clamp_budget(budget, stop)
+    rounds = max(1, generations or GENETIC_GENERATIONS)
+    size = max(ELITE + 1, population or GENETIC_POPULATION)
+    workers = max_workers or default_workers()
+    rng = random.Random(0 if seed is None else int(seed))
+    choices = _rotation_choices(pieces, allow_rotation, sheet_width, sheet_height)
+
+    fitness: Dict[Genome, Tuple] = {}
+    best: Optional[Tuple[Tuple, Dict[str, Any]]] = None
+    current = _initial(pieces, choices, size, rng)
+
+    # One pool for every generation
+    with worker_pool(min(workers, size)) as pool:
+        for generation in range(rounds):
+            todo = [g for g in dict.fromkeys(current) if g not in fitness]
+            remaining = deadline - time.monotonic()
+            if todo and (remaining > 0 or best is None):
+                args = [
+                    (pieces, sheet_width, sheet_height, allow_rotation, kerf, g, stop)
+                    for g in todo
+                ]
+                for idx, result in run_budgeted(
+                    _evaluate,
+                    args,
+                    max(0.0, remaining),
+                    workers,
+                    cancel=stop,
+                    executor=pool,
+                ):
+                    score = layout_score(result)
+                    fitness[todo[idx]] = score
+                    if best is None or score < best[0]:
+                        best = (score, result)
+            # Individuals that didn't finish in time drop out
+            scored = sorted(
+                (g for g in dict.fromkeys(current) if g in fitness), key=fitness.get
+            )
+            if progress is not None:
+                progress(generation + 1, rounds)
+            if time.monotonic() >= deadline or not scored or stop.cancelled():
+                break
+
+            nxt = scored[:ELITE]
+            while len(nxt) < size:
+                parents = [
+                    min(
+                        rng.sample(scored, min(TOURNAMENT, len(scored))),
+                        key=fitness.get,
+                    )
+                    for _ in range(2)
+                ]
+                nxt.append(_child(parents, choices, rng))
+            current = nxt
+
+    if best is None:
+        return truncated_layout(pieces)
+    if stop.cancelled():
+        return dict(best[1], truncated=True)
+    return best[1]
@@ -0,0 +1,240 @@
+"""No-fit / inner-fit polygons for irregular nesting.
+
+For a fixed polygon ``A`` and a moving polygon ``B`` (with its reference
+point at its local origin), the no-fit polygon NFP(A, B) = A ⊕ (−B) is the
+set of translations of ``B`` that make it overlap ``A``. Its interior is
+forbidden, its boundary is where the two just touch. The inner-fit polygon
+is the set of translations that keep ``B`` on the sheet; for a rectangular
+sheet and ``B`` normalised to its bounding box that is just a rectangle.
+
+A piece can go wherever the inner-fit polygon isn't inside any no-fit
+polygon, so placement only has to look at the vertices of that region
+instead of trying positions one by one.
+
+Minkowski sums use pyclipper when it is installed; otherwise both shapes
+are triangulated and the convex sums of the triangle pairs are unioned
+with shapely. NFPs only depend on the two shapes and their angles, so they
+are memoised in a bounded LRU cache.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+import numpy as np
+
+from ._optimiser_common import (
+    Polygon,
+    box,
+    shapely,
+    shp_rotate,
+    shp_translate,
+    unary_union,
+    pyclipper,
+    _HAS_PYCLIPPER,
+)
+
+# Fixed-point scale used for pyclipper (1/1000 mm)
+CLIPPER_SCALE = 1000.0
+
+# Overlap area (mm²) below which two shapes are considered touching. Vertex
+# positions come from polygon intersections, so exact zero is too strict.
+AREA_EPS = 1e-6
+
+
+class NFPCache:
+    """Bounded LRU cache of no-fit polygons."""
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Shared cache used by pack_irregular; pieces repeat a lot across jobs
+nfp_cache = NFPCache()
+
+
+def geometry_key(poly: Any) -> str:
+    """Stable hash of a polygon's shape (coordinates rounded to 1e-6 mm)."""
+    coords = np.round(shapely.get_coordinates(poly), 6) + 0.0  # no -0.0
+    return hashlib.blake2b(coords.tobytes(), digest_size=16).hexdigest()
+
+
+def rotated_variant(poly: Any, angle: float) -> Tuple[Any, float, float]:
+    """Rotate about the origin and move the bbox corner to (0, 0).
+
+    Returns the normalised polygon and the (minx, miny) that was removed.
+    """
+    rot = shp_rotate(poly, angle, origin=(0, 0), use_radians=False)
+    minx, miny, _, _ = rot.bounds
+    return shp_translate(rot, xoff=-minx, yoff=-miny), minx, miny
+
+
+def _clipper_path(coords) -> list:
+    return [
+        (int(round(x * CLIPPER_SCALE)), int(round(y * CLIPPER_SCALE)))
+        for (x, y) in coords
+    ]
+
+
+def _polytree_to_shapely(node) -> Any:
+    polys = []
+
+    def walk(n):
+        for child in n.Childs:
+            # Outer contours; their children are holes, whose children are
+            # outer contours again (islands)
+            shell = [(x / CLIPPER_SCALE, y / CLIPPER_SCALE) for x, y in child.Contour]
+            holes = [
+                [(x / CLIPPER_SCALE, y / CLIPPER_SCALE) for x, y in h.Contour]
+                for h in child.Childs
+            ]
+            polys.append(Polygon(shell, holes))
+            for h in child.Childs:
+                walk(h)
+
+    walk(node)
+    if not polys:
+        return Polygon()
+    return unary_union(polys)
+
+
+def _minkowski_clipper(a: Any, b: Any) -> Any:
+    # A ⊕ B = (∂A ⊕ B) ∪ (A + b0) for connected B: any copy of B that meets
+    # A either crosses its boundary or lies entirely inside it.
+    path_a = _clipper_path(list(a.exterior.coords)[:-1])
+    path_b = _clipper_path(list(b.exterior.coords)[:-1])
+    swept = pyclipper.MinkowskiSum(path_b, path_a, True)
+    b0x, b0y = path_b[0]
+    shifted_a = [(x + b0x, y + b0y) for x, y in path_a]
+
+    pc = pyclipper.Pyclipper()
+    pc.AddPaths(swept, pyclipper.PT_SUBJECT, True)
+    pc.AddPath(shifted_a, pyclipper.PT_CLIP, True)
+    tree = pc.Execute2(pyclipper.CT_UNION, pyclipper.PFT_NONZERO, pyclipper.PFT_NONZERO)
+    return _polytree_to_shapely(tree)
+
+
+def _triangles(poly: Any) -> np.ndarray:
+    if _is_convex(poly):
+        return np.asarray(poly.exterior.coords)[None, :-1, :]
+    tris = shapely.get_parts(shapely.constrained_delaunay_triangles(poly))
+    return np.stack([np.asarray(t.exterior.coords)[:3] for t in tris])
+
+
+def _minkowski_shapely(a: Any, b: Any) -> Any:
+    # Sum of two convex pieces is the hull of all vertex sums; the sum of
+    # two polygons is the union over their convex (triangle) parts.
+    ta = _triangles(a)
+    tb = _triangles(b)
+    sums = ta[:, None, :, None, :] + tb[None, :, None, :, :]
+    sums = sums.reshape(len(ta) * len(tb), -1, 2)
+    hulls = shapely.convex_hull(shapely.multipoints(sums))
+    return shapely.union_all(hulls)
+
+
+def _is_convex(poly: Any) -> bool:
+    return poly.area >= poly.convex_hull.area * (1 - 1e-9)
+
+
+def minkowski_sum(a: Any, b: Any) -> Any:
+    if _is_convex(a) and _is_convex(b):
+        # Most cabinet parts are rectangles: the sum is the hull of the
+        # pairwise vertex sums, no clipping needed
+        va = np.asarray(a.exterior.coords)[:-1]
+        vb = np.asarray(b.exterior.coords)[:-1]
+        sums = (va[:, None, :] + vb[None, :, :]).reshape(-1, 2)
+        return shapely.convex_hull(shapely.multipoints(sums))
+    if _HAS_PYCLIPPER:
+        return _minkowski_clipper(a, b)
+    return _minkowski_shapely(a, b)
+
+
+def no_fit_polygon(fixed: Any, moving: Any) -> Any:
+    """Translations of ``moving`` whose interior overlaps ``fixed``."""
+    negated = shapely.transform(moving, lambda c: -c)
+    return minkowski_sum(fixed, negated)
+
+
+def cached_nfp(
+    fixed: Any,
+    fixed_key: Hashable,
+    moving: Any,
+    moving_key: Hashable,
+    cache: Optional[NFPCache] = None,
+) -> Any:
+    """`no_fit_polygon` memoised on the callers' (shape hash, angle) keys."""
+    cache = nfp_cache if cache is None else cache
+    key = (fixed_key, moving_key)
+    nfp = cache.get(key)
+    if nfp is None:
+        nfp = no_fit_polygon(fixed, moving)
+        shapely.prepare(nfp)
+        cache.put(key, nfp)
+    return nfp
+
+
+def inner_fit_rect(sheet_w: float, sheet_h: float, w: float, h: float):
+    """Feasible bbox-corner positions for a ``w`` x ``h`` piece, or None."""
+    if w > sheet_w + 1e-9 or h > sheet_h + 1e-9:
+        return None
+    return box(0, 0, max(0.0, sheet_w - w), max(0.0, sheet_h - h))
+
+
+def feasible_vertices(ifp: Any, nfps: list) -> np.ndarray:
+    """Candidate positions, bottom-left first, not inside any NFP.
+
+    These are the vertices of the feasible region: corners of the
+    inner-fit rectangle, NFP vertices and the crossings between NFP and
+    inner-fit boundaries. Degenerate feasible regions (a piece that fits a
+    gap exactly) are kept, since only NFP interiors are excluded.
+    """
+    minx, miny, maxx, maxy = ifp.bounds
+    if not nfps:
+        return np.array([[minx, miny]])
+    lines = [ifp.boundary] + [n.boundary for n in nfps]
+    noded = unary_union(lines)
+    pts = np.unique(np.round(shapely.get_coordinates(noded), 6), axis=0)
+    eps = 1e-9
+    inside = (
+        (pts[:, 0] >= minx - eps)
+        & (pts[:, 0] <= maxx + eps)
+        & (pts[:, 1] >= miny - eps)
+        & (pts[:, 1] <= maxy + eps)
+    )
+    pts = pts[inside]
+    if len(pts) == 0:
+        return pts
+    points = shapely.points(pts)
+    tree = shapely.STRtree(nfps)
+    hit, _ = tree.query(points, predicate="within")
+    ok = np.ones(len(pts), dtype=bool)
+    ok[hit] = False
+    pts = pts[ok]
+    order = np.lexsort((pts[:, 0], pts[:, 1]))
+    return pts[order]
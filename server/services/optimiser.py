@@ -4,11 +4,15 @@ This module preserves the original `pack(...)` function signature while
 delegating rectangular and irregular packing to smaller modules.
 """
 
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional
 
-from ._optimiser_common import _IRREGULAR_DEPS_OK
-from .rect_packer import pack_rectangles
+from ._optimiser_common import _IRREGULAR_DEPS_OK, polygons_as_bboxes
+from .cancellation import CancelToken, stop_token
+from .rect_packer import pack_rectangles, pack_rectangles_portfolio
+from .guillotine_packer import pack_guillotine
 from .irregular_packer import pack_irregular
+from .metaheuristic import pack_genetic
+from .search import pack_anytime
 
 
 def pack(
@@ -18,6 +22,12 @@ def pack(
     allow_rotation: bool = True,
     kerf: int = 0,
     packing_mode: str = "heuristic",
+    time_budget: Optional[float] = None,
+    seed: Optional[int] = None,
+    generations: Optional[int] = None,
+    deadline: Optional[float] = None,
+    cancel: Optional[CancelToken] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
 ) -> Dict[str, Any]:
     """Bin-pack rectangular or polygon pieces into as many sheets as needed.
 
@@ -25,39 +35,181 @@ def pack(
     `pack_irregular` when irregular pieces are present and shapely is
     available; otherwise falls back to bounding-box packing using
     `pack_rectangles`.
+
+    Polygon jobs take ``packing_mode`` "heuristic", "simple", "exhaustive",
+    "raster" (the exhaustive grid search on bitmaps, see `raster`) or "nfp".
+
+    ``packing_mode="hybrid"`` packs the plain rectangles of a mixed job with
+    `pack_rectangles` and only nests the polygons, into the gaps left and
+    then onto new sheets, with `pack_irregular`.
+
+    ``packing_mode="portfolio"`` packs rectangles with every rectpack
+    configuration in `rect_packer.PORTFOLIO` and keeps the best result found
+    within ``time_budget`` seconds. ``packing_mode="guillotine"`` uses the
+    native kerf-aware packer in `guillotine_packer`.
+
+    ``packing_mode="anytime"`` runs many randomised greedy passes in
+    parallel (see `search.pack_anytime`) and returns the best found within
+    ``time_budget`` seconds; ``seed`` makes the run reproducible.
+
+    ``packing_mode="genetic"`` evolves piece orders and rotations with
+    `metaheuristic.pack_genetic` for up to ``generations`` generations or
+    ``time_budget`` seconds. Slow, for jobs where material is what counts.
+
+    Every mode stops once ``deadline`` (a `time.monotonic()` value) passes
+    or ``cancel`` (a `cancellation.CancelToken`) is cancelled, and returns
+    the best layout it has so far: pieces not placed are listed under
+    ``"unplaced"`` and the result has ``"truncated": True``. See
+    `cancellation`.
+
+    ``progress(done, total)`` reports pieces placed by the greedy engines
+    (the polygons in hybrid mode) and generations in genetic mode; the
+    other search modes only report by returning.
     """
     if sheet_width <= 0 or sheet_height <= 0:
         raise ValueError("Sheet size must be positive")
+    stop = stop_token(deadline, cancel)
+
+    if packing_mode == "anytime":
+        return pack_anytime(
+            pieces,
+            sheet_width,
+            sheet_height,
+            allow_rotation,
+            kerf,
+            time_budget=time_budget,
+            seed=seed,
+            cancel=stop,
+        )
+
+    if packing_mode == "genetic":
+        return pack_genetic(
+            pieces,
+            sheet_width,
+            sheet_height,
+            allow_rotation,
+            kerf,
+            time_budget=time_budget,
+            seed=seed,
+            generations=generations,
+            cancel=stop,
+            progress=progress,
+        )
 
     contains_polygons = any("polygon" in p for p in pieces)
     if contains_polygons:
         if _IRREGULAR_DEPS_OK:
+            if packing_mode == "hybrid":
+                return _pack_hybrid(
+                    pieces,
+                    sheet_width,
+                    sheet_height,
+                    allow_rotation,
+                    kerf,
+                    stop,
+                    progress,
+                )
             return pack_irregular(
-                pieces, sheet_width, sheet_height, allow_rotation, kerf, packing_mode
+                pieces,
+                sheet_width,
+                sheet_height,
+                allow_rotation,
+                kerf,
+                packing_mode,
+                cancel=stop,
+                progress=progress,
             )
         # Fallback: convert polygons into bounding boxes and pack as rectangles
-        rect_like = []
-        for p in pieces:
-            if "polygon" in p and p["polygon"]:
-                xs = [pt[0] for pt in p["polygon"]]
-                ys = [pt[1] for pt in p["polygon"]]
-                w = max(xs) - min(xs)
-                h = max(ys) - min(ys)
-                rect_like.append(
-                    {
-                        "id": p["id"],
-                        "width": int(round(w)),
-                        "height": int(round(h)),
-                        "name": p.get("name"),
-                    }
-                )
-            else:
-                rect_like.append(p)
-        result = pack_rectangles(
-            rect_like, sheet_width, sheet_height, allow_rotation, kerf
+        rect_like = polygons_as_bboxes(pieces)
+        result = _pack_rects(
+            rect_like,
+            sheet_width,
+            sheet_height,
+            allow_rotation,
+            kerf,
+            packing_mode,
+            time_budget,
+            stop,
+            progress,
         )
         for s in result["sheets"]:
             s.setdefault("polygons", [])
         return result
     else:
-        return pack_rectangles(pieces, sheet_width, sheet_height, allow_rotation, kerf)
+        return _pack_rects(
+            pieces,
+            sheet_width,
+            sheet_height,
+            allow_rotation,
+            kerf,
+            packing_mode,
+            time_budget,
+            stop,
+            progress,
+        )
+
+
+def _pack_hybrid(
+    pieces, sheet_width, sheet_height, allow_rotation, kerf, stop, progress
+):
+    rects = [p for p in pieces if not p.get("polygon")]
+    polygons = [p for p in pieces if p.get("polygon")]
+    rect_result = pack_rectangles(
+        rects, sheet_width, sheet_height, allow_rotation, kerf, cancel=stop
+    )
+    result = pack_irregular(
+        polygons,
+        sheet_width,
+        sheet_height,
+        allow_rotation,
+        kerf,
+        existing_sheets=rect_result["sheets"],
+        cancel=stop,
+        progress=progress,
+    )
+    result["unplaced"] = rect_result["unplaced"] + result.get("unplaced", [])
+    if rect_result.get("truncated"):
+        result["truncated"] = True
+    return result
+
+
+def _pack_rects(
+    pieces,
+    sheet_width,
+    sheet_height,
+    allow_rotation,
+    kerf,
+    packing_mode,
+    time_budget,
+    stop,
+    progress=None,
+):
+    if packing_mode == "portfolio":
+        return pack_rectangles_portfolio(
+            pieces,
+            sheet_width,
+            sheet_height,
+            allow_rotation,
+            kerf,
+            time_budget,
+            cancel=stop,
+        )
+    if packing_mode == "guillotine":
+        return pack_guillotine(
+            pieces,
+            sheet_width,
+            sheet_height,
+            allow_rotation,
+            kerf,
+            cancel=stop,
+            progress=progress,
+        )
+    return pack_rectangles(
+        pieces,
+        sheet_width,
+        sheet_height,
+        allow_rotation,
+        kerf,
+        cancel=stop,
+        progress=progress,
+    )
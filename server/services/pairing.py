@@ -0,0 +1,137 @@
+"""Pre-nesting of complementary polygon pairs.
+
+Mirrored parts (left/right L returns, corner panels) often interlock when
+one of them is turned half a turn: together they take little more room
+than one of them alone. Placing them separately leaves that to chance, so
+before the main placement loop such pairs are merged into one compound
+piece, and the placer handles one item instead of two.
+
+For each candidate pair the second piece is tried at each relative angle
+against the first along the boundary of their no-fit polygon (where the
+two just touch), and the position with the smallest combined bbox is kept.
+Pairs whose combined bbox is at most `PAIR_BBOX_RATIO` of the sum of their
+own bboxes, and which fill at least `PAIR_MIN_FILL` of it, are matched
+greedily, best ratio first. The fill condition keeps out thin L shapes
+nested into each other: they save bbox area but leave the same void, which
+the pocket filling of the heuristic mode uses better.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from ._optimiser_common import shapely, shp_rotate, shp_translate
+from .nfp import no_fit_polygon
+
+# A pair is merged when its combined bbox is at most this fraction of the
+# two bboxes added up
+PAIR_BBOX_RATIO = 0.8
+
+# ...and the two pieces cover at least this fraction of that bbox
+PAIR_MIN_FILL = 0.7
+
+# Only pieces within this area ratio of each other are tried as a pair;
+# mirrored parts have equal areas
+PAIR_AREA_RATIO = 0.75
+
+
+class Pair(NamedTuple):
+    """Piece ``j`` turned by ``angle`` and moved by ``offset`` next to ``i``."""
+
+    i: int
+    j: int
+    angle: int
+    offset: Tuple[float, float]
+    ratio: float
+
+
+def _bbox_area(geom: Any) -> float:
+    x0, y0, x1, y1 = geom.bounds
+    return (x1 - x0) * (y1 - y0)
+
+
+def best_fit(a: Any, b: Any, angles: Sequence[int]) -> Tuple[float, int, tuple]:
+    """Tightest touching position of ``b`` next to ``a``.
+
+    Returns (combined bbox area, angle, offset) with ``b`` rotated about
+    the origin by the angle, then moved by the offset. Offsets are rounded
+    to 1e-3 mm, the grid of the integer geometry backend.
+    """
+    ax0, ay0, ax1, ay1 = a.bounds
+    best = (float("inf"), 0, (0.0, 0.0))
+    for angle in angles:
+        moving = shp_rotate(b, angle, origin=(0, 0), use_radians=False)
+        bx0, by0, bx1, by1 = moving.bounds
+        nfp = no_fit_polygon(a, moving)
+        # The bbox only changes slope where an edge of one bbox passes an
+        # edge of the other, so besides the vertices only the points where
+        # the NFP boundary crosses those alignments can be best
+        nx0, ny0, nx1, ny1 = nfp.bounds
+        xs = (ax0 - bx0, ax1 - bx1)
+        ys = (ay0 - by0, ay1 - by1)
+        lines = shapely.linestrings(
+            [[(x, ny0 - 1), (x, ny1 + 1)] for x in xs]
+            + [[(nx0 - 1, y), (nx1 + 1, y)] for y in ys]
+        )
+        crossings = shapely.intersection(nfp.boundary, lines)
+        coords = np.vstack(
+            (shapely.get_coordinates(nfp), shapely.get_coordinates(crossings))
+        )
+        pts = np.unique(np.round(coords, 3), axis=0)
+        if len(pts) == 0:
+            continue
+        tx, ty = pts[:, 0], pts[:, 1]
+        w = np.maximum(ax1, bx1 + tx) - np.minimum(ax0, bx0 + tx)
+        h = np.maximum(ay1, by1 + ty) - np.minimum(ay0, by0 + ty)
+        # Smallest bbox first, then the squarer one
+        for k in np.lexsort((np.abs(w - h), w * h)):
+            moved = shp_translate(moving, xoff=tx[k], yoff=ty[k])
+            # NFP vertices touch by construction; rounding may not
+            if not shapely.relate_pattern(a, moved, "T********"):
+                if w[k] * h[k] < best[0]:
+                    best = (float(w[k] * h[k]), angle, (float(tx[k]), float(ty[k])))
+                break
+    return best
+
+
+def complementary_pairs(
+    shapes: List[Any], allow_rotation: bool, ratio: float = PAIR_BBOX_RATIO
+) -> List[Pair]:
+    """Disjoint pairs of ``shapes`` worth merging, best first.
+
+    Only concave shapes are paired: convex ones can't interlock. Results
+    are shared between pairs of identical shapes (equal WKB).
+    """
+    angles = (0, 180) if allow_rotation else (0,)
+    concave = [
+        i
+        for i, s in enumerate(shapes)
+        if s.geom_type == "Polygon" and s.area < s.convex_hull.area * (1 - 1e-6)
+    ]
+    keys = {i: shapes[i].wkb for i in concave}
+    cache: Dict[tuple, tuple] = {}
+    found = []
+    for n, i in enumerate(concave):
+        a = shapes[i]
+        for j in concave[n + 1 :]:
+            b = shapes[j]
+            if min(a.area, b.area) < PAIR_AREA_RATIO * max(a.area, b.area):
+                continue
+            own = _bbox_area(a) + _bbox_area(b)
+            # The pair's bbox can't be smaller than the bigger of the two
+            if max(_bbox_area(a), _bbox_area(b)) > ratio * own:
+                continue
+            key = (keys[i], keys[j])
+            if key not in cache:
+                cache[key] = best_fit(a, b, angles)
+            area, angle, offset = cache[key]
+            if area <= ratio * own and a.area + b.area >= PAIR_MIN_FILL * area:
+                found.append(Pair(i, j, angle, offset, area / own))
+
+    pairs = []
+    used = set()
+    for p in sorted(found, key=lambda p: (p.ratio, p.i, p.j)):
+        if p.i not in used and p.j not in used:
+            used.update((p.i, p.j))
+            pairs.append(p)
+    return pairs
@@ -0,0 +1,140 @@
+"""Occupancy-grid (bitmap) collision tests for exhaustive placement.
+
+The sheet is divided into square cells the size of the exhaustive search
+step. A cell is marked as soon as any placed piece's interior reaches into
+it, and each rotated piece gets a mask of the cells it would cover when
+its bbox corner sits on a grid point. Both are over-approximations, so an
+offset where no marked cell meets the piece mask is guaranteed to be free
+of overlaps. The number of collisions at every offset comes out of one
+correlation: a summed-area table when the mask is a full rectangle (the
+common case for cabinet parts), an FFT otherwise.
+"""
+
+from math import ceil, floor
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from ._optimiser_common import shapely
+
+
+def rasterise(geom: Any, cell: float, rows: int, cols: int, row0=0, col0=0):
+    """Cells of a ``rows`` x ``cols`` block that ``geom``'s interior enters.
+
+    The block starts at cell (``row0``, ``col0``); row 0 is the bottom
+    row. The shape is cut into one strip per row and every cell under the
+    x-extent of each piece of a strip is marked, which never misses a cell
+    (it can over-mark the gap of a U-shape inside a single row). Cells that
+    the shape only touches along an edge or corner are left clear.
+    """
+    mask = np.zeros((max(rows, 0), max(cols, 0)), dtype=bool)
+    if rows <= 0 or cols <= 0:
+        return mask
+    minx, _, maxx, _ = geom.bounds
+    y0 = (np.arange(rows) + row0) * cell
+    strips = shapely.box(minx - 1.0, y0, maxx + 1.0, y0 + cell)
+    parts, row = shapely.get_parts(
+        shapely.intersection(geom, strips), return_index=True
+    )
+    # Only pieces with area; edge/vertex contacts come back as lines/points
+    keep = shapely.area(parts) > 0
+    bounds = shapely.bounds(parts[keep])
+    row = row[keep]
+    first = np.floor(bounds[:, 0] / cell + 1e-9).astype(np.int64) - col0
+    last = np.ceil(bounds[:, 2] / cell - 1e-9).astype(np.int64) - col0
+    first = np.clip(first, 0, cols)
+    last = np.clip(last, 0, cols)
+    for r, a, b in zip(row, first, last):
+        mask[r, a:b] = True
+    return mask
+
+
+def piece_mask(geom: Any, cell: float) -> np.ndarray:
+    """Mask of a shape normalised to its bbox, for grid-aligned offsets."""
+    _, _, w, h = geom.bounds
+    return rasterise(geom, cell, max(1, ceil(h / cell)), max(1, ceil(w / cell)))
+
+
+def _fft_shape(n: int) -> int:
+    # Next size made of small primes, which numpy's FFT handles quickly
+    size = n
+    while True:
+        m = size
+        for p in (2, 3, 5):
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return size
+        size += 1
+
+
+class OccupancyGrid:
+    """Marked cells of one sheet plus cached transforms of the bitmap."""
+
+    def __init__(self, width: float, height: float, cell: float):
+        self.cell = float(cell)
+        self.width = float(width)
+        self.height = float(height)
+        self.grid = np.zeros(
+            (max(1, ceil(height / cell)), max(1, ceil(width / cell))), dtype=bool
+        )
+        self.free_cells = self.grid.size
+        self._sat: Optional[np.ndarray] = None
+        self._spectrum: Optional[np.ndarray] = None
+        rows, cols = self.grid.shape
+        # Offsets where the whole mask is on the grid never wrap around in a
+        # circular correlation, so the FFT only has to cover the grid itself
+        self._fft_size = (_fft_shape(rows), _fft_shape(cols))
+
+    def add(self, geom: Any) -> None:
+        """Mark the cells covered by a placed piece."""
+        rows, cols = self.grid.shape
+        minx, miny, maxx, maxy = geom.bounds
+        c = self.cell
+        r0, r1 = max(0, floor(miny / c)), min(rows, ceil(maxy / c))
+        c0, c1 = max(0, floor(minx / c)), min(cols, ceil(maxx / c))
+        block = rasterise(geom, c, r1 - r0, c1 - c0, r0, c0)
+        self.grid[r0:r1, c0:c1] |= block
+        self.free_cells = self.grid.size - int(np.count_nonzero(self.grid))
+        self._sat = None
+        self._spectrum = None
+
+    def collisions(
+        self, mask: np.ndarray, spectra: Optional[Dict] = None
+    ) -> np.ndarray:
+        """Marked cells under ``mask`` for every offset that stays on the grid.
+
+        Entry ``[i, j]`` is for the mask's corner at cell (i, j). ``spectra``
+        is an optional dict kept alongside the mask, where the mask's FFT is
+        cached for the next sheet of the same size.
+        """
+        rows, cols = self.grid.shape
+        mr, mc = mask.shape
+        if mr > rows or mc > cols or mask.sum() > self.free_cells:
+            return np.zeros((0, 0), dtype=np.int64)
+        if mask.all():
+            return self._box_sums(mr, mc)
+        return self._correlate(mask, {} if spectra is None else spectra)
+
+    def _box_sums(self, mr: int, mc: int) -> np.ndarray:
+        if self._sat is None:
+            sat = np.zeros((self.grid.shape[0] + 1, self.grid.shape[1] + 1), np.int64)
+            sat[1:, 1:] = self.grid.cumsum(0).cumsum(1)
+            self._sat = sat
+        s = self._sat
+        return s[mr:, mc:] - s[:-mr, mc:] - s[mr:, :-mc] + s[:-mr, :-mc]
+
+    def _correlate(self, mask: np.ndarray, spectra: Dict) -> np.ndarray:
+        if self._spectrum is None:
+            # float32 is plenty for counts this small and halves the work
+            self._spectrum = np.fft.rfft2(self.grid.astype(np.float32), self._fft_size)
+        rows, cols = self.grid.shape
+        mr, mc = mask.shape
+        kernel = spectra.get(self._fft_size)
+        if kernel is None:
+            # Correlation is convolution with the flipped mask
+            kernel = np.fft.rfft2(mask[::-1, ::-1].astype(np.float32), self._fft_size)
+            spectra[self._fft_size] = kernel
+        full = np.fft.irfft2(self._spectrum * kernel, self._fft_size)
+        valid = full[mr - 1 : rows, mc - 1 : cols]
+        return np.rint(valid).astype(np.int64)
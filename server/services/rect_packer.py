@@ -1,5 +1,32 @@
-from typing import List, Dict, Any
-from rectpack import newPacker, GuillotineBafSas
+from typing import Callable, List, Dict, Any, Optional
+
+import rectpack
+from rectpack import newPacker, GuillotineBafSas, SORT_AREA, PackingMode, PackingBin
+
+from ._optimiser_common import layout_score, truncated_layout
+from ._parallel import default_workers, run_budgeted, worker_pool
+from .cancellation import CancelToken, clamp_budget, stop_token
+
+# (pack_algo, sort_algo) names tried by the "portfolio" packing mode. Names
+# rather than objects so they can be sent to worker processes (rectpack's
+# sort functions are lambdas and don't pickle).
+PORTFOLIO = [
+    (algo, sort)
+    for algo in (
+        "GuillotineBafSas",
+        "GuillotineBssfSas",
+        "GuillotineBlsfSas",
+        "GuillotineBafLas",
+        "MaxRectsBssf",
+        "MaxRectsBaf",
+        "SkylineBl",
+        "SkylineMwf",
+    )
+    for sort in ("SORT_AREA", "SORT_PERI", "SORT_SSIDE", "SORT_LSIDE")
+]
+
+# Default wall-clock budget (seconds) for the portfolio when none is given
+PORTFOLIO_TIME_BUDGET = 5.0
 
 
 def pack_rectangles(
@@ -8,11 +35,29 @@ def pack_rectangles(
     sheet_height: int,
     allow_rotation: bool,
     kerf: int,
+    pack_algo: Any = GuillotineBafSas,
+    sort_algo: Any = SORT_AREA,
+    deadline: Optional[float] = None,
+    cancel: Optional[CancelToken] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
 ) -> Dict[str, Any]:
     """Pack rectangular pieces using rectpack and return the sheet placements.
 
     This is a near-1:1 extraction of the previous _pack_rectangles function.
+    ``pack_algo``/``sort_algo`` select the rectpack algorithm and the order
+    rectangles are fed to it.
+
+    Sheets are opened on demand, one at a time as the open ones fill up,
+    so there is no cap on the sheet count. Pieces that can't go on any sheet (larger
+    than the sheet itself) are listed under ``"unplaced"`` rather than being
+    dropped silently.
+
+    Packing stops early once ``deadline`` (a `time.monotonic()` value)
+    passes or ``cancel`` is cancelled. Pieces not reached by then are also
+    listed as unplaced, and the result gets ``"truncated": True``.
+    ``progress(done, total)`` is called after each piece.
     """
+    stop = stop_token(deadline, cancel)
     # Map id -> original dims/name for post-processing
     id_map = {
         p["id"]: {
@@ -23,19 +68,41 @@ def pack_rectangles(
         for p in pieces
     }
 
-    packer = newPacker(rotation=allow_rotation, pack_algo=GuillotineBafSas)
-
-    # Add rectangles; apply kerf as padding around each piece (simple approximation)
-    for p in pieces:
-        w = int(p["width"]) + kerf
-        h = int(p["height"]) + kerf
-        rid = p["id"]
-        packer.add_rect(w, h, rid=rid)
+    # Online mode so sheets are opened on demand instead of capped up front
+    packer = newPacker(
+        mode=PackingMode.Online,
+        bin_algo=PackingBin.BBF,
+        pack_algo=pack_algo,
+        rotation=allow_rotation,
+    )
 
-    # Add many bins of requested size; rectpack doesn't support infinite bins, use a safe upper bound
-    packer.add_bin(int(sheet_width), int(sheet_height), count=100)
+    # Apply kerf as padding around each piece (simple approximation)
+    rects = sort_algo(
+        [(int(p["width"]) + kerf, int(p["height"]) + kerf, p["id"]) for p in pieces]
+    )
+    fitting = []
+    unplaced = []
+    for w, h, rid in rects:
+        if _fits_sheet(w, h, sheet_width, sheet_height, allow_rotation):
+            fitting.append((w, h, rid))
+        else:
+            unplaced.append(rid)
 
-    packer.pack()
+    # Online bins only open when a rect first goes on them; one is enough
+    packer.add_bin(int(sheet_width), int(sheet_height), count=1)
+    truncated = False
+    for k, (w, h, rid) in enumerate(fitting):
+        if stop.cancelled():
+            truncated = True
+            unplaced.extend(r for _, _, r in fitting[k:])
+            break
+        if not packer.add_rect(w, h, rid):
+            # Every available sheet is open and none has room: open one more
+            packer.add_bin(int(sheet_width), int(sheet_height), count=1)
+            if not packer.add_rect(w, h, rid):
+                unplaced.append(rid)
+        if progress is not None:
+            progress(k + 1, len(fitting))
 
     # Gather placements grouped by bin index
     sheets_map: Dict[int, Dict[str, Any]] = {}
@@ -67,4 +134,86 @@ def pack_rectangles(
         )
 
     sheets = [sheets_map[i] for i in sorted(sheets_map.keys())]
-    return {"sheets": sheets}
+    result = {
+        "sheets": sheets,
+        "unplaced": [
+            {
+                "piece_id": rid,
+                "name": id_map[rid]["name"] or rid,
+                "w": id_map[rid]["w"],
+                "h": id_map[rid]["h"],
+            }
+            for rid in unplaced
+        ],
+    }
+    if truncated:
+        result["truncated"] = True
+    return result
+
+
+def _fits_sheet(w, h, sheet_width, sheet_height, allow_rotation) -> bool:
+    if w <= sheet_width and h <= sheet_height:
+        return True
+    return allow_rotation and h <= sheet_width and w <= sheet_height
+
+
+def _pack_named(
+    pieces, sheet_width, sheet_height, allow_rotation, kerf, algo, sort, cancel=None
+):
+    # Worker entry point for the portfolio; resolves names in the child process
+    return pack_rectangles(
+        pieces,
+        sheet_width,
+        sheet_height,
+        allow_rotation,
+        kerf,
+        pack_algo=getattr(rectpack, algo),
+        sort_algo=getattr(rectpack, sort),
+        cancel=cancel,
+    )
+
+
+def pack_rectangles_portfolio(
+    pieces: List[Dict[str, Any]],
+    sheet_width: int,
+    sheet_height: int,
+    allow_rotation: bool,
+    kerf: int,
+    time_budget: Optional[float] = None,
+    max_workers: Optional[int] = None,
+    deadline: Optional[float] = None,
+    cancel: Optional[CancelToken] = None,
+) -> Dict[str, Any]:
+    """Run every `PORTFOLIO` configuration and keep the best layout.
+
+    Configurations run in a process pool; whatever finishes inside
+    ``time_budget`` seconds (default `PORTFOLIO_TIME_BUDGET`) is compared with
+    `layout_score`: fewest sheets, then least material on the last sheet.
+    Ties go to the earlier configuration, so the original GuillotineBafSas /
+    area ordering wins unless something is strictly better.
+
+    ``deadline``/``cancel`` stop the run as in `pack_rectangles`; if no
+    configuration finished by then the layout is empty and truncated.
+    """
+    stop = stop_token(deadline, cancel)
+    budget = PORTFOLIO_TIME_BUDGET if time_budget is None else time_budget
+    args = [
+        (pieces, sheet_width, sheet_height, allow_rotation, kerf, algo, sort, stop)
+        for algo, sort in PORTFOLIO
+    ]
+    workers = min(max_workers or default_workers(), len(args))
+    with worker_pool(workers) as pool:
+        results = run_budgeted(
+            _pack_named,
+            args,
+            clamp_budget(budget, stop),
+            workers,
+            cancel=stop,
+            executor=pool,
+        )
+    if not results:
+        return truncated_layout(pieces)
+    _, best = min(results, key=lambda r: (layout_score(r[1]), r[0]))
+    if stop.cancelled() and len(results) < len(args):
+        best = dict(best, truncated=True)
+    return best
@@ -0,0 +1,206 @@
+"""Anytime multi-start search over piece order and orientation.
+
+The packers are single-pass greedy algorithms, so the order pieces are fed
+in (and the orientation they start from) decides the layout. This module
+runs many randomised orderings across a process pool and keeps the best
+layout found within a time budget. Start ``i`` for a given ``seed`` always
+produces the same layout, so a run is reproducible.
+"""
+
+import random
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from rectpack import SORT_NONE
+
+from ._optimiser_common import (
+    _IRREGULAR_DEPS_OK,
+    layout_score,
+    polygons_as_bboxes,
+    truncated_layout,
+)
+from ._parallel import default_workers, run_budgeted, worker_pool
+from .cancellation import CancelToken, clamp_budget, stop_token
+from .irregular_packer import pack_irregular
+from .rect_packer import pack_rectangles
+
+# Defaults for the "anytime" packing mode
+ANYTIME_TIME_BUDGET = 10.0
+ANYTIME_STARTS = 64
+
+# Relative noise applied to piece areas when building a randomised order.
+# Orders stay roughly "largest first", which is what the greedy placers
+# need, while still exploring different ways of filling the gaps.
+ORDER_JITTER = 0.35
+
+
+def _rotate_piece_90(p: Dict[str, Any]) -> Dict[str, Any]:
+    q = dict(p)
+    if "polygon" in p and p["polygon"]:
+        # Quarter turn counter-clockwise about the origin, like shapely's rotate
+        q["polygon"] = [[-y, x] for x, y in p["polygon"]]
+    else:
+        q["width"], q["height"] = p["height"], p["width"]
+    return q
+
+
+def _piece_area(p: Dict[str, Any]) -> float:
+    pts = p.get("polygon")
+    if pts:
+        acc = 0.0
+        for i in range(len(pts)):
+            x1, y1 = pts[i]
+            x2, y2 = pts[(i + 1) % len(pts)]
+            acc += x1 * y2 - x2 * y1
+        return abs(acc) / 2.0
+    return float(p["width"]) * float(p["height"])
+
+
+def perturb(
+    pieces: List[Dict[str, Any]], allow_rotation: bool, rng: random.Random
+) -> Tuple[List[Dict[str, Any]], Set[Any]]:
+    """Return a jittered largest-first order and the ids pre-rotated by 90°."""
+    keyed = [
+        (_piece_area(p) * rng.uniform(1 - ORDER_JITTER, 1 + ORDER_JITTER), i, p)
+        for i, p in enumerate(pieces)
+    ]
+    keyed.sort(key=lambda t: (-t[0], t[1]))
+    out = []
+    rotated: Set[Any] = set()
+    for _, _, p in keyed:
+        if allow_rotation and rng.random() < 0.5:
+            out.append(_rotate_piece_90(p))
+            rotated.add(p["id"])
+        else:
+            out.append(p)
+    return out, rotated
+
+
+def pack_in_order(
+    pieces: List[Dict[str, Any]],
+    sheet_width: int,
+    sheet_height: int,
+    allow_rotation: bool,
+    kerf: int,
+    rotated: Optional[Set[Any]] = None,
+    cancel: Optional[CancelToken] = None,
+) -> Dict[str, Any]:
+    """Pack ``pieces`` in exactly the given order with the default engines.
+
+    ``rotated`` lists pieces that were turned 90° before packing; their
+    reported angles are corrected back to the original orientation.
+    ``cancel`` is handed on to the engine.
+    """
+    rotated = rotated or set()
+    if any("polygon" in p and p["polygon"] for p in pieces) and _IRREGULAR_DEPS_OK:
+        result = pack_irregular(
+            pieces,
+            sheet_width,
+            sheet_height,
+            allow_rotation,
+            kerf,
+            "heuristic",
+            sort_pieces=False,
+            cancel=cancel,
+        )
+        for sheet in result["sheets"]:
+            for entry in sheet["polygons"] + sheet["rects"]:
+                if entry["piece_id"] in rotated:
+                    entry["angle"] = (int(entry["angle"]) + 90) % 360
+        return result
+
+    result = pack_rectangles(
+        polygons_as_bboxes(pieces),
+        sheet_width,
+        sheet_height,
+        allow_rotation,
+        kerf,
+        sort_algo=SORT_NONE,
+        cancel=cancel,
+    )
+    for sheet in result["sheets"]:
+        sheet.setdefault("polygons", [])
+        for r in sheet["rects"]:
+            if r["piece_id"] in rotated:
+                # rect_packer reports 0/90 relative to the dims it was given
+                r["angle"] = 90 - r["angle"]
+    for u in result.get("unplaced") or []:
+        if u["piece_id"] in rotated:
+            u["w"], u["h"] = u["h"], u["w"]
+    return result
+
+
+def _run_start(
+    pieces, sheet_width, sheet_height, allow_rotation, kerf, seed, index, cancel=None
+):
+    # Worker entry point: start 0 is the plain greedy pass, so the search is
+    # never worse than the default heuristic.
+    if index == 0:
+        return pack_in_order(
+            _largest_first(pieces),
+            sheet_width,
+            sheet_height,
+            allow_rotation,
+            kerf,
+            cancel=cancel,
+        )
+    rng = random.Random(seed * 1_000_003 + index)
+    ordered, rotated = perturb(pieces, allow_rotation, rng)
+    return pack_in_order(
+        ordered, sheet_width, sheet_height, allow_rotation, kerf, rotated, cancel
+    )
+
+
+def _largest_first(pieces: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(pieces, key=_piece_area, reverse=True)
+
+
+def pack_anytime(
+    pieces: List[Dict[str, Any]],
+    sheet_width: int,
+    sheet_height: int,
+    allow_rotation: bool,
+    kerf: int,
+    time_budget: Optional[float] = None,
+    seed: Optional[int] = None,
+    starts: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    deadline: Optional[float] = None,
+    cancel: Optional[CancelToken] = None,
+) -> Dict[str, Any]:
+    """Multi-start randomised packing; best layout within ``time_budget``.
+
+    Runs up to ``starts`` independent greedy passes (default
+    `ANYTIME_STARTS`) on ``max_workers`` processes and returns the layout
+    with the best `layout_score`, preferring the lowest start index on ties.
+    The starts are fixed by ``seed`` up front and collected in index order,
+    so the result is the best of starts ``0..k-1`` where ``k`` is how many
+    got done inside the budget; with enough budget for all of them a fixed
+    ``seed`` always gives the same layout.
+
+    Past ``deadline`` or once ``cancel`` is cancelled the search stops; the
+    result is then marked ``"truncated"`` if starts were left out.
+    """
+    stop = stop_token(deadline, cancel)
+    budget = ANYTIME_TIME_BUDGET if time_budget is None else time_budget
+    n = max(1, starts or ANYTIME_STARTS)
+    seed = 0 if seed is None else int(seed)
+    args = [
+        (pieces, sheet_width, sheet_height, allow_rotation, kerf, seed, i, stop)
+        for i in range(n)
+    ]
+    workers = min(max_workers or default_workers(), n)
+    with worker_pool(workers) as pool:
+        results = run_budgeted(
+            _run_start,
+            args,
+            clamp_budget(budget, stop),
+            workers,
+            cancel=stop,
+            executor=pool,
+        )
+    if not results:
+        return truncated_layout(pieces)
+    _, best = min(results, key=lambda r: (layout_score(r[1]), r[0]))
+    if stop.cancelled() and len(results) < n:
+        best = dict(best, truncated=True)
+    return best
@@ -0,0 +1,146 @@
+"""Incremental spatial index of the pieces placed on a sheet.
+
+shapely's STRtree has to be rebuilt whenever a geometry is added, which is
+exactly what happens after every placement. A uniform grid of buckets can
+be updated in place instead: each placed geometry is filed under every
+cell its bounding box touches, and a query only looks at the cells under
+the query box. Collision checks then only see nearby pieces, however full
+the sheet is. Each geometry's convex hull is worked out once on insert for
+the staged tests in `collision`.
+"""
+
+from math import floor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from . import collision
+from ._optimiser_common import shapely
+
+
+class GridIndex:
+    """Uniform-grid bucket index over placed geometries.
+
+    With ``integer`` the collision shapes keep integer Clipper paths, for
+    the ``"clipper"`` geometry backend.
+    """
+
+    def __init__(self, cell_size: float = 250.0, integer: bool = False):
+        self.cell_size = float(cell_size)
+        self.integer = integer
+        self._geoms: List[Any] = []
+        self._shapes: List[collision.Shape] = []
+        self._buckets: Dict[Tuple[int, int], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._geoms)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._geoms)
+
+    def _cells(self, bounds):
+        minx, miny, maxx, maxy = bounds
+        c = self.cell_size
+        for i in range(int(floor(minx / c)), int(floor(maxx / c)) + 1):
+            for j in range(int(floor(miny / c)), int(floor(maxy / c)) + 1):
+                yield (i, j)
+
+    def insert(self, geom: Any) -> None:
+        # Prepared geometries make the repeated intersects() tests cheap
+        shapely.prepare(geom)
+        gid = len(self._geoms)
+        self._geoms.append(geom)
+        self._shapes.append(collision.make_shape(geom, self.integer))
+        for cell in self._cells(geom.bounds):
+            self._buckets.setdefault(cell, []).append(gid)
+
+    def query(self, bounds) -> List[Any]:
+        """Geometries whose bounding box may touch ``bounds``, in insert order."""
+        return [self._geoms[gid] for gid in self._query_ids(bounds)]
+
+    def query_shapes(self, bounds) -> List[collision.Shape]:
+        """Like `query`, but the `collision.Shape` of each geometry."""
+        return [self._shapes[gid] for gid in self._query_ids(bounds)]
+
+    def query_points(self, xs, ys) -> Tuple[np.ndarray, np.ndarray]:
+        """Pairs of a point index and a geometry whose bounding box holds
+        that point, as two arrays: point indexes and the geometries."""
+        points: List[int] = []
+        geoms: List[Any] = []
+        c = self.cell_size
+        for i, (x, y) in enumerate(zip(xs, ys)):
+            for gid in self._buckets.get((int(floor(x / c)), int(floor(y / c))), ()):
+                minx, miny, maxx, maxy = self._shapes[gid].bounds
+                if minx <= x <= maxx and miny <= y <= maxy:
+                    points.append(i)
+                    geoms.append(self._geoms[gid])
+        found = np.empty(len(geoms), dtype=object)
+        found[:] = geoms
+        return np.array(points, dtype=int), found
+
+    def _query_ids(self, bounds) -> List[int]:
+        ids = set()
+        for cell in self._cells(bounds):
+            ids.update(self._buckets.get(cell, ()))
+        minx, miny, maxx, maxy = bounds
+        out = []
+        for gid in sorted(ids):
+            gminx, gminy, gmaxx, gmaxy = self._shapes[gid].bounds
+            if gminx <= maxx and gmaxx >= minx and gminy <= maxy and gmaxy >= miny:
+                out.append(gid)
+        return out
+
+
+class MaximalRects:
+    """Maximal empty rectangles left between axis-aligned obstacles.
+
+    The usual MaxRects bookkeeping: every free rectangle that an obstacle
+    cuts into is split into the (up to four) strips around it, and strips
+    contained in another free rectangle are dropped. Obstacles that aren't
+    rectangles are simply not added, so the list always over-estimates the
+    free space, which is what makes it safe for ruling sheets out.
+    """
+
+    def __init__(self, width: float, height: float):
+        self.rects: List[Tuple[float, float, float, float]] = [
+            (0.0, 0.0, float(width), float(height))
+        ]
+        self._sizes: Optional[np.ndarray] = None
+
+    def sizes(self) -> np.ndarray:
+        """(width, height) of every free rectangle."""
+        if self._sizes is None:
+            r = np.array(self.rects, dtype=float).reshape(-1, 4)
+            self._sizes = np.column_stack((r[:, 2] - r[:, 0], r[:, 3] - r[:, 1]))
+        return self._sizes
+
+    def add_obstacle(self, bounds) -> None:
+        ox0, oy0, ox1, oy1 = bounds
+        split = []
+        for r in self.rects:
+            x0, y0, x1, y1 = r
+            if ox0 >= x1 or ox1 <= x0 or oy0 >= y1 or oy1 <= y0:
+                split.append(r)
+                continue
+            if ox0 > x0:
+                split.append((x0, y0, ox0, y1))
+            if ox1 < x1:
+                split.append((ox1, y0, x1, y1))
+            if oy0 > y0:
+                split.append((x0, y0, x1, oy0))
+            if oy1 < y1:
+                split.append((x0, oy1, x1, y1))
+        self._sizes = None
+        self.rects = [
+            r
+            for i, r in enumerate(split)
+            if not any(
+                j != i
+                and o[0] <= r[0]
+                and o[1] <= r[1]
+                and o[2] >= r[2]
+                and o[3] >= r[3]
+                and (o != r or j < i)
+                for j, o in enumerate(split)
+            )
+        ]
@@ -1,5 +1,11 @@
+import os
 import sys
 from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, create_engine
 
 # Ensure the server package directory is on sys.path when running tests.
 # This file is only for tests and prevents ImportError: No module named 'services'
@@ -7,3 +13,44 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def api_db(monkeypatch):
+    """A fresh in-memory database behind the API modules.
+
+    Re-optimisation runs are not started; the job ids they would have been
+    scheduled for are collected in ``api_db.scheduled`` instead.
+    """
+    os.environ.setdefault("JWT_SECRET", "test-secret")
+    from api import (
+        auth_fastapi_users,
+        cabinets,
+        jobs,
+        layout,
+        layout_cache,
+        layout_tasks,
+        pieces,
+        reoptimise,
+    )
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    for module in (
+        auth_fastapi_users,
+        cabinets,
+        jobs,
+        layout,
+        layout_cache,
+        layout_tasks,
+        pieces,
+        reoptimise,
+    ):
+        monkeypatch.setattr(module, "engine", engine)
+    scheduled = []
+    monkeypatch.setattr(reoptimise, "schedule", scheduled.append)
+    return SimpleNamespace(engine=engine, scheduled=scheduled)
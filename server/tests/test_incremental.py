@@ -0,0 +1,73 @@
+import pytest
+
+from services.incremental import diff_pieces, repack
+from services.optimiser import _IRREGULAR_DEPS_OK, pack
+
+
+def _pieces(n, w, h, prefix="p"):
+    return [
+        {"id": f"{prefix}{i}", "name": f"{prefix}{i}", "width": w, "height": h}
+        for i in range(n)
+    ]
+
+
+def _placed(result):
+    return sorted(e["piece_id"] for s in result["sheets"] for e in s["rects"])
+
+
+def test_adding_a_piece_keeps_settled_sheets():
+    pieces = _pieces(40, 600, 400)
+    before = pack(pieces, 2440, 1220, kerf=3)
+    assert len(before["sheets"]) > 2
+
+    shelf = _pieces(1, 560, 300, prefix="shelf")
+    after = repack(before, pieces + shelf, 2440, 1220, kerf=3)
+    assert _placed(after) == sorted(p["id"] for p in pieces + shelf)
+    # Only the last, partly filled sheet was packed again
+    assert after["sheets"][:-1] == before["sheets"][:-1]
+    assert [s["index"] for s in after["sheets"]] == list(range(len(after["sheets"])))
+
+
+def test_removed_and_resized_pieces_reopen_their_sheet():
+    pieces = _pieces(40, 600, 400)
+    before = pack(pieces, 2440, 1220, kerf=3)
+    on_first = [e["piece_id"] for e in before["sheets"][0]["rects"]]
+
+    changed = [dict(p) for p in pieces if p["id"] != on_first[0]]
+    resized = next(p for p in changed if p["id"] == on_first[1])
+    resized["width"] = 500
+    diff = diff_pieces(before, changed)
+    assert diff.added == []
+    assert diff.removed == [on_first[0]]
+    assert diff.resized == [on_first[1]]
+
+    after = repack(before, changed, 2440, 1220, kerf=3)
+    assert _placed(after) == sorted(p["id"] for p in changed)
+    kept = [s["rects"] for s in after["sheets"]]
+    assert before["sheets"][0]["rects"] not in kept
+    assert before["sheets"][1]["rects"] == kept[0]
+
+    # Nothing changed: the layout comes back as it was
+    assert repack(before, pieces, 2440, 1220, kerf=3) == before
+
+
+@pytest.mark.skipif(not _IRREGULAR_DEPS_OK, reason="shapely not installed")
+def test_reshaped_outline_in_the_same_box_is_resized():
+    ell = [[0, 0], [600, 0], [600, 200], [200, 200], [200, 600], [0, 600]]
+    pieces = [
+        {"id": f"L{i}", "name": f"L{i}", "polygon": ell} for i in range(4)
+    ] + _pieces(4, 300, 200)
+    before = pack(pieces, 1220, 1220, kerf=3)
+    assert diff_pieces(before, pieces) == ([], [], [])
+
+    square = [[0, 0], [600, 0], [600, 600], [0, 600]]
+    changed = [dict(p) for p in pieces]
+    changed[0]["polygon"] = square
+    assert diff_pieces(before, changed).resized == ["L0"]
+
+    after = repack(before, changed, 1220, 1220, kerf=3)
+    assert _placed(after) == sorted(p["id"] for p in changed)
+    placed = next(
+        pg for s in after["sheets"] for pg in s["polygons"] if pg["piece_id"] == "L0"
+    )
+    assert len(placed["points"]) == 4
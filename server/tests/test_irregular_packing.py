@@ -27,3 +27,416 @@ def test_l_shape_placement():
         assert any(s.get("polygons") for s in sheets)
     # rect still present as bbox list
     assert any(s.get("rects") for s in sheets)
+
+
+@pytest.mark.skipif(not _IRREGULAR_DEPS_OK, reason="shapely not installed")
+def test_piece_variants_are_normalised_and_deduplicated():
+    from services.irregular_packer import piece_variants
+    from shapely.geometry import box
+
+    rect = box(0, 0, 100, 40)
+    variants = piece_variants(rect, rect.buffer(2, join_style=2), range(0, 360, 15))
+    # A rectangle repeats every 180 degrees
+    assert [v.angle for v in variants] == list(range(0, 180, 15))
+    for v in variants:
+        assert v.inflated.bounds[:2] == pytest.approx((0, 0))
+        assert v.tight.bounds[:2] == pytest.approx((0, 0))
+        # Base sits inside the inflated shape it was normalised with
+        assert v.inflated.buffer(1e-6).covers(v.base)
+
+
+@pytest.mark.skipif(not _IRREGULAR_DEPS_OK, reason="shapely not installed")
+def test_batch_candidate_evaluation_matches_loop():
+    import random
+
+    from shapely.geometry import Polygon, box
+
+    from services.irregular_packer import (
+        _place_on_sheet_batch,
+        _place_on_sheet_loop,
+        piece_variants,
+    )
+    from services.spatial_index import GridIndex
+
+    rng = random.Random(3)
+    index = GridIndex(200)
+    cands = [(0.0, 0.0)]
+    for _ in range(25):
+        x, y = rng.randrange(0, 900, 10), rng.randrange(0, 500, 10)
+        part = box(x, y, x + rng.randrange(40, 150), y + rng.randrange(40, 150))
+        if any(part.intersection(o).area > 0 for o in index):
+            continue
+        index.insert(part)
+        cands.extend(
+            [(part.bounds[2], part.bounds[1]), (part.bounds[0], part.bounds[3])]
+        )
+    cands = sorted(set(cands), key=lambda t: (t[1], t[0]))
+
+    shape = Polygon([(0, 0), (120, 0), (120, 30), (30, 30), (30, 120), (0, 120)])
+    item = {
+        "variants": piece_variants(
+            shape, shape.buffer(2, join_style=2), range(0, 360, 15)
+        )
+    }
+    sheet = box(0, 0, 1000, 600)
+    loop = _place_on_sheet_loop(item, sheet, index, cands)
+    batch = _place_on_sheet_batch(item, sheet, index, cands)
+    assert loop is not None and batch is not None
+    assert loop[2] == batch[2]
+    assert loop[1].equals(batch[1]) and loop[0].equals(batch[0])
+
+
+@pytest.mark.skipif(not _IRREGULAR_DEPS_OK, reason="shapely not installed")
+def test_raster_mode_places_everything_without_overlap():
+    import numpy as np
+    from shapely.geometry import Polygon
+
+    from services.raster import OccupancyGrid
+
+    # Collision counts agree with a brute-force sliding window
+    rng = np.random.default_rng(0)
+    grid = OccupancyGrid(300, 200, 5)
+    grid.grid[:] = rng.random(grid.grid.shape) < 0.1
+    grid.free_cells = grid.grid.size - int(grid.grid.sum())
+    mask = rng.random((7, 9)) < 0.5
+    rows, cols = grid.grid.shape
+    brute = [
+        [int((grid.grid[i : i + 7, j : j + 9] & mask).sum()) for j in range(cols - 8)]
+        for i in range(rows - 6)
+    ]
+    assert (grid.collisions(mask) == np.array(brute)).all()
+
+    pieces = [
+        {
+            "id": f"L{i}",
+            "polygon": [[0, 0], [300, 0], [300, 80], [80, 80], [80, 250], [0, 250]],
+        }
+        for i in range(4)
+    ] + [{"id": f"R{i}", "width": 180, "height": 120} for i in range(8)]
+    res = pack(pieces, 1000, 600, allow_rotation=True, kerf=3, packing_mode="raster")
+    placed = [p for s in res["sheets"] for p in s["polygons"]]
+    assert sorted(p["piece_id"] for p in placed) == sorted(p["id"] for p in pieces)
+    for s in res["sheets"]:
+        polys = [Polygon(p["points"]) for p in s["polygons"]]
+        for i, a in enumerate(polys):
+            assert all(a.intersection(b).area < 1 for b in polys[i + 1 :])
+
+
+@pytest.mark.skipif(not _IRREGULAR_DEPS_OK, reason="shapely not installed")
+def test_free_rect_summary_is_safe():
+    import random
+
+    from shapely import affinity
+    from shapely.geometry import Polygon, box
+
+    from services.irregular_packer import _inner_box
+    from services.spatial_index import MaximalRects
+
+    free = MaximalRects(100, 100)
+    free.add_obstacle((0, 0, 60, 40))
+    free.add_obstacle((0, 40, 30, 100))
+    assert sorted(free.rects) == [(30, 40, 100, 100), (60, 0, 100, 100)]
+    assert sorted(map(tuple, free.sizes())) == [(40, 100), (70, 60)]
+
+    # The box used to prune sheets really lies inside the piece
+    rng = random.Random(1)
+    for _ in range(200):
+        w, h = rng.uniform(10, 500), rng.uniform(10, 500)
+        part = affinity.rotate(box(0, 0, w, h), rng.uniform(0, 360), origin=(0, 0))
+        assert part.buffer(1e-6).covers(box(*_inner_box(part)))
+    l_shape = Polygon([(0, 0), (200, 0), (200, 50), (50, 50), (50, 200), (0, 200)])
+    assert l_shape.buffer(1e-6).covers(box(*_inner_box(l_shape)))
+
+
+@pytest.mark.skipif(not _IRREGULAR_DEPS_OK, reason="shapely not installed")
+def test_staged_overlap_agrees_with_exact_area():
+    import random
+
+    from shapely import affinity
+    from shapely.geometry import Polygon, box
+
+    from services import collision
+
+    rng = random.Random(3)
+    l_shape = Polygon([(0, 0), (80, 0), (80, 20), (20, 20), (20, 80), (0, 80)])
+    shapes = [box(0, 0, 60, 40), l_shape, Polygon([(0, 0), (70, 0), (0, 50)])]
+    collision.reset()
+    for _ in range(400):
+        a, b = (
+            affinity.rotate(
+                affinity.translate(
+                    rng.choice(shapes), rng.randint(0, 100), rng.randint(0, 100)
+                ),
+                rng.choice([0, 90, 33]),
+            )
+            for _ in range(2)
+        )
+        expected = a.intersection(b).area > 0
+        sa, sb = collision.make_shape(a), collision.make_shape(b)
+        assert collision.overlaps(sa, sb) == expected
+    counts = collision.counters()
+    assert sum(counts.values()) == 400
+    # The cheap stages settle most pairs
+    assert counts["bbox"] + counts["hull"] > counts["exact"]
+
+    # Boxes that only share an edge don't overlap
+    assert not collision.overlaps(
+        collision.make_shape(box(0, 0, 10, 10)),
+        collision.make_shape(box(10, 0, 20, 10)),
+    )
+
+
+@pytest.mark.skipif(not _IRREGULAR_DEPS_OK, reason="shapely not installed")
+def test_collision_stats_are_per_run():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from services import collision
+    from services.irregular_packer import pack_irregular
+
+    l_shape = [[0, 0], [200, 0], [200, 50], [50, 50], [50, 200], [0, 200]]
+    pieces = [{"id": f"L{i}", "polygon": l_shape} for i in range(6)]
+
+    def run(_):
+        return pack_irregular(pieces, 500, 400, True, 2)["collision_stats"]
+
+    single = run(0)
+    assert single["exact"] + single["bbox"] + single["hull"] > 0
+    # Runs in other threads don't leak into each other's counts
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert list(pool.map(run, range(4))) == [single] * 4
+    # A run's counts also reach an enclosing count
+    with collision.counting() as outer:
+        run(0)
+    assert outer == single
+
+
+@pytest.mark.skipif(not _IRREGULAR_DEPS_OK, reason="shapely not installed")
+def test_candidate_queue_orders_and_drops_covered_points():
+    from shapely.geometry import box
+
+    from services.candidates import CandidateQueue
+    from services.spatial_index import GridIndex
+
+    def add(queue, index, part):
+        index.insert(part)
+        queue.add_piece(part, index)
+
+    queue, index = CandidateQueue(1000, 1000), GridIndex(200)
+    add(queue, index, box(0, 0, 100, 50))
+    # (0, 0) is now covered; the corners around the piece remain
+    assert list(queue) == [(100.0, 0.0), (0.0, 50.0), (100.0, 50.0)]
+
+    add(queue, index, box(100, 0, 200, 80))
+    points = list(queue)
+    assert (100.0, 0.0) not in points
+    assert points == sorted(points, key=lambda p: (p[1], p[0]))
+
+    # Past the cap, points with one below and left of them are dropped
+    free = CandidateQueue(10000, 10000, max_points=10**6)
+    capped = CandidateQueue(10000, 10000, max_points=200)
+    free_index, capped_index = GridIndex(500), GridIndex(500)
+    for i in range(300):
+        part = box(i * 30, i * 30, i * 30 + 20, i * 30 + 20)
+        add(free, free_index, part)
+        add(capped, capped_index, part)
+        # A piece adds at most 3 points per vertex
+        assert len(capped) <= 200 + 15
+    assert len(free) > 500
+    assert sum(len(c) for c in free.chunks()) == len(free)
+    assert next(iter(capped)) == next(iter(free))
+    assert set(capped) <= set(free)
+
+
+@pytest.mark.skipif(not _IRREGULAR_DEPS_OK, reason="shapely not installed")
+def test_hybrid_mode_nests_polygons_around_rects():
+    from shapely.geometry import Polygon, box
+
+    pieces = [
+        {
+            "id": "bench",
+            "polygon": [[0, 0], [900, 0], [900, 300], [300, 300], [300, 500], [0, 500]],
+        }
+    ] + [{"id": f"R{i}", "width": 300, "height": 200} for i in range(6)]
+    res = pack(pieces, 1200, 800, kerf=4, packing_mode="hybrid")
+    placed = [r["piece_id"] for s in res["sheets"] for r in s["rects"]]
+    assert sorted(placed) == sorted(p["id"] for p in pieces)
+    assert res["unplaced"] == []
+    for s in res["sheets"]:
+        polys = [Polygon(p["points"]) for p in s["polygons"]]
+        rects = [
+            box(r["x"], r["y"], r["x"] + r["w"], r["y"] + r["h"])
+            for r in s["rects"]
+            if r["piece_id"] != "bench"
+        ]
+        for poly in polys:
+            # Kerf clearance kept (points are rounded to whole mm)
+            assert all(poly.distance(r) >= 3 for r in rects)
+
+
+@pytest.mark.skipif(not _IRREGULAR_DEPS_OK, reason="shapely not installed")
+def test_clipper_geometry_backend():
+    from shapely.geometry import Polygon, box
+
+    from services import clipper_geometry
+    from services.irregular_packer import _HAS_PYCLIPPER, pack_irregular
+    from services.nfp import nfp_cache
+
+    if not _HAS_PYCLIPPER:
+        pytest.skip("pyclipper not installed")
+
+    # Shared edges overlap by exactly zero; a self-crossing ring keeps both lobes
+    a, b = clipper_geometry.to_paths(box(0, 0, 10, 10)), clipper_geometry.to_paths(
+        box(10, 0, 20, 10.5)
+    )
+    assert clipper_geometry.overlap_area(a, b) == 0.0
+    bowtie = Polygon([(0, 0), (10, 10), (10, 0), (0, 10)])
+    assert clipper_geometry.repair(bowtie).area == pytest.approx(50.0)
+    assert clipper_geometry.offset(box(0, 0, 10, 10), 2).equals(box(-2, -2, 12, 12))
+
+    pieces = [
+        {
+            "id": "L",
+            "polygon": [[0, 0], [400, 0], [400, 100], [100, 100], [100, 300], [0, 300]],
+        },
+        {"id": "r1", "width": 250, "height": 150},
+        {"id": "r2", "width": 150, "height": 120},
+        {"id": "r3", "width": 300, "height": 60},
+    ]
+    nfp_cache.clear()
+    for mode in ("heuristic", "simple", "nfp", "raster"):
+        res = pack_irregular(
+            pieces, 600, 400, True, 4, mode, geometry_backend="clipper"
+        )
+        placed = [Polygon(p["points"]) for s in res["sheets"] for p in s["polygons"]]
+        assert len(placed) == 4
+        for i, p in enumerate(placed):
+            for q in placed[i + 1 :]:
+                assert p.intersection(q).area < 1e-6
+    # Without kerf both backends key the same shapes; they still cache
+    # their no-fit polygons apart
+    pack_irregular(pieces, 600, 400, True, 0, "nfp", geometry_backend="clipper")
+    cached = len(nfp_cache)
+    pack_irregular(pieces, 600, 400, True, 0, "nfp")
+    assert len(nfp_cache) > cached
+
+    with pytest.raises(ValueError):
+        pack_irregular(pieces, 600, 400, True, 4, geometry_backend="float")
+
+
+@pytest.mark.skipif(not _IRREGULAR_DEPS_OK, reason="shapely not installed")
+def test_small_piece_fills_pocket_of_l_shape():
+    from shapely.geometry import Polygon
+
+    from services.irregular_packer import _HAS_PYCLIPPER, pack_irregular
+
+    l_shape = [[0, 0], [600, 0], [600, 100], [100, 100], [100, 600], [0, 600]]
+    pieces = [
+        {"id": "L", "polygon": l_shape},
+        {"id": "sq", "width": 150, "height": 150},
+    ]
+    backends = ("shapely", "clipper") if _HAS_PYCLIPPER else ("shapely",)
+    for backend in backends:
+        res = pack_irregular(pieces, 1000, 1000, False, 0, geometry_backend=backend)
+        (sheet,) = res["sheets"]
+        placed = {p["piece_id"]: Polygon(p["points"]) for p in sheet["polygons"]}
+        # The square goes into the inside corner, not next to the L's foot
+        assert Polygon(l_shape).convex_hull.covers(placed["sq"])
+        assert placed["L"].intersection(placed["sq"]).area == 0
+
+
+@pytest.mark.skipif(not _IRREGULAR_DEPS_OK, reason="shapely not installed")
+def test_interlocking_l_shapes_are_pre_nested():
+    from shapely.geometry import Polygon
+
+    from services.irregular_packer import pack_irregular
+    from services.pairing import complementary_pairs
+
+    # Two of these L shapes, one turned half a turn, form a 300 x 450 block
+    l_shape = [[0, 0], [300, 0], [300, 150], [150, 150], [150, 300], [0, 300]]
+    shapes = [Polygon(l_shape), Polygon([(0, 0), (50, 0), (50, 50)])] * 2
+    (pair,) = complementary_pairs(shapes, allow_rotation=True)
+    assert (pair.i, pair.j, pair.angle) == (0, 2, 180)
+    assert pair.ratio == pytest.approx(0.75)
+
+    pieces = [
+        {"id": "a", "polygon": l_shape},
+        {"id": "b", "polygon": l_shape},
+        {"id": "sq", "width": 100, "height": 100},
+    ]
+    fractions = []
+    res = pack_irregular(
+        pieces, 320, 560, True, 0, progress=lambda d, t: fractions.append(d / t)
+    )
+    (sheet,) = res["sheets"]
+    # One sheet is all the area needs, so no plain run follows
+    assert fractions == sorted(fractions) and fractions[-1] == 1
+    placed = {p["piece_id"]: Polygon(p["points"]) for p in sheet["polygons"]}
+    assert set(placed) == {"a", "b", "sq"}
+    assert {r["piece_id"] for r in sheet["rects"]} == set(placed)
+    assert placed["a"].area == placed["b"].area == Polygon(l_shape).area
+    for x, y in (("a", "b"), ("a", "sq"), ("b", "sq")):
+        assert placed[x].intersection(placed[y]).area == 0
+    angles = {p["piece_id"]: p["angle"] for p in sheet["polygons"]}
+    assert (angles["a"] - angles["b"]) % 360 == 180
+
+
+@pytest.mark.skipif(not _IRREGULAR_DEPS_OK, reason="shapely not installed")
+def test_offset_rebuilds_placed_outline():
+    from shapely.affinity import rotate, translate
+    from shapely.geometry import Polygon
+
+    from services.irregular_packer import pack_irregular
+
+    l_shape = [[0, 0], [300, 0], [300, 150], [150, 150], [150, 300], [0, 300]]
+    triangle = [[10, 5], [410, 5], [210, 255]]
+    pieces = [{"id": f"l{i}", "polygon": l_shape} for i in range(4)]
+    pieces += [{"id": f"t{i}", "polygon": triangle} for i in range(3)]
+    pieces.append({"id": "r", "width": 300, "height": 170})
+    own = {p["id"]: p.get("polygon") for p in pieces}
+    own["r"] = [[0, 0], [300, 0], [300, 170], [0, 170]]
+
+    res = pack_irregular(pieces, 900, 700, True, 3)
+    # Pre-nested pairs included
+    assert any(
+        (a["angle"] - b["angle"]) % 360 == 180
+        for sheet in res["sheets"]
+        for a in sheet["polygons"]
+        for b in sheet["polygons"]
+        if a["piece_id"] < b["piece_id"] and a["piece_id"][0] == b["piece_id"][0] == "l"
+    )
+    for sheet in res["sheets"]:
+        for p in sheet["polygons"]:
+            turned = rotate(Polygon(own[p["piece_id"]]), p["angle"], origin=(0, 0))
+            rebuilt = translate(turned, *p["offset"])
+            # Placed points are rounded to whole millimetres
+            assert rebuilt.hausdorff_distance(Polygon(p["points"])) <= 1
+
+
+@pytest.mark.skipif(not _IRREGULAR_DEPS_OK, reason="shapely not installed")
+def test_cancel_mid_run_returns_partial_layout():
+    from services.cancellation import CancelToken
+    from services.irregular_packer import pack_irregular
+
+    class CancelAfter(CancelToken):
+        # Cancelled from the n-th check on
+        def __init__(self, n):
+            super().__init__()
+            self.n = n
+
+        def cancelled(self):
+            self.n -= 1
+            return self.n < 0
+
+    l_shape = [[0, 0], [300, 0], [300, 100], [100, 100], [100, 300], [0, 300]]
+    pieces = [{"id": f"L{i}", "polygon": l_shape} for i in range(12)]
+    for mode in ("heuristic", "exhaustive", "nfp"):
+        res = pack_irregular(
+            pieces, 1000, 1000, False, 0, mode, pre_nest=False, cancel=CancelAfter(4)
+        )
+        assert res["truncated"] is True
+        placed = [p["piece_id"] for s in res["sheets"] for p in s["polygons"]]
+        unplaced = [u["piece_id"] for u in res["unplaced"]]
+        assert placed and unplaced, mode
+        assert sorted(placed + unplaced) == sorted(p["id"] for p in pieces)
+        assert all(s["polygons"] for s in res["sheets"])
+        assert {(u["w"], u["h"]) for u in res["unplaced"]} == {(300, 300)}
@@ -0,0 +1,39 @@
+from services.layout_cache import anonymise, layout_key, restore
+from services.optimiser import pack
+
+L_SHAPE = [[0, 0], [300, 0], [300, 100], [100, 100], [100, 300], [0, 300]]
+
+
+def _job(prefix, order):
+    pieces = [
+        {"id": f"{prefix}-r{i}", "name": f"{prefix} R{i}", "width": w, "height": 400}
+        for i, w in enumerate((600, 500, 600, 450))
+    ]
+    pieces.append({"id": f"{prefix}-L", "name": f"{prefix} L", "polygon": L_SHAPE})
+    return [pieces[i] for i in order]
+
+
+def test_same_pieces_share_key_and_layout():
+    options = {"sheet_width": 1220, "sheet_height": 1220, "kerf": 3}
+    a = _job("a", [0, 1, 2, 3, 4])
+    b = _job("b", [4, 2, 3, 0, 1])
+    assert layout_key(a, options) == layout_key(b, options)
+    assert layout_key(a, options) != layout_key(a, dict(options, kerf=4))
+    assert layout_key(a, options) != layout_key(a[:-1], options)
+
+    result = pack(a, 1220, 1220, kerf=3)
+    stored = anonymise(result, a)
+    assert restore(stored, a) == result
+
+    # Another job gets the same placements under its own ids and names
+    by_id = {p["id"]: p for p in b}
+    moved = restore(stored, b)
+    for sheet, orig in zip(moved["sheets"], result["sheets"]):
+        for entry, before in zip(sheet["rects"], orig["rects"]):
+            piece = by_id[entry["piece_id"]]
+            assert entry["name"] == piece["name"]
+            assert (entry["x"], entry["y"]) == (before["x"], before["y"])
+            if "width" in piece:
+                assert {entry["w"], entry["h"]} == {piece["width"], piece["height"]}
+    placed = [e["piece_id"] for s in moved["sheets"] for e in s["rects"]]
+    assert sorted(placed) == sorted(by_id)
@@ -0,0 +1,108 @@
+import pytest
+from sqlmodel import Session
+
+from models import Cabinet, Job, Piece
+from services.incremental import diff_pieces, repack
+
+
+def _job(engine, pieces):
+    with Session(engine) as s:
+        job = Job(name="job", user_id="u")
+        cabinet = Cabinet(name="cab", job_id=job.id)
+        s.add_all([job, cabinet])
+        s.add_all(
+            Piece(cabinet_id=cabinet.id, name=f"p{i}", width=w, height=h)
+            for i, (w, h) in enumerate(pieces)
+        )
+        s.commit()
+        return job.id
+
+
+def test_deleted_piece_reopens_its_sheet(api_db):
+    from api import layout, pieces
+
+    pid = _job(api_db.engine, [(600, 400)] * 18)
+    body = layout.LayoutRequest(sheet_width=1220, sheet_height=1220, kerf_mm=3)
+    job, before = layout.retrieve_and_pack_cabinets(pid, body)
+    assert len(before["sheets"]) == 3
+    layout.save_layout(pid, body, before)
+
+    gone = before["sheets"][0]["rects"][0]["piece_id"]
+    pieces.delete_piece(gone)
+
+    job, remaining = layout.db_fetch_job_and_pieces(pid)
+    shapes = layout.convert_pieces_to_shapes(remaining)
+    options = layout.pack_options(job, body)
+    previous = layout.previous_layout(pid, options)
+    assert diff_pieces(previous, shapes) == ([], [gone], [])
+
+    after = repack(previous, shapes, **options)
+    placed = {e["piece_id"] for s in after["sheets"] for e in s["rects"]}
+    assert placed == {p["id"] for p in shapes}
+    # The sheet with the hole was packed again, the middle one kept
+    assert before["sheets"][0]["rects"] not in [s["rects"] for s in after["sheets"]]
+    assert before["sheets"][1]["rects"] == after["sheets"][0]["rects"]
+
+
+def _layout(sheets, per_sheet, piece_ids):
+    ids = iter(piece_ids)
+    return {
+        "sheets": [
+            {
+                "index": i,
+                "width": 1220 + i % 2,
+                "height": 2440,
+                "rects": [
+                    {"piece_id": next(ids), "x": 0, "y": 0, "w": 10, "h": 10}
+                    for _ in range(per_sheet)
+                ],
+                "polygons": [],
+            }
+            for i in range(sheets)
+        ]
+    }
+
+
+def _piece_ids(engine, pid):
+    from api import layout
+
+    return [p.id for p in layout.db_fetch_job_and_pieces(pid)[1]]
+
+
+def test_save_layout_statement_count_does_not_grow(api_db):
+    from api import layout
+    from test_queries import _counting
+
+    pid = _job(api_db.engine, [(100, 50)] * 60)
+    ids = _piece_ids(api_db.engine, pid)
+    body = layout.LayoutRequest(sheet_width=1220, sheet_height=2440)
+
+    counts = []
+    for sheets, per_sheet in ((1, 2), (6, 10)):
+        with _counting(api_db.engine) as statements:
+            layout.save_layout(pid, body, _layout(sheets, per_sheet, ids))
+        counts.append(len(statements))
+    # The job, the known sheet sizes, the group, the new size (one each
+    # time), then every placement in one executemany
+    assert counts == [5, 5]
+
+
+def test_failed_save_layout_leaves_nothing_behind(api_db):
+    from sqlalchemy.exc import IntegrityError
+    from sqlmodel import select
+
+    from api import layout
+    from models import Placement, PlacementGroup, Sheet
+
+    pid = _job(api_db.engine, [(100, 50)] * 4)
+    ids = _piece_ids(api_db.engine, pid)
+    body = layout.LayoutRequest(sheet_width=1220, sheet_height=2440)
+    result = _layout(2, 2, ids)
+    # Placements go in after the group and sheets; this one can't
+    result["sheets"][1]["rects"][1]["x"] = None
+
+    with pytest.raises(IntegrityError):
+        layout.save_layout(pid, body, result)
+    with Session(api_db.engine) as s:
+        for model in (PlacementGroup, Sheet, Placement):
+            assert s.exec(select(model)).all() == []
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, select
+
+from models import Cabinet, Job, LayoutTask, Piece, PlacementGroup
+
+
+def _task(engine, status="queued", **fields):
+    """A job with a few pieces and one layout task for it."""
+    from api.layout import LayoutRequest
+
+    with Session(engine) as s:
+        job = Job(name="job", user_id="u")
+        cabinet = Cabinet(name="cab", job_id=job.id)
+        s.add_all([job, cabinet])
+        s.add_all(
+            Piece(cabinet_id=cabinet.id, name=f"p{i}", width=600, height=400)
+            for i in range(4)
+        )
+        body = LayoutRequest(sheet_width=1220, sheet_height=2440, kerf_mm=3)
+        task = LayoutTask(
+            job_id=job.id, params_json=body.model_dump_json(), status=status, **fields
+        )
+        s.add(task)
+        s.commit()
+        return task.id
+
+
+def _get(engine, task_id):
+    with Session(engine) as s:
+        return s.get(LayoutTask, task_id)
+
+
+def _groups(engine):
+    with Session(engine) as s:
+        return s.exec(select(PlacementGroup)).all()
+
+
+def test_task_runs_to_done_and_saves_its_layout(api_db, monkeypatch):
+    from api import layout_tasks
+
+    task_id = _task(api_db.engine)
+    seen = []
+    real = layout_tasks.retrieve_and_pack_cabinets
+
+    def spy(pid, body, **kwargs):
+        seen.append(_get(api_db.engine, task_id).status)
+        return real(pid, body, **kwargs)
+
+    monkeypatch.setattr(layout_tasks, "retrieve_and_pack_cabinets", spy)
+    layout_tasks.run_task(task_id)
+
+    assert seen == ["running"]
+    task = _get(api_db.engine, task_id)
+    assert task.status == "done"
+    assert task.progress == 1.0
+    assert task.started_at is not None and task.finished_at is not None
+    out = layout_tasks.get_layout_task(task_id)
+    assert sum(len(s["rects"]) for s in out["result"]["sheets"]) == 4
+    [group] = _groups(api_db.engine)
+    assert task.placement_group_id == group.id
+
+
+def test_failure_is_recorded_with_its_error(api_db, monkeypatch):
+    from api import layout_tasks
+
+    task_id = _task(api_db.engine)
+
+    def boom(pid, body, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(layout_tasks, "retrieve_and_pack_cabinets", boom)
+    layout_tasks.run_task(task_id)
+
+    task = _get(api_db.engine, task_id)
+    assert (task.status, task.error) == ("failed", "boom")
+    assert task.placement_group_id is None
+    assert _groups(api_db.engine) == []
+
+
+def test_cancelled_task_saves_nothing(api_db, monkeypatch):
+    from api import layout_tasks
+
+    task_id = _task(api_db.engine)
+    real = layout_tasks.retrieve_and_pack_cabinets
+
+    def cancel_while_packing(pid, body, **kwargs):
+        layout_tasks.cancel_layout_task(task_id)
+        return real(pid, body, **kwargs)
+
+    monkeypatch.setattr(layout_tasks, "CANCEL_POLL_INTERVAL", 0.0)
+    monkeypatch.setattr(
+        layout_tasks, "retrieve_and_pack_cabinets", cancel_while_packing
+    )
+    layout_tasks.run_task(task_id)
+
+    task = _get(api_db.engine, task_id)
+    assert task.status == "cancelled"
+    assert task.result_json is None and task.placement_group_id is None
+    assert _groups(api_db.engine) == []
+
+
+def test_task_is_only_run_by_the_worker_that_claims_it(api_db, monkeypatch):
+    from api import layout_tasks
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError("task packed twice")
+
+    monkeypatch.setattr(layout_tasks, "retrieve_and_pack_cabinets", unexpected)
+    for status in ("running", "cancelled", "done"):
+        task_id = _task(api_db.engine, status=status)
+        layout_tasks.run_task(task_id)
+        assert _get(api_db.engine, task_id).status == status
+
+
+def test_resume_pending_queues_unfinished_tasks_again(api_db, monkeypatch):
+    from api import layout_tasks
+
+    submitted = []
+    monkeypatch.setattr(layout_tasks, "submit", submitted.append)
+    t0 = datetime(2024, 1, 1)
+    running = _task(
+        api_db.engine,
+        status="running",
+        progress=0.5,
+        started_at=t0,
+        created_at=t0 + timedelta(seconds=1),
+    )
+    queued = _task(api_db.engine, created_at=t0)
+    done = _task(api_db.engine, status="done", progress=1.0)
+
+    layout_tasks.resume_pending()
+
+    assert submitted == [queued, running]
+    task = _get(api_db.engine, running)
+    assert (task.status, task.progress, task.started_at) == ("queued", 0.0, None)
+    assert _get(api_db.engine, done).status == "done"
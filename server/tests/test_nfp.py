@@ -0,0 +1,58 @@
+import pytest
+
+from services._optimiser_common import _IRREGULAR_DEPS_OK
+
+pytestmark = pytest.mark.skipif(not _IRREGULAR_DEPS_OK, reason="shapely required")
+
+L_SHAPE = [[0, 0], [200, 0], [200, 50], [50, 50], [50, 200], [0, 200]]
+
+
+def test_nfp_interior_is_exactly_the_overlapping_positions():
+    from shapely.affinity import translate
+    from shapely.geometry import Point, Polygon, box
+
+    from services import nfp
+
+    fixed = Polygon(L_SHAPE)
+    moving = box(0, 0, 100, 80)
+    region = nfp.no_fit_polygon(fixed, moving)
+    for x in range(-120, 221, 20):
+        for y in range(-100, 221, 20):
+            overlap = translate(moving, x, y).intersection(fixed).area > 0
+            assert overlap == region.contains(Point(x, y)), (x, y)
+
+
+def test_nfp_backends_agree(monkeypatch):
+    from shapely.geometry import Polygon
+
+    from services import nfp
+
+    if not nfp._HAS_PYCLIPPER:
+        pytest.skip("pyclipper not installed")
+    a = Polygon(L_SHAPE)
+    b = Polygon([[0, 0], [120, 0], [120, 30], [30, 30], [30, 90], [0, 90]])
+    clipper = nfp.no_fit_polygon(a, b)
+    monkeypatch.setattr(nfp, "_HAS_PYCLIPPER", False)
+    triangulated = nfp.no_fit_polygon(a, b)
+    assert clipper.symmetric_difference(triangulated).area < 1e-3
+
+
+def test_nfp_mode_places_without_overlap_and_reuses_cache():
+    from shapely.geometry import Polygon
+
+    from services.nfp import nfp_cache
+    from services.optimiser import pack
+
+    nfp_cache.clear()
+    pieces = [{"id": f"L{i}", "polygon": L_SHAPE} for i in range(4)] + [
+        {"id": f"r{i}", "width": 90, "height": 40} for i in range(6)
+    ]
+    res = pack(pieces, 500, 400, allow_rotation=True, kerf=2, packing_mode="nfp")
+    placed = [p for s in res["sheets"] for p in s["polygons"]]
+    assert sorted(p["piece_id"] for p in placed) == sorted(p["id"] for p in pieces)
+    for sheet in res["sheets"]:
+        polys = [Polygon(p["points"]) for p in sheet["polygons"]]
+        for i, a in enumerate(polys):
+            for b in polys[i + 1 :]:
+                assert a.intersection(b).area < 1.0
+    assert nfp_cache.hits > 0
@@ -0,0 +1,113 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from models import Cabinet, Job, Piece, Placement, PlacementGroup, Sheet
+from queries import group_placements, latest_group, load_job_pieces
+
+
+def _engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+@contextmanager
+def _counting(engine):
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+
+def _job(s, cabinets, pieces_each):
+    job = Job(name="job", user_id="u")
+    sheet = Sheet(name="s", colour_id="c", width=2440, height=1220)
+    s.add_all([job, sheet])
+    group = PlacementGroup(job_id=job.id, date=datetime.utcnow())
+    older = PlacementGroup(job_id=job.id, date=datetime.utcnow() - timedelta(days=1))
+    s.add_all([group, older])
+    for c in range(cabinets):
+        cab = Cabinet(name=f"cab{c}", job_id=job.id)
+        s.add(cab)
+        for i in range(pieces_each):
+            piece = Piece(cabinet_id=cab.id, name=f"p{i}", width=100, height=50)
+            s.add(piece)
+            s.add(
+                Placement(
+                    placement_group_id=group.id,
+                    sheet_id=sheet.id,
+                    piece_id=piece.id,
+                    x=0,
+                    y=0,
+                    w=100,
+                    h=50,
+                    sheet_index=1 + i % 3,
+                )
+            )
+    s.commit()
+    return job.id, group.id
+
+
+def test_job_reads_take_one_query_each_whatever_the_size():
+    engine = _engine()
+    with Session(engine) as s:
+        jobs = [_job(s, cabinets, pieces) for cabinets, pieces in ((1, 2), (8, 25))]
+
+    for (pid, gid), (cabinets, pieces) in zip(jobs, ((1, 2), (8, 25))):
+        with Session(engine) as s, _counting(engine) as statements:
+            loaded = load_job_pieces(s, pid)
+            assert len(loaded.cabinets) == cabinets
+            assert len(loaded.pieces) == cabinets * pieces
+            assert latest_group(s, pid).id == gid
+            rows = group_placements(s, gid)
+            assert len(rows) == cabinets * pieces
+            assert [r[0].sheet_index for r in rows] == sorted(
+                r[0].sheet_index for r in rows
+            )
+        assert len(statements) == 3
+
+    with Session(engine) as s:
+        assert load_job_pieces(s, "missing") is None
+        empty = Job(name="empty", user_id="u")
+        s.add(empty)
+        s.commit()
+        assert load_job_pieces(s, empty.id)[1:] == ([], [])
+
+
+def test_job_reads_use_indexes():
+    engine = _engine()
+    with Session(engine) as s:
+        pid, gid = _job(s, 2, 3)
+    with engine.connect() as conn:
+        for query, params in (
+            (
+                "SELECT * FROM cabinet JOIN piece ON piece.cabinet_id = cabinet.id"
+                " WHERE cabinet.job_id = ?",
+                (pid,),
+            ),
+            (
+                "SELECT * FROM placement_group WHERE job_id = ? ORDER BY date DESC",
+                (pid,),
+            ),
+            ("SELECT * FROM placement WHERE placement_group_id = ?", (gid,)),
+        ):
+            plan = " ".join(
+                row[-1]
+                for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + query, params)
+            )
+            # Searches by index only: no full table scan, no sort
+            assert "SCAN" not in plan and "TEMP B-TREE" not in plan, plan
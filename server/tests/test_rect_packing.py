@@ -0,0 +1,116 @@
+from services.optimiser import pack
+from services.rect_packer import pack_rectangles
+from services._optimiser_common import layout_score
+
+
+def _pieces(n, w, h):
+    return [{"id": f"p{i}", "name": f"P{i}", "width": w, "height": h} for i in range(n)]
+
+
+def _assert_no_overlap(sheet):
+    rects = sheet["rects"]
+    for i, a in enumerate(rects):
+        assert a["x"] >= 0 and a["y"] >= 0
+        assert a["x"] + a["w"] <= sheet["width"]
+        assert a["y"] + a["h"] <= sheet["height"]
+        for b in rects[i + 1 :]:
+            disjoint = (
+                a["x"] + a["w"] <= b["x"]
+                or b["x"] + b["w"] <= a["x"]
+                or a["y"] + a["h"] <= b["y"]
+                or b["y"] + b["h"] <= a["y"]
+            )
+            assert disjoint, (a, b)
+
+
+def test_portfolio_never_worse_than_default():
+    pieces = _pieces(7, 600, 400) + _pieces(5, 300, 720) + _pieces(9, 150, 560)
+    for i, p in enumerate(pieces):
+        p["id"] = f"p{i}"
+    baseline = pack_rectangles(pieces, 2440, 1220, True, 0)
+    best = pack(
+        pieces,
+        2440,
+        1220,
+        allow_rotation=True,
+        packing_mode="portfolio",
+        time_budget=30,
+    )
+    assert layout_score(best) <= layout_score(baseline)
+    placed = [r["piece_id"] for s in best["sheets"] for r in s["rects"]]
+    assert sorted(placed) == sorted(p["id"] for p in pieces)
+    for sheet in best["sheets"]:
+        _assert_no_overlap(sheet)
+
+
+def test_more_than_100_sheets_and_oversized_reported():
+    # Each piece needs its own sheet; the old fixed 100-bin cap dropped the rest
+    pieces = _pieces(130, 1000, 900)
+    pieces.append({"id": "huge", "name": "Huge", "width": 5000, "height": 100})
+    res = pack_rectangles(pieces, 1200, 1000, True, 0)
+    assert len(res["sheets"]) == 130
+    assert [u["piece_id"] for u in res["unplaced"]] == ["huge"]
+
+
+def test_guillotine_kerf_only_between_pieces():
+    # Two 600-wide pieces on a 1203 sheet with a 3mm kerf: one cut, no edge loss
+    pieces = _pieces(2, 600, 1000)
+    res = pack(
+        pieces, 1203, 1000, allow_rotation=False, kerf=3, packing_mode="guillotine"
+    )
+    assert len(res["sheets"]) == 1
+    xs = sorted(r["x"] for r in res["sheets"][0]["rects"])
+    assert xs == [0, 603]
+    assert all(r["w"] == 600 and r["h"] == 1000 for r in res["sheets"][0]["rects"])
+
+
+def test_guillotine_places_everything_without_overlap():
+    pieces = _pieces(40, 600, 400) + _pieces(30, 300, 720) + _pieces(50, 150, 560)
+    for i, p in enumerate(pieces):
+        p["id"] = f"p{i}"
+    kerf = 4
+    res = pack(pieces, 2440, 1220, kerf=kerf, packing_mode="guillotine")
+    assert res["unplaced"] == []
+    placed = [r["piece_id"] for s in res["sheets"] for r in s["rects"]]
+    assert sorted(placed) == sorted(p["id"] for p in pieces)
+    for sheet in res["sheets"]:
+        _assert_no_overlap(sheet)
+
+
+def test_expired_deadline_truncates_every_rect_mode():
+    import time
+
+    from services.cancellation import CancelToken
+
+    pieces = _pieces(30, 600, 400)
+    past = time.monotonic()
+    res = pack_rectangles(pieces, 2440, 1220, True, 0, deadline=past)
+    assert res["truncated"] is True
+    assert res["sheets"] == []
+    assert sorted(u["piece_id"] for u in res["unplaced"]) == sorted(
+        p["id"] for p in pieces
+    )
+
+    cancel = CancelToken()
+    cancel.cancel()
+    for mode in ("heuristic", "guillotine", "portfolio", "anytime"):
+        res = pack(pieces, 2440, 1220, packing_mode=mode, cancel=cancel)
+        assert res["truncated"] is True, mode
+        assert len(res["unplaced"]) == len(pieces), mode
+
+    # Without a limit nothing is flagged
+    assert "truncated" not in pack_rectangles(pieces, 2440, 1220, True, 0)
+
+
+def test_progress_reports_every_piece():
+    pieces = _pieces(12, 600, 400)
+    for mode in ("heuristic", "guillotine"):
+        seen = []
+        pack(
+            pieces,
+            2440,
+            1220,
+            packing_mode=mode,
+            progress=lambda d, t: seen.append((d, t)),
+        )
+        assert seen == [(k, 12) for k in range(1, 13)], mode
@@ -0,0 +1,173 @@
+import pytest
+from sqlmodel import Session, select
+
+from models import Cabinet, Job, Piece, PlacementGroup
+
+
+def _job(engine, name="job"):
+    """A job with one cabinet, one piece and a fresh (not stale) layout."""
+    with Session(engine) as s:
+        job = Job(name=name, user_id="u")
+        cabinet = Cabinet(name="cab", job_id=job.id)
+        piece = Piece(cabinet_id=cabinet.id, name="p", width=600, height=400)
+        s.add_all([job, cabinet, piece])
+        s.commit()
+        s.add(PlacementGroup(job_id=job.id))
+        job.pieces_changed_at = None
+        s.add(job)
+        s.commit()
+        return job.id, cabinet.id, piece.id
+
+
+def _state(engine, job_id):
+    """(stale flags of the job's groups, whether the job has a change time)"""
+    with Session(engine) as s:
+        groups = s.exec(
+            select(PlacementGroup).where(PlacementGroup.job_id == job_id)
+        ).all()
+        changed = s.get(Job, job_id).pieces_changed_at is not None
+        return [g.stale for g in groups], changed
+
+
+def _add_piece(s, job_id, cabinet_id, piece_id):
+    s.add(Piece(cabinet_id=cabinet_id, name="new", width=100, height=100))
+
+
+def _edit_piece(s, job_id, cabinet_id, piece_id):
+    s.get(Piece, piece_id).width = 500
+
+
+def _delete_piece(s, job_id, cabinet_id, piece_id):
+    s.delete(s.get(Piece, piece_id))
+
+
+def _add_cabinet(s, job_id, cabinet_id, piece_id):
+    s.add(Cabinet(name="new", job_id=job_id))
+
+
+def _edit_cabinet(s, job_id, cabinet_id, piece_id):
+    s.get(Cabinet, cabinet_id).name = "renamed"
+
+
+def _delete_cabinet(s, job_id, cabinet_id, piece_id):
+    s.delete(s.get(Piece, piece_id))
+    s.delete(s.get(Cabinet, cabinet_id))
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        _add_piece,
+        _edit_piece,
+        _delete_piece,
+        _add_cabinet,
+        _edit_cabinet,
+        _delete_cabinet,
+    ],
+)
+def test_change_marks_job_stale(api_db, change):
+    job_id, cabinet_id, piece_id = _job(api_db.engine)
+    other = _job(api_db.engine, "other")[0]
+    api_db.scheduled.clear()
+
+    with Session(api_db.engine) as s:
+        change(s, job_id, cabinet_id, piece_id)
+        s.commit()
+
+    assert _state(api_db.engine, job_id) == ([True], True)
+    assert _state(api_db.engine, other) == ([False], False)
+    assert api_db.scheduled == [job_id]
+
+
+def test_unmodified_object_marks_nothing(api_db):
+    job_id, cabinet_id, piece_id = _job(api_db.engine)
+    api_db.scheduled.clear()
+
+    with Session(api_db.engine) as s:
+        piece = s.get(Piece, piece_id)
+        piece.width = piece.width
+        s.add(piece)
+        s.commit()
+
+    assert _state(api_db.engine, job_id) == ([False], False)
+    assert api_db.scheduled == []
+
+
+def test_moving_a_piece_marks_both_jobs_stale(api_db):
+    old_job, _, piece_id = _job(api_db.engine)
+    new_job, new_cabinet, _ = _job(api_db.engine, "other")
+    api_db.scheduled.clear()
+
+    with Session(api_db.engine) as s:
+        s.get(Piece, piece_id).cabinet_id = new_cabinet
+        s.commit()
+
+    assert _state(api_db.engine, old_job) == ([True], True)
+    assert _state(api_db.engine, new_job) == ([True], True)
+    assert sorted(api_db.scheduled) == sorted([old_job, new_job])
+
+
+def test_moving_a_cabinet_marks_both_jobs_stale(api_db):
+    old_job, cabinet_id, _ = _job(api_db.engine)
+    new_job = _job(api_db.engine, "other")[0]
+    api_db.scheduled.clear()
+
+    with Session(api_db.engine) as s:
+        s.get(Cabinet, cabinet_id).job_id = new_job
+        s.commit()
+
+    assert _state(api_db.engine, old_job) == ([True], True)
+    assert _state(api_db.engine, new_job) == ([True], True)
+    assert sorted(api_db.scheduled) == sorted([old_job, new_job])
+
+
+def test_rollback_schedules_nothing(api_db):
+    job_id, _, piece_id = _job(api_db.engine)
+    api_db.scheduled.clear()
+
+    with Session(api_db.engine) as s:
+        s.get(Piece, piece_id).width = 500
+        s.flush()
+        s.rollback()
+        # A later commit in the same session carries no leftover jobs
+        s.commit()
+
+    assert _state(api_db.engine, job_id) == ([False], False)
+    assert api_db.scheduled == []
+
+
+def _layout(sheets):
+    return {
+        "sheets": [
+            {"index": i, "width": 1220, "height": 2440, "rects": [], "polygons": []}
+            for i in range(sheets)
+        ]
+    }
+
+
+def test_ladder_saves_only_improving_layouts(api_db, monkeypatch):
+    from api import layout, reoptimise
+
+    job_id = _job(api_db.engine)[0]
+    sheets = {"simple": 3, "heuristic": 4, "exhaustive": 2}
+    modes = []
+
+    def scripted(pid, body, **kwargs):
+        modes.append(body.packing_mode)
+        return None, _layout(sheets[body.packing_mode])
+
+    monkeypatch.setattr(reoptimise, "retrieve_and_pack_cabinets", scripted)
+    body = layout.LayoutRequest(sheet_width=1220, sheet_height=2440)
+    best = reoptimise.run_ladder(job_id, body.model_dump_json())
+
+    assert modes == list(reoptimise.LADDER)
+    with Session(api_db.engine) as s:
+        groups = s.exec(
+            select(PlacementGroup)
+            .where(PlacementGroup.job_id == job_id)
+            .where(PlacementGroup.optimise_method.is_not(None))
+            .order_by(PlacementGroup.date)
+        ).all()
+    # The heuristic layout needs more sheets than the simple one
+    assert [g.optimise_method for g in groups] == ["simple", "exhaustive"]
+    assert best == groups[-1].id
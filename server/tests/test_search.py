@@ -0,0 +1,124 @@
+from services.optimiser import pack
+from services.search import pack_anytime
+from services._optimiser_common import layout_score, _IRREGULAR_DEPS_OK
+
+
+def _mixed_rects():
+    sizes = [(600, 400)] * 7 + [(300, 720)] * 5 + [(150, 560)] * 9 + [(820, 610)] * 3
+    return [
+        {"id": f"p{i}", "name": f"P{i}", "width": w, "height": h}
+        for i, (w, h) in enumerate(sizes)
+    ]
+
+
+def test_anytime_is_deterministic_and_not_worse_than_greedy():
+    pieces = _mixed_rects()
+    greedy = pack(pieces, 2440, 1220, kerf=3)
+    a = pack_anytime(pieces, 2440, 1220, True, 3, seed=7, starts=8, max_workers=1)
+    b = pack_anytime(pieces, 2440, 1220, True, 3, seed=7, starts=8, max_workers=1)
+    assert a == b
+    assert layout_score(a) <= layout_score(greedy)
+    placed = [r["piece_id"] for s in a["sheets"] for r in s["rects"]]
+    assert sorted(placed) == sorted(p["id"] for p in pieces)
+
+
+def test_anytime_with_budget_keeps_a_prefix_of_starts():
+    from services.search import _run_start
+
+    pieces = _mixed_rects()
+    args = (pieces, 2440, 1220, True, 3)
+    # No time at all: the pool waits for start 0 only, the greedy pass
+    first = pack_anytime(*args, time_budget=0, seed=7, starts=6, max_workers=2)
+    assert first == _run_start(*args, 7, 0)
+    # Enough time for every start: the same as running them all in turn
+    a = pack_anytime(*args, time_budget=60, seed=7, starts=6, max_workers=2)
+    b = pack_anytime(*args, seed=7, starts=6, max_workers=1)
+    assert a == b
+
+
+def test_anytime_reports_original_orientation():
+    pieces = _mixed_rects()
+    dims = {p["id"]: (p["width"], p["height"]) for p in pieces}
+    res = pack_anytime(pieces, 2440, 1220, True, 0, seed=3, starts=6, max_workers=1)
+    for sheet in res["sheets"]:
+        for r in sheet["rects"]:
+            w, h = dims[r["piece_id"]]
+            expected = (h, w) if r["angle"] == 90 else (w, h)
+            assert (r["w"], r["h"]) == expected
+
+
+def test_anytime_with_polygons():
+    pieces = [
+        {
+            "id": f"L{i}",
+            "polygon": [[0, 0], [300, 0], [300, 80], [80, 80], [80, 300], [0, 300]],
+        }
+        for i in range(3)
+    ] + [{"id": "r", "width": 200, "height": 150}]
+    res = pack_anytime(pieces, 800, 600, True, 2, seed=1, starts=3, max_workers=1)
+    placed = [r["piece_id"] for s in res["sheets"] for r in s["rects"]]
+    assert sorted(placed) == sorted(p["id"] for p in pieces)
+    if _IRREGULAR_DEPS_OK:
+        assert any(s["polygons"] for s in res["sheets"])
+
+
+def test_genetic_is_deterministic_and_not_worse_than_greedy():
+    from services.metaheuristic import order_crossover, pack_genetic
+    import random
+
+    child = order_crossover([0, 1, 2, 3, 4, 5], [5, 4, 3, 2, 1, 0], random.Random(2))
+    assert sorted(child) == [0, 1, 2, 3, 4, 5]
+
+    pieces = _mixed_rects()
+    greedy = pack(pieces, 2440, 1220, kerf=3)
+    kwargs = dict(seed=5, generations=3, population=6, max_workers=1)
+    a = pack_genetic(pieces, 2440, 1220, True, 3, **kwargs)
+    b = pack_genetic(pieces, 2440, 1220, True, 3, **kwargs)
+    assert a == b
+    assert layout_score(a) <= layout_score(greedy)
+    placed = [r["piece_id"] for s in a["sheets"] for r in s["rects"]]
+    assert sorted(placed) == sorted(p["id"] for p in pieces)
+
+
+def test_genetic_with_polygons_respects_rotation_genes():
+    from services.metaheuristic import pack_genetic
+
+    pieces = [
+        {
+            "id": f"L{i}",
+            "polygon": [[0, 0], [300, 0], [300, 80], [80, 80], [80, 300], [0, 300]],
+        }
+        for i in range(3)
+    ] + [{"id": "r", "width": 200, "height": 150}]
+    res = pack_genetic(
+        pieces, 800, 600, True, 2, seed=1, generations=2, population=4, max_workers=1
+    )
+    placed = [r["piece_id"] for s in res["sheets"] for r in s["rects"]]
+    assert sorted(placed) == sorted(p["id"] for p in pieces)
+    if _IRREGULAR_DEPS_OK:
+        # Pieces restricted to one angle only ever use that angle
+        fixed = pack([dict(p, angles=[90]) for p in pieces], 800, 600, kerf=2)
+        assert {poly["angle"] for s in fixed["sheets"] for poly in s["polygons"]} == {
+            90
+        }
+
+
+def test_genetic_rotation_genes_fit_the_sheet():
+    import random
+
+    from services.metaheuristic import _child, _initial, _rotation_choices
+
+    # The long piece only fits the 800x600 sheet lying down
+    pieces = [
+        {"id": "long", "polygon": [[0, 0], [700, 0], [700, 100], [0, 100]]},
+        {"id": "r", "width": 200, "height": 150},
+    ]
+    choices = _rotation_choices(pieces, True, 800, 600)
+    if _IRREGULAR_DEPS_OK:
+        assert choices == [[None, 0, 180], [None, 0, 90, 180, 270]]
+    rng = random.Random(0)
+    population = _initial(pieces, choices, 8, rng)
+    for _ in range(50):
+        population.append(_child(rng.sample(population, 2), choices, rng))
+    for _, genes in population:
+        assert all(g in c for g, c in zip(genes, choices))